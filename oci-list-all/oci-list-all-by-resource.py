@@ -1,13 +1,24 @@
 ﻿import oci
 import json
+import os
+import sys
+import time
 import pandas as pd
+from collections.abc import Mapping
 from datetime import datetime
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.chart import PieChart, BarChart, Reference
 
 # Load OCI configuration
 configAPI = oci.config.from_file("~/.oci/config")
+# Options:
+#        --jsonl   append every record to oci_resources_<namespace>_<date>.jsonl as soon as it is discovered (fsynced every
+#                  1000 records or 5 seconds, so an interrupted run keeps its partial results) instead of writing
+#                  oci_resources_<namespace>_<date>.json once at the end
+cli_flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+jsonl_enabled = "--jsonl" in cli_flags
 
 # Initialize OCI clients
 identity_client = oci.identity.IdentityClient(configAPI)
@@ -35,6 +46,74 @@ availability_domains = identity_client.list_availability_domains(tenancy_ocid).d
 resources = {}
 findings = {}
 
+# Get current date for the file name
+current_date = datetime.now().strftime("%Y-%m-%d")
+
+# Discovered records: the fields are declared once as __slots__ instead of a dict per
+# record repeating the same keys. Records read like the dicts they replace (get, [],
+# **record) with only the fields that were set; json.dump converts them with default=dict
+class Record(Mapping):
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, **values):
+        for field, value in values.items():
+            setattr(self, field, value)
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (field for field in self.fields if hasattr(self, field))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+class ResourceRecord(Record):
+    __slots__ = fields = ("name", "id", "defined_tags", "freeform_tags")
+
+# --jsonl output: one JSON line per record, written as soon as the record is discovered
+# and fsynced every fsync_every lines or fsync_interval seconds
+class JsonlWriter:
+
+    def __init__(self, file_name, fsync_every=1000, fsync_interval=5.0):
+        self.file = open(file_name, "w", encoding="utf-8")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def write(self, record):
+        self.file.write(json.dumps(record, default=str) + "\n")
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+jsonl_file_name = f"oci_resources_{namespace}_{current_date}.jsonl"
+jsonl_writer = JsonlWriter(jsonl_file_name) if jsonl_enabled else None
+
+# Keep a discovered record for the sheets and, with --jsonl, append it to the JSONL file right away
+def add_resource(compartment_name, resource_type, item):
+    resources[compartment_name].setdefault(resource_type, []).append(item)
+    if jsonl_writer is not None:
+        jsonl_writer.write({"compartment": compartment_name, "sheet": resource_type, **item})
+
 try:
     # Fetch all compartments
     compartments = oci.pagination.list_call_get_all_results(
@@ -53,49 +132,52 @@ try:
             findings[compartment.name] = []
 
             # Discover VCNs
-            vcn_response = oci.pagination.list_call_get_all_results(
+            vcn_response = oci.pagination.list_call_get_all_results_generator(
                 virtual_network_client.list_vcns,
+                "record",
                 compartment_id=compartment.id
-            ).data
+            )
             vcn_findings = []
             for vcn in vcn_response:
-                resources[compartment.name].setdefault("VCNs", []).append({"name": vcn.display_name, "id": vcn.id})
+                add_resource(compartment.name, "VCNs", ResourceRecord(name=vcn.display_name, id=vcn.id))
                 # Best practice: Check for wide CIDR ranges
                 if vcn.cidr_block == "0.0.0.0/0":
                     vcn_findings.append(f"VCN '{vcn.display_name}' has an open CIDR block.")
             findings[compartment.name].extend(vcn_findings)
 
             # Discover Compute Instances
-            instance_response = oci.pagination.list_call_get_all_results(
+            instance_response = oci.pagination.list_call_get_all_results_generator(
                 compute_client.list_instances,
+                "record",
                 compartment_id=compartment.id,
-            ).data
+            )
             instance_findings = []
             for instance in instance_response:
-                resources[compartment.name].setdefault("Compute Instances", []).append({
-                    "name": instance.display_name,
-                    "id": instance.id,
-                    "defined_tags" : instance.defined_tags,
-                    "freeform_tags" : instance.freeform_tags
-                })
+                add_resource(compartment.name, "Compute Instances", ResourceRecord(
+                    name=instance.display_name,
+                    id=instance.id,
+                    defined_tags=instance.defined_tags,
+                    freeform_tags=instance.freeform_tags
+                ))
                 # Best practice: Check if instance metadata is restricted
                 if instance.shape.startswith("VM.Standard"):
                     instance_findings.append(f"Instance '{instance.display_name}' is using '{instance.shape}' shape")
             findings[compartment.name].extend(instance_findings)
 
             # Discover Block Volumes
-            volume_response = oci.pagination.list_call_get_all_results(
+            volume_response = oci.pagination.list_call_get_all_results_generator(
                 block_storage_client.list_volumes,
+                "record",
                 compartment_id=compartment.id
-            ).data
+            )
             volume_findings = []
             for volume in volume_response:
-                resources[compartment.name].setdefault("Block Volumes", []).append({
-                    "name": volume.display_name,
-                    "id": volume.id,
-                    "defined_tags" : volume.defined_tags,
-                    "freeform_tags" : volume.freeform_tags
-                })
+                add_resource(compartment.name, "Block Volumes", ResourceRecord(
+                    name=volume.display_name,
+                    id=volume.id,
+                    defined_tags=volume.defined_tags,
+                    freeform_tags=volume.freeform_tags
+                ))
                 # Check if the volume is attached to any instance 
                 attachments = oci.pagination.list_call_get_all_results(
                     compute_client.list_volume_attachments,
@@ -111,85 +193,93 @@ try:
 
             # Discover File Systems 
             for ad in availability_domains:  
-                fss_response = oci.pagination.list_call_get_all_results(
+                fss_response = oci.pagination.list_call_get_all_results_generator(
                     file_storage_client.list_file_systems,
+                    "record",
                     compartment_id=compartment.id,
                     availability_domain=ad.name
-                ).data
+                )
                 fss_findings = []
                 for fss in fss_response:
-                    resources[compartment.name].setdefault("File Systems", []).append({
-                        "name": fss.display_name,
-                        "id": fss.id,
-                        "defined_tags" : fss.defined_tags,
-                        "freeform_tags" : fss.freeform_tags
-                    })
+                    add_resource(compartment.name, "File Systems", ResourceRecord(
+                        name=fss.display_name,
+                        id=fss.id,
+                        defined_tags=fss.defined_tags,
+                        freeform_tags=fss.freeform_tags
+                    ))
                 findings[compartment.name].extend(fss_findings)
 
             # Discover Autonomous Databases
-            adb_response = oci.pagination.list_call_get_all_results(
+            adb_response = oci.pagination.list_call_get_all_results_generator(
                 database_client.list_autonomous_databases,
+                "record",
                 compartment_id=compartment.id
-            ).data
+            )
             adb_findings = []
             for adb in adb_response:
-                resources[compartment.name].setdefault("Autonomous Databases", []).append({
-                    "name": adb.display_name,
-                    "id": adb.id,
-                    "defined_tags" : adb.defined_tags,
-                    "freeform_tags" : adb.freeform_tags
-                })
+                add_resource(compartment.name, "Autonomous Databases", ResourceRecord(
+                    name=adb.display_name,
+                    id=adb.id,
+                    defined_tags=adb.defined_tags,
+                    freeform_tags=adb.freeform_tags
+                ))
                 # Best practice: Check for appropriate workload type
                 if adb.db_workload != "OLTP":
                     adb_findings.append(f"ADB '{adb.display_name}' is not optimized for OLTP workloads.")
             findings[compartment.name].extend(adb_findings)
 
             # Discover Load Balancers
-            lb_response = oci.pagination.list_call_get_all_results(
+            lb_response = oci.pagination.list_call_get_all_results_generator(
                 load_balancer_client.list_load_balancers,
+                "record",
                 compartment_id=compartment.id
-            ).data
+            )
             lb_findings = []
             for lb in lb_response:
-                resources[compartment.name].setdefault("Load Balancers", []).append({
-                    "name": lb.display_name,
-                    "id": lb.id,
-                    "defined_tags" : lb.defined_tags,
-                    "freeform_tags" : lb.freeform_tags
-                })
+                add_resource(compartment.name, "Load Balancers", ResourceRecord(
+                    name=lb.display_name,
+                    id=lb.id,
+                    defined_tags=lb.defined_tags,
+                    freeform_tags=lb.freeform_tags
+                ))
                 # Best practice: Ensure SSL termination is configured
                 if not lb.shape_name.startswith("flexible"):
                     lb_findings.append(f"Load Balancer '{lb.display_name}' is not using a flexible shape.")
             findings[compartment.name].extend(lb_findings)
+            if jsonl_writer is not None:
+                for finding in findings[compartment.name]:
+                    jsonl_writer.write({"compartment": compartment.name, "finding": finding})
 
-    # Get current date for the file name
-    current_date = datetime.now().strftime("%Y-%m-%d")
-   
-    # Generate file name with dynamic titles
-    file_name = f"oci_resources_{namespace}_{current_date}.json"
-    
-    # Export data to JSON
-    with open(file_name, "w") as file:
-        json.dump({"resources": resources, "findings": findings}, file, indent=4)
+    if jsonl_writer is not None:
+        jsonl_writer.close()
+        print(f"JSONL file saved: {jsonl_file_name}")
+    else:
+        # Generate file name with dynamic titles
+        file_name = f"oci_resources_{namespace}_{current_date}.json"
+
+        # Export data to JSON
+        with open(file_name, "w") as file:
+            json.dump({"resources": resources, "findings": findings}, file, indent=4, default=dict)
 
-    print(f"Resource discovery and validation completed. Results saved to: {file_name}")
+        print(f"Resource discovery and validation completed. Results saved to: {file_name}")
     
     # Export data to Excel
-    workbook = Workbook()
-    summary_sheet = workbook.active
-    summary_sheet.title = "Findings Summary"
+    # Write-only workbook: rows are streamed to disk as they are appended, so the
+    # summary row count is tracked here instead of reading summary_sheet.max_row
+    workbook = Workbook(write_only=True)
+    summary_sheet = workbook.create_sheet(title="Findings Summary")
 
     # Add findings summary
     summary_sheet.append(["Compartment", "Remarks"])
+    summary_max_row = 1
     for compartment, issues in findings.items():
         for issue in issues:
-            summary_sheet.append([compartment, issue])
-
-    # Style misconfigurations
-    for row in summary_sheet.iter_rows(min_row=2, max_row=summary_sheet.max_row, min_col=2, max_col=2):
-        for cell in row:
+            # Style misconfigurations
+            cell = WriteOnlyCell(summary_sheet, value=issue)
             cell.fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
             cell.font = Font(bold=True)
+            summary_sheet.append([compartment, cell])
+            summary_max_row += 1
 
     # Count findings by resource type for visualization
     resource_issues_summary = {}
@@ -199,15 +289,17 @@ try:
             resource_issues_summary[resource_type] = resource_issues_summary.get(resource_type, 0) + 1
 
     # Add a summary table for findings by resource type
-    summary_start_row = summary_sheet.max_row + 2
+    summary_start_row = summary_max_row + 2
     summary_sheet.append(["Resource Type", "Number of Issues"])
+    summary_max_row += 1
     for resource_type, count in resource_issues_summary.items():
         summary_sheet.append([resource_type, count])
+        summary_max_row += 1
 
     # Create a bar chart for findings summary
     bar_chart = BarChart()
-    data = Reference(summary_sheet, min_col=2, min_row=summary_start_row + 1, max_row=summary_sheet.max_row)
-    categories = Reference(summary_sheet, min_col=1, min_row=summary_start_row + 1, max_row=summary_sheet.max_row)
+    data = Reference(summary_sheet, min_col=2, min_row=summary_start_row + 1, max_row=summary_max_row)
+    categories = Reference(summary_sheet, min_col=1, min_row=summary_start_row + 1, max_row=summary_max_row)
     bar_chart.add_data(data, titles_from_data=False)
     bar_chart.set_categories(categories)
     bar_chart.title = "Findings by Resource Type"
@@ -216,17 +308,34 @@ try:
     summary_sheet.add_chart(bar_chart, f"E{summary_start_row}")
 
     # Add data sheets for each resource type
+    # Tags are flattened into one column per defined tag ("namespace.key") and per freeform tag ("freeform.key"),
+    # collected in a first pass over the records
     for resource_type in ["VCNs", 
                         "Compute Instances", 
                         "Block Volumes", 
                         "File Systems",
                         "Autonomous Databases", 
                         "Load Balancers"]:
+        tag_paths = {}
+        for compartment, resource_data in resources.items():
+            for item in resource_data.get(resource_type, []):
+                for tag_namespace, tags in (item.get("defined_tags") or {}).items():
+                    for tag_key in tags:
+                        tag_paths[(tag_namespace, tag_key)] = None
+                for tag_key in (item.get("freeform_tags") or {}):
+                    tag_paths[("freeform", tag_key)] = None
+        tag_paths = sorted(tag_paths)
         sheet = workbook.create_sheet(title=resource_type)
-        sheet.append(["Compartment", "Name", "ID", "Defined_tags", "Freeform_tags" ])
+        sheet.append(["Compartment", "Name", "ID"] + [f"{tag_namespace}.{tag_key}" for tag_namespace, tag_key in tag_paths])
         for compartment, resource_data in resources.items():
             for item in resource_data.get(resource_type, []):
-                sheet.append([compartment, item.get("name"), item.get("id", "N/A"),str(item.get("defined_tags")),str(item.get(f"freeform_tags"))])
+                defined_tags = item.get("defined_tags") or {}
+                freeform_tags = item.get("freeform_tags") or {}
+                tag_cells = []
+                for tag_namespace, tag_key in tag_paths:
+                    tag_value = freeform_tags.get(tag_key) if tag_namespace == "freeform" else (defined_tags.get(tag_namespace) or {}).get(tag_key)
+                    tag_cells.append(None if tag_value is None else str(tag_value))
+                sheet.append([compartment, item.get("name"), item.get("id", "N/A")] + tag_cells)
 
     # Add visualization sheet
     visualization_sheet = workbook.create_sheet(title="Visualizations")
@@ -269,4 +378,8 @@ try:
 except oci.exceptions.ServiceError as e:
     print(f"Service Error: {e}")
 except Exception as e:
-    print(f"Unexpected Error: {e}")
\ No newline at end of file
+    print(f"Unexpected Error: {e}")
+finally:
+    # Keep whatever was discovered, even when the run was interrupted
+    if jsonl_writer is not None:
+        jsonl_writer.close()
\ No newline at end of file
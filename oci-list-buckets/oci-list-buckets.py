@@ -1,6 +1,10 @@
 ﻿import oci
 import json
+import os
+import sys
+import time
 import pandas as pd
+from collections.abc import Mapping
 from datetime import datetime
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
@@ -8,6 +12,12 @@ from openpyxl.chart import PieChart, BarChart, Reference
 
 # Load OCI configuration
 configAPI = oci.config.from_file("~/.oci/config")
+# Options:
+#        --jsonl   append every record to oci_buckets_<tenancy>_<date>.jsonl as soon as it is discovered (fsynced every
+#                  1000 records or 5 seconds, so an interrupted run keeps its partial results) instead of writing
+#                  oci_buckets_<tenancy>_<date>.json once at the end
+cli_flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+jsonl_enabled = "--jsonl" in cli_flags
 
 # Initialize OCI clients
 identity_client = oci.identity.IdentityClient(configAPI)
@@ -28,6 +38,77 @@ availability_domains = identity_client.list_availability_domains(tenancy_ocid).d
 resources = {}
 findings = {}
 
+# Get current date for the file name
+current_date = datetime.now().strftime("%Y-%m-%d")
+
+# Discovered records: the fields are declared once as __slots__ instead of a dict per
+# record repeating the same keys. Records read like the dicts they replace (get, [],
+# **record) with only the fields that were set; json.dump converts them with default=dict
+class Record(Mapping):
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, **values):
+        for field, value in values.items():
+            setattr(self, field, value)
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (field for field in self.fields if hasattr(self, field))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+class BucketRecord(Record):
+    __slots__ = fields = ("name",)
+
+class BucketObjectRecord(Record):
+    __slots__ = fields = ("bucket_name", "object_name")
+
+# --jsonl output: one JSON line per record, written as soon as the record is discovered
+# and fsynced every fsync_every lines or fsync_interval seconds
+class JsonlWriter:
+
+    def __init__(self, file_name, fsync_every=1000, fsync_interval=5.0):
+        self.file = open(file_name, "w", encoding="utf-8")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def write(self, record):
+        self.file.write(json.dumps(record, default=str) + "\n")
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+jsonl_file_name = f"oci_buckets_{tenancy_name}_{current_date}.jsonl"
+jsonl_writer = JsonlWriter(jsonl_file_name) if jsonl_enabled else None
+
+# Keep a discovered record for the sheets and, with --jsonl, append it to the JSONL file right away
+def add_resource(compartment_name, resource_type, item):
+    resources[compartment_name].setdefault(resource_type, []).append(item)
+    if jsonl_writer is not None:
+        jsonl_writer.write({"compartment": compartment_name, "sheet": resource_type, **item})
+
 try:
     # Fetch all compartments
     compartments = oci.pagination.list_call_get_all_results(
@@ -46,14 +127,15 @@ try:
             findings[compartment.name] = []
             
             # Discover Object Storage Buckets
-            bucket_response = oci.pagination.list_call_get_all_results(
+            bucket_response = oci.pagination.list_call_get_all_results_generator(
                 object_storage_client.list_buckets,
+                "record",
                 namespace_name=namespace,
                 compartment_id=compartment.id
-            ).data
+            )
             bucket_findings = []
             for bucket in bucket_response:
-                resources[compartment.name].setdefault("Buckets", []).append({"name": bucket.name})
+                add_resource(compartment.name, "Buckets", BucketRecord(name=bucket.name))
                 # Fetch detailed bucket info to check for public access
                 bucket_details = object_storage_client.get_bucket(
                     namespace_name=namespace,
@@ -63,35 +145,36 @@ try:
                 if bucket_details.public_access_type != "NoPublicAccess":
                     bucket_findings.append(f"Bucket '{bucket.name}' allows public access.")
                 # Discover Objects in Buckets
-                object_response = oci.pagination.list_call_get_all_results(
+                object_response = oci.pagination.list_call_get_all_results_generator(
                     object_storage_client.list_objects,
+                    "record",
                     namespace_name=namespace,
                     bucket_name=bucket.name
-                ).data
-                resources[compartment.name].setdefault("Bucket Objects", []).extend([
-                    {"bucket_name": bucket.name, "object_name": obj.name} for obj in object_response.objects
-                ])
+                )
+                for obj in object_response:
+                    add_resource(compartment.name, "Bucket Objects", BucketObjectRecord(bucket_name=bucket.name, object_name=obj.name))
             findings[compartment.name].extend(bucket_findings)
+            if jsonl_writer is not None:
+                for finding in findings[compartment.name]:
+                    jsonl_writer.write({"compartment": compartment.name, "finding": finding})
 
-    # Get current date for the file name
-    current_date = datetime.now().strftime("%Y-%m-%d")
     tenancy_name = identity_client.get_tenancy(tenancy_id=tenancy_ocid).data.name
-    
-    # Generate file name with dynamic titles
-    file_name = f"oci_buckets_{tenancy_name}_{current_date}.json"
-    
-    # Export data to JSON
-    with open(file_name, "w") as file:
-        json.dump({"resources": resources, "findings": findings}, file, indent=4)
+    if jsonl_writer is not None:
+        jsonl_writer.close()
+        print(f"JSONL file saved: {jsonl_file_name}")
+    else:
+        # Generate file name with dynamic titles
+        file_name = f"oci_buckets_{tenancy_name}_{current_date}.json"
 
-    print(f"JSON file saved: {file_name}")
+        # Export data to JSON
+        with open(file_name, "w") as file:
+            json.dump({"resources": resources, "findings": findings}, file, indent=4, default=dict)
+
+        print(f"JSON file saved: {file_name}")
     
     # Export data to Excel
-    workbook = Workbook()
-    summary_sheet = workbook.active
-
-    # Remove default sheet
-    workbook.remove(workbook["Sheet"])
+    # Write-only workbook (no default sheet): rows are streamed to disk as they are appended
+    workbook = Workbook(write_only=True)
 
     # Add data sheets for each resource type
     for resource_type in ["Buckets"
@@ -113,4 +196,8 @@ try:
 except oci.exceptions.ServiceError as e:
     print(f"Service Error: {e}")
 except Exception as e:
-    print(f"Unexpected Error: {e}")
\ No newline at end of file
+    print(f"Unexpected Error: {e}")
+finally:
+    # Keep whatever was discovered, even when the run was interrupted
+    if jsonl_writer is not None:
+        jsonl_writer.close()
\ No newline at end of file
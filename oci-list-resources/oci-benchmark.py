@@ -0,0 +1,92 @@
+import os
+import runpy
+import shutil
+import sys
+import tempfile
+import time
+
+from oci_fake import FakeOciService, SyntheticTenancy, install_fake_clients
+
+# Run one of the listers against a synthetic tenancy: no OCI account, network or
+# cost, and any tenancy size (see oci_fake.py for how the tenancy is generated)
+# Usage:
+#        python oci-benchmark.py [benchmark options] <script> [script arguments and options]
+# Example (10,000 compartments, 50 ms per request, 1% of the requests throttled):
+#        python oci-benchmark.py --compartments=10000 --latency=0.05 --throttle-rate=0.01 oci-list-resources-with-token.py us-ashburn-1 2025-10-01T00:00:00Z 2025-11-01T00:00:00Z --api-stats
+# Benchmark options (before the script):
+#        --compartments=N              compartments in the tenancy (default 100)
+#        --compartment-fanout=N        child compartments per compartment (default 10)
+#        --regions=N|r1,r2             number of subscribed regions or their names; the first one is the home region (default us-ashburn-1)
+#        --ads=N                       availability domains per region (default 3)
+#        --resources-per-type=N        resources of each type per compartment and region (default 5)
+#        --buckets-per-compartment=N   buckets per compartment (default 1)
+#        --objects-per-bucket=N        objects per bucket, and Cost and Usage Report files (default 100)
+#        --cost-rows=N                 Usage API cost rows per day, one per costed resource (default 1000)
+#        --page-size=N                 items per page of the list calls (default 100)
+#        --latency=SECONDS             injected latency of every request (default 0)
+#        --latency-jitter=FRACTION     random +/- variation of the latency, as a fraction of it (default 0)
+#        --throttle-rate=FRACTION      share of the requests answered 429 TooManyRequests (default 0)
+#        --seed=N                      seed of the jitter and throttling (default 0)
+
+BENCHMARK_OPTIONS = {
+    "compartments": int,
+    "compartment-fanout": int,
+    "regions": str,
+    "ads": int,
+    "resources-per-type": int,
+    "buckets-per-compartment": int,
+    "objects-per-bucket": int,
+    "cost-rows": int,
+    "page-size": int,
+    "latency": float,
+    "latency-jitter": float,
+    "throttle-rate": float,
+    "seed": int,
+}
+
+options = {}
+arguments = sys.argv[1:]
+while arguments and arguments[0].startswith("--"):
+    name, _, value = arguments.pop(0)[2:].partition("=")
+    if name not in BENCHMARK_OPTIONS or not value:
+        sys.exit(f"Unknown benchmark option --{name}{'=' + value if value else ''} (see the header of {sys.argv[0]})")
+    options[name] = BENCHMARK_OPTIONS[name](value)
+if not arguments:
+    sys.exit(f"Usage: python {sys.argv[0]} [benchmark options] <script> [script arguments and options]")
+script = arguments[0]
+
+regions = options.get("regions", "us-ashburn-1")
+tenancy = SyntheticTenancy(
+    compartments=options.get("compartments", 100),
+    regions=int(regions) if regions.isdigit() else regions.split(","),
+    ads=options.get("ads", 3),
+    resources_per_type=options.get("resources-per-type", 5),
+    buckets_per_compartment=options.get("buckets-per-compartment", 1),
+    objects_per_bucket=options.get("objects-per-bucket", 100),
+    cost_rows=options.get("cost-rows", 1000),
+    compartment_fanout=options.get("compartment-fanout", 10),
+)
+service = FakeOciService(
+    tenancy,
+    latency=options.get("latency", 0.0),
+    latency_jitter=options.get("latency-jitter", 0.0),
+    throttle_rate=options.get("throttle-rate", 0.0),
+    page_size=options.get("page-size", 100),
+    seed=options.get("seed", 0),
+)
+config_dir = tempfile.mkdtemp(prefix="oci_fake_config_")
+install_fake_clients(service, config_dir)
+print(f"Synthetic tenancy: {tenancy.compartments} compartments, regions {', '.join(tenancy.regions)}, {tenancy.ads} ADs, "
+      f"{tenancy.resources_per_type} resources per type, {tenancy.cost_rows} cost rows per day")
+
+# The listers import their helper modules from their own directory
+sys.path.insert(0, os.path.dirname(os.path.abspath(script)))
+sys.argv = arguments
+started = time.perf_counter()
+try:
+    runpy.run_path(script, run_name="__main__")
+finally:
+    elapsed = time.perf_counter() - started
+    shutil.rmtree(config_dir, ignore_errors=True)
+    print(f"\nBenchmark: {script} ran in {elapsed:.2f} s, {service.requests} requests "
+          f"({service.throttled} throttled, {service.not_found} not found)")
@@ -7,6 +7,8 @@ import logging
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
 from openpyxl.chart import PieChart, BarChart, Reference
+from oci_records import AutonomousDatabaseRecord, BlockVolumeBackupRecord, BlockVolumeRecord, BootVolumeBackupRecord, BootVolumeRecord, ComputeInstanceRecord, DailyCostRecord, FileSystemRecord, VolumeAttachmentRecord
+from oci_export import ATTACHED_VOLUME_TYPES, TagColumns, attachment_index, join_attachments, tag_cells
 
 # Pre-requisites 
 # Step.1 (required) Run:
@@ -124,200 +126,201 @@ try:
 
                 # Compute Instances
                 for ad in region_ads:
-                    vm_list = oci.pagination.list_call_get_all_results(
-                        compute_client.list_instances,
+                    # Boot volume attachments by instance, kept as (boot_volume_id, state) so the
+                    # SDK models are dropped as each page is read
+                    vm_boot_volumes = {}
+                    for bva in oci.pagination.list_call_get_all_results_generator(
+                        compute_client.list_boot_volume_attachments,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
-                    bv_attachments = oci.pagination.list_call_get_all_results(
-                        compute_client.list_boot_volume_attachments,
+                    ):
+                        vm_boot_volumes.setdefault(bva.instance_id, []).append((bva.boot_volume_id, bva.lifecycle_state))
+                    vm_list = oci.pagination.list_call_get_all_results_generator(
+                        compute_client.list_instances,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data   
+                    )
                     vm_findings = []        
                     for vm in vm_list:        
-                        for bva in bv_attachments:
-                            if vm.id == bva.instance_id:
-                                resources[resource_key].setdefault("Compute Instances", []).append({
-                                    "compartment_name": compartment.name,
-                                    "region": current_region,
-                                    "name": vm.display_name,
-                                    "id": vm.id,
-                                    "state": vm.lifecycle_state,
-                                    "attached_to" : bva.boot_volume_id,
-                                    "volume_state": bva.lifecycle_state,
-                                    "availability_domain" : vm.availability_domain,
-                                    "defined_tags" : vm.defined_tags,
-                                    "freeform_tags" : vm.freeform_tags,
-                                    "time_created" : str((f"{vm.time_created}"))
-                                })                   
+                        for boot_volume_id, volume_state in vm_boot_volumes.get(vm.id, ()):
+                            resources[resource_key].setdefault("Compute Instances", []).append(ComputeInstanceRecord(
+                                compartment_name=compartment.name,
+                                region=current_region,
+                                name=vm.display_name,
+                                id=vm.id,
+                                state=vm.lifecycle_state,
+                                attached_to=boot_volume_id,
+                                volume_state=volume_state,
+                                availability_domain=vm.availability_domain,
+                                defined_tags=vm.defined_tags,
+                                freeform_tags=vm.freeform_tags,
+                                time_created=vm.time_created
+                            ))                   
                 findings[resource_key].extend(vm_findings)
 
                 # Block Volumes
                 for ad in region_ads:
-                    bv_list = oci.pagination.list_call_get_all_results(
+                    bv_list = oci.pagination.list_call_get_all_results_generator(
                         block_storage_client.list_volumes,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
-                    bv_attachments = oci.pagination.list_call_get_all_results(
+                    )
+                    bv_attachments = oci.pagination.list_call_get_all_results_generator(
                         compute_client.list_volume_attachments,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data 
+                    )
                     bv_findings = []           
                     for bv in bv_list:
-                        resources[resource_key].setdefault("Block Volumes", []).append({
-                            "compartment_name": compartment.name,
-                            "region": current_region,
-                            "name": bv.display_name,
-                            "id": bv.id,
-                            "state": bv.lifecycle_state,
-                            "defined_tags" : bv.defined_tags,
-                            "freeform_tags" : bv.freeform_tags,
-                            "size_in_gbs" : bv.size_in_gbs,
-                            "time_created" : str((f"{bv.time_created}"))
-                        })
-                        for bva in bv_attachments:
-                            if bv.id == bva.volume_id:
-                                resources[resource_key].setdefault("Block Volumes", []).append({
-                                    "compartment_name": compartment.name,
-                                    "region": current_region,
-                                    "name": bv.display_name,
-                                    "id": bv.id,
-                                    "state": bva.lifecycle_state,
-                                    "defined_tags" : bv.defined_tags,
-                                    "freeform_tags" : bv.freeform_tags,
-                                    "attached_to_instance" : bva.instance_id,
-                                    "size_in_gbs" : bv.size_in_gbs,
-                                    "time_created" : str((f"{bv.time_created}"))
-                                })                       
+                        resources[resource_key].setdefault("Block Volumes", []).append(BlockVolumeRecord(
+                            compartment_name=compartment.name,
+                            region=current_region,
+                            name=bv.display_name,
+                            id=bv.id,
+                            state=bv.lifecycle_state,
+                            defined_tags=bv.defined_tags,
+                            freeform_tags=bv.freeform_tags,
+                            size_in_gbs=bv.size_in_gbs,
+                            time_created=bv.time_created
+                        ))
+                    # Attachments are kept as their own relation, joined with the volumes on export
+                    for bva in bv_attachments:
+                        resources[resource_key].setdefault("Volume Attachments", []).append(VolumeAttachmentRecord(
+                            volume_id=bva.volume_id,
+                            instance_id=bva.instance_id,
+                            state=bva.lifecycle_state,
+                            availability_domain=bva.availability_domain
+                        ))
                 findings[resource_key].extend(bv_findings)
 
                 # Block Volumes Bkp
-                bvBkp_list = oci.pagination.list_call_get_all_results(
+                bvBkp_list = oci.pagination.list_call_get_all_results_generator(
                     block_storage_client.list_volume_backups,
+                    "record",
                     compartment_id=compartment.id
-                ).data
+                )
                 bv_findings = []
                 for bvBkp in bvBkp_list:
-                    resources[resource_key].setdefault("Block Volumes Bkp", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": bvBkp.display_name,
-                        "id": bvBkp.id,
-                        "state": bvBkp.lifecycle_state,
-                        "defined_tags" : bvBkp.defined_tags,
-                        "freeform_tags" : bvBkp.freeform_tags,
-                        "attached_to" : bvBkp.volume_id,
-                        "size_in_gbs" : bvBkp.size_in_gbs,
-                        "time_created" : str((f"{bvBkp.time_created}"))
-                    })
+                    resources[resource_key].setdefault("Block Volumes Bkp", []).append(BlockVolumeBackupRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=bvBkp.display_name,
+                        id=bvBkp.id,
+                        state=bvBkp.lifecycle_state,
+                        defined_tags=bvBkp.defined_tags,
+                        freeform_tags=bvBkp.freeform_tags,
+                        attached_to=bvBkp.volume_id,
+                        size_in_gbs=bvBkp.size_in_gbs,
+                        time_created=bvBkp.time_created
+                    ))
                 findings[resource_key].extend(bv_findings)
 
                 # Boot Volumes
                 for ad in region_ads:
-                    bv_list = oci.pagination.list_call_get_all_results(
+                    bv_list = oci.pagination.list_call_get_all_results_generator(
                         block_storage_client.list_boot_volumes,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
-                    bv_attachments = oci.pagination.list_call_get_all_results(
+                    )
+                    bv_attachments = oci.pagination.list_call_get_all_results_generator(
                         compute_client.list_boot_volume_attachments,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data   
+                    )
                     bv_findings = []        
                     for bv in bv_list:
-                        resources[resource_key].setdefault("Boot Volumes", []).append({
-                            "compartment_name": compartment.name,
-                            "region": current_region,
-                            "name": bv.display_name,
-                            "id": bv.id,
-                            "state": bv.lifecycle_state,
-                            "defined_tags" : bv.defined_tags,
-                            "freeform_tags" : bv.freeform_tags,
-                            "size_in_gbs" : bv.size_in_gbs,
-                            "time_created" : str((f"{bv.time_created}"))
-                        })          
-                        for bva in bv_attachments:
-                            if bv.id == bva.boot_volume_id:
-                                resources[resource_key].setdefault("Boot Volumes", []).append({
-                                    "compartment_name": compartment.name,
-                                    "region": current_region,
-                                    "name": bv.display_name,
-                                    "id": bv.id,
-                                    "state": bva.lifecycle_state,
-                                    "defined_tags" : bv.defined_tags,
-                                    "freeform_tags" : bv.freeform_tags,
-                                    "attached_to_instance" : bva.instance_id,
-                                    "availability_domain" : ad.name,
-                                    "size_in_gbs" : bv.size_in_gbs,
-                                    "time_created" : str((f"{bv.time_created}"))
-                                })                       
+                        resources[resource_key].setdefault("Boot Volumes", []).append(BootVolumeRecord(
+                            compartment_name=compartment.name,
+                            region=current_region,
+                            name=bv.display_name,
+                            id=bv.id,
+                            state=bv.lifecycle_state,
+                            defined_tags=bv.defined_tags,
+                            freeform_tags=bv.freeform_tags,
+                            availability_domain=bv.availability_domain,
+                            size_in_gbs=bv.size_in_gbs,
+                            time_created=bv.time_created
+                        ))          
+                    # Attachments are kept as their own relation, joined with the volumes on export
+                    for bva in bv_attachments:
+                        resources[resource_key].setdefault("Volume Attachments", []).append(VolumeAttachmentRecord(
+                            volume_id=bva.boot_volume_id,
+                            instance_id=bva.instance_id,
+                            state=bva.lifecycle_state,
+                            availability_domain=bva.availability_domain
+                        ))
                 findings[resource_key].extend(bv_findings)
 
                 # Boot Volumes Bkp
-                bvBkp_list = oci.pagination.list_call_get_all_results(
+                bvBkp_list = oci.pagination.list_call_get_all_results_generator(
                     block_storage_client.list_boot_volume_backups,
+                    "record",
                     compartment_id=compartment.id
-                ).data
+                )
                 bv_findings = []
                 for bv in bvBkp_list:
-                    resources[resource_key].setdefault("Boot Volumes Bkp", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": bv.display_name,
-                        "id": bv.id,
-                        "state": bv.lifecycle_state,
-                        "defined_tags" : bv.defined_tags,
-                        "freeform_tags" : bv.freeform_tags,
-                        "size_in_gbs" : bv.size_in_gbs,
-                        "time_created" : str((f"{bv.time_created}"))
-                    })
+                    resources[resource_key].setdefault("Boot Volumes Bkp", []).append(BootVolumeBackupRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=bv.display_name,
+                        id=bv.id,
+                        state=bv.lifecycle_state,
+                        defined_tags=bv.defined_tags,
+                        freeform_tags=bv.freeform_tags,
+                        size_in_gbs=bv.size_in_gbs,
+                        time_created=bv.time_created
+                    ))
                 findings[resource_key].extend(bv_findings)
 
                 # File Systems 
                 for ad in region_ads:  
-                    fss_list = oci.pagination.list_call_get_all_results(
+                    fss_list = oci.pagination.list_call_get_all_results_generator(
                         file_storage_client.list_file_systems,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
+                    )
                     fss_findings = []
                     for fss in fss_list:
-                        resources[resource_key].setdefault("File Systems", []).append({
-                            "compartment_name": compartment.name,
-                            "region": current_region,
-                            "name": fss.display_name,
-                            "id": fss.id,
-                            "state": fss.lifecycle_state,
-                            "defined_tags" : fss.defined_tags,
-                            "freeform_tags" : fss.freeform_tags,
-                            "metered_bytes" : fss.metered_bytes,
-                            "time_created" : str((f"{fss.time_created}"))
-                        })
+                        resources[resource_key].setdefault("File Systems", []).append(FileSystemRecord(
+                            compartment_name=compartment.name,
+                            region=current_region,
+                            name=fss.display_name,
+                            id=fss.id,
+                            state=fss.lifecycle_state,
+                            defined_tags=fss.defined_tags,
+                            freeform_tags=fss.freeform_tags,
+                            metered_bytes=fss.metered_bytes,
+                            time_created=fss.time_created
+                        ))
                     findings[resource_key].extend(fss_findings)
 
                 # Autonomous Databases
-                adb_list = oci.pagination.list_call_get_all_results(
+                adb_list = oci.pagination.list_call_get_all_results_generator(
                     database_client.list_autonomous_databases,
+                    "record",
                     compartment_id=compartment.id
-                ).data
+                )
                 adb_findings = []
                 for adb in adb_list:
-                    resources[resource_key].setdefault("Autonomous Databases", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": adb.display_name,
-                        "id": adb.id,
-                        "state": adb.lifecycle_state,
-                        "defined_tags" : adb.defined_tags,
-                        "freeform_tags" : adb.freeform_tags,
-                        "ocups": adb.compute_count,
-                        "size_in_gbs" : adb.data_storage_size_in_gbs,
-                        "time_created" : str((f"{adb.time_created}"))
-                    })
+                    resources[resource_key].setdefault("Autonomous Databases", []).append(AutonomousDatabaseRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=adb.display_name,
+                        id=adb.id,
+                        state=adb.lifecycle_state,
+                        defined_tags=adb.defined_tags,
+                        freeform_tags=adb.freeform_tags,
+                        ocups=adb.compute_count,
+                        size_in_gbs=adb.data_storage_size_in_gbs,
+                        time_created=adb.time_created
+                    ))
                 findings[resource_key].extend(adb_findings)
 
             # Usage Costs - Compute
@@ -372,13 +375,13 @@ try:
             cost_findings = []
             for cost in costs_list.data.items:
                 start_time = cost.time_usage_started.strftime("%Y-%m-%d")
-                resources[compartment.id].setdefault("Daily Costs", []).append({
-                    "compartment_name": compartment.name,
-                    "id": cost.resource_id,
-                    "currency": cost.currency,
-                    "cost": cost.computed_amount,
-                    "starttime": start_time
-                })
+                resources[compartment.id].setdefault("Daily Costs", []).append(DailyCostRecord(
+                    compartment_name=compartment.name,
+                    id=cost.resource_id,
+                    currency=cost.currency,
+                    cost=cost.computed_amount,
+                    starttime=start_time
+                ))
             findings[compartment.id].extend(cost_findings)
     
         # Build a set of all existing resource IDs from all Resource sheets
@@ -499,12 +502,11 @@ try:
     # print(f"Resource discovery and validation completed. Results saved to: {file_name}")
     
     # # Export data to Excel
-    workbook = Workbook()
-    summary_sheet = workbook.active
+    # Write-only workbook: rows are streamed to disk as they are appended instead of being held in memory
+    workbook = Workbook(write_only=True)
     # summary_sheet.title = "Findings Summary"
     script_end_time = datetime.datetime.now()
-    summary_sheet = workbook.active
-    summary_sheet.title = "Summary"
+    summary_sheet = workbook.create_sheet(title="Summary")
     summary_sheet.append(["started_at", "completed_at"])
     summary_sheet.append([str((f"{scipt_start_time}")), str((f"{script_end_time}"))])
 
@@ -544,6 +546,14 @@ try:
     # bar_chart.y_axis.title = "Number of Issues"
     # summary_sheet.add_chart(bar_chart, f"E{summary_start_row}")
 
+    # Volumes are joined with their attachments at export time: one row per volume,
+    # with its instance(s) in Attached_to
+    attachments = attachment_index(resources)
+
+    # Tags are flattened into one column per defined tag ("namespace.key") and per freeform tag
+    # ("freeform.key") in place of Defined_tags/Freeform_tags, collected in a first pass over the records
+    tag_columns = TagColumns().scan(resources)
+
     # Add data sheets for each resource type
     for resource_type in ["Daily Costs",
                         "Compute Instances", 
@@ -552,27 +562,38 @@ try:
                         "Boot Volumes",
                         "Boot Volumes Bkp",
                         "File Systems",
-                        "Autonomous Databases"]:
+                        "Autonomous Databases",
+                        "Volume Attachments"]:
         sheet = workbook.create_sheet(title=resource_type)   
+        defined_columns = tag_columns.columns(resource_type, "defined_tags")
+        freeform_columns = tag_columns.columns(resource_type, "freeform_tags")
+        tag_headers = [name for name, path in defined_columns + freeform_columns]
+        defined_cells = tag_cells("defined_tags", [path for name, path in defined_columns])
+        freeform_cells = tag_cells("freeform_tags", [path for name, path in freeform_columns])
         if resource_type == "Compute Instances":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "BootVolume_state", "Availability_domain", "Time_created", "Total_cost_in_period"])
+            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", *tag_headers, "Attached_to", "BootVolume_state", "Availability_domain", "Time_created", "Total_cost_in_period"])
         if resource_type == "Block Volumes":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
+            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", *tag_headers, "Attached_to", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
         if resource_type == "Block Volumes Bkp":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
+            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", *tag_headers, "Attached_to", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
         if resource_type == "Boot Volumes":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "Availability_domain" , "Size_in_gbs", "Time_created", "Total_cost_in_period"])
+            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", *tag_headers, "Attached_to", "Availability_domain" , "Size_in_gbs", "Time_created", "Total_cost_in_period"])
         if resource_type == "Boot Volumes Bkp":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
+            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", *tag_headers, "Size_in_gbs", "Time_created", "Total_cost_in_period"])
         if resource_type == "File Systems":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags" , "Metered_bytes", "Time_created", "Total_cost_in_period"])
+            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", *tag_headers, "Metered_bytes", "Time_created", "Total_cost_in_period"])
         if resource_type == "Autonomous Databases":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags" , "Ocpus", "Size_in_gbs", "Time_created", "Total_cost_in_period"])    
+            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", *tag_headers, "Ocpus", "Size_in_gbs", "Time_created", "Total_cost_in_period"])    
         if resource_type == "Daily Costs":
             sheet.append(["Compartment", "ID", "Currency","Cost", "Starttime"])              
+        if resource_type == "Volume Attachments":
+            sheet.append(["Volume_ID", "Instance_ID", "STATE", "Availability_domain"])
         
         for compartment, resource_data in resources.items():
-            for item in resource_data.get(resource_type, []):
+            items = resource_data.get(resource_type, [])
+            if resource_type in ATTACHED_VOLUME_TYPES:
+                items = join_attachments(items, attachments)
+            for item in items:
                 # Get total cost for this resource from cost_resource_ids
                 resource_id = item.get("id")
                 total_cost_str = item.get("total_cost_in_period", "")  # For deleted resources
@@ -587,8 +608,8 @@ try:
                              item.get("name"), 
                              item.get("id"),
                              item.get("state"),
-                             str(item.get(f"defined_tags")),
-                             str(item.get(f"freeform_tags")),
+                             *defined_cells(item),
+                             *freeform_cells(item),
                              str(item.get(f"attached_to")),
                              str(item.get(f"volume_state")),
                              str(item.get(f"availability_domain")),
@@ -602,8 +623,8 @@ try:
                                 item.get("name"), 
                                 item.get("id"),
                                 item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
+                                *defined_cells(item),
+                                *freeform_cells(item),
                                 str(item.get(f"attached_to_instance")),
                                 item.get(f"size_in_gbs"),
                                 str(item.get(f"time_created")),
@@ -616,8 +637,8 @@ try:
                                 item.get("name"), 
                                 item.get("id"),
                                 item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
+                                *defined_cells(item),
+                                *freeform_cells(item),
                                 str(item.get(f"attached_to")),
                                 item.get(f"size_in_gbs"),
                                 str(item.get(f"time_created")),
@@ -630,8 +651,8 @@ try:
                                 item.get("name"), 
                                 item.get("id"),
                                 item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
+                                *defined_cells(item),
+                                *freeform_cells(item),
                                 str(item.get(f"attached_to_instance")),
                                 str(item.get(f"availability_domain")),
                                 item.get(f"size_in_gbs"),
@@ -645,8 +666,8 @@ try:
                                 item.get("name"), 
                                 item.get("id"),
                                 item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
+                                *defined_cells(item),
+                                *freeform_cells(item),
                                 item.get(f"size_in_gbs"),
                                 str(item.get(f"time_created")),
                                 total_cost_str
@@ -658,8 +679,8 @@ try:
                                 item.get("name"), 
                                 item.get("id"),
                                 item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
+                                *defined_cells(item),
+                                *freeform_cells(item),
                                 item.get(f"metered_bytes"),
                                 str(item.get(f"time_created")),
                                 total_cost_str
@@ -671,13 +692,20 @@ try:
                                 item.get("name"), 
                                 item.get("id"),
                                 item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
+                                *defined_cells(item),
+                                *freeform_cells(item),
                                 item.get(f"compute_count"),
                                 item.get(f"size_in_gbs"),
                                 str(item.get(f"time_created")),
                                 total_cost_str
                                 ])
+                if resource_type == "Volume Attachments":
+                    sheet.append([
+                                item.get("volume_id"),
+                                item.get("instance_id"),
+                                item.get("state"),
+                                item.get("availability_domain")
+                                ])
                 if resource_type == "Daily Costs":
                     sheet.append([
                                 item.get("compartment_name"), 
@@ -695,7 +723,7 @@ try:
     summary_data = {}
     for compartment, resource_types in resources.items():
         for resource_type, resource_list in resource_types.items():
-          if resource_type != "Daily Costs":  
+          if resource_type not in ("Daily Costs", "Volume Attachments"):  
             summary_data[resource_type] = summary_data.get(resource_type, 0) + len(resource_list)
 
     for resource_type, count in summary_data.items():
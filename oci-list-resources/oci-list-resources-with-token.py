@@ -8,6 +8,11 @@ import os
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
 from openpyxl.chart import PieChart, BarChart, Reference
+from oci_records import AutonomousDatabaseRecord, BlockVolumeBackupRecord, BlockVolumeRecord, BootVolumeBackupRecord, BootVolumeRecord, ComputeInstanceRecord, DailyCostRecord, FileSystemRecord, SearchResourceRecord, VolumeAttachmentRecord
+from oci_export import ATTACHED_VOLUME_TYPES, INVENTORY_SCHEMAS, SHEET_COLUMNS, BackgroundWriter, InventoryCounters, JsonlSink, ParallelXlsxWriter, ParquetSink, ShardedJsonlSink, SqliteSink, TagColumns, attachment_index, join_attachments, write_resource_sheets
+from oci_raw_json import enable_raw_json, list_items
+from oci_profiling import ApiStats, MemoryProfiler, Tracer
+from oci_costs import CostCube, CostMatrixBuilder, CostReconciler, DailyCostSpool, ShardedUsageFetcher, fetch_cost_totals, ocid_region, summarized_usage_items, summarized_usages_details, top_level_compartment_shards, update_cost_cube
 
 # Pre-requisites 
 # Step.1 (required) Run:
@@ -20,6 +25,42 @@ from openpyxl.chart import PieChart, BarChart, Reference
 #        python oci-list-all-with-token.py <date_from> <date_to>
 # Example:
 #        python oci-list-all-with-token.py 2025-10-01T00:00:00Z 2025-11-25T00:00:00Z
+# Options (may appear anywhere on the command line):
+#        --spill-daily-costs   sort Daily Costs out of core (sorted runs spilled to disk, k-way merged on export)
+#        --daily-costs-csv     write Daily Costs to oci_daily_costs_<region>_<namespace>_<date>.csv instead of the sheet
+#        --cost-totals         fetch only per-resource totals (time-aggregated by the Usage API) and skip the Daily Costs sheet;
+#                              daily rows are still fetched when --spill-daily-costs or --daily-costs-csv is given
+#        --cost-cube           append the days not loaded yet to oci_cost_cube_<namespace>.npz (region x compartment x service x day),
+#                              re-fetching the last 3 loaded days (billing may still have been incomplete when they were
+#                              fetched), and add a "Cost Rollup" sheet answered from the cube
+#        --shard-costs         split the tenant-wide cost queries by service and run the shards in parallel
+#        --shard-costs-by-compartment   also split each service shard by top-level compartment
+#                              (plus a shard for compartments not in the list, e.g. deleted ones)
+#        --cost-matrix         save Daily Costs as a memory-mappable sparse resource x day matrix
+#                              in oci_cost_matrix_<namespace>_<date>/ (indptr/indices/data .npy + axes.json)
+#        --parallel-xlsx       render the resource sheets in worker processes and assemble the .xlsx from their parts
+#        --parquet             also export every sheet as typed Parquet files in oci_resources_<region>_<namespace>_<date>_parquet/
+#        --jsonl               append every record to oci_resources_<region>_<namespace>_<date>.jsonl as each compartment
+#                              is discovered (fsynced periodically, so an interrupted run keeps its partial results)
+#        --sqlite              also write oci_resources_<region>_<namespace>_<date>.db as discovery runs: one table per resource
+#                              type, a unified resources table, a tags key/value table and per-resource cost totals, all indexed
+#        --shards              write gzip JSONL shards split by region and resource type to oci_resources_<region>_<namespace>_<date>_shards/
+#                              (<region>/<type>.jsonl.gz + manifest.json with row counts and sha256); with --parquet the
+#                              Parquet files are split into region=<region> partitions as well
+#        --zstd                compress the --shards JSONL shards with zstd (.jsonl.zst) instead of gzip
+#        --raw-json            parse the bodies of the large list calls (instances, volumes, backups, search, objects)
+#                              straight from JSON (orjson when installed) instead of deserializing SDK models
+#        --denormalized-volumes   repeat each Block/Boot Volumes row once per attachment (with the attachment's state,
+#                              instance and AD) instead of one row per volume listing its instances
+#        --profile-memory      trace allocations (tracemalloc) and RSS at every phase boundary (bootstrap, discovery, cost fetch,
+#                              reconciliation, exports) and write oci_memory_profile_<region>_<namespace>_<date>.txt
+#                              with the per-phase peaks and the top allocation sites of each phase
+#        --api-stats           time every OCI API request (pages, response bytes, retries, throttles per operation, region and
+#                              compartment), add an "API Stats" sheet and write oci_api_stats_<region>_<namespace>_<date>.json
+#                              with the call counts and p50/p95/p99 latencies of each operation
+#        --trace               record the run as nested spans (run, region, compartment, collector, API request) and write them
+#                              as OTLP/JSON to oci_trace_<region>_<namespace>_<date>.json, loadable by trace viewers
+#                              (Jaeger, Grafana Tempo, ...) without a collector
 
 configAPI = oci.config.from_file(profile_name='DEFAULT')
 token_file = configAPI['security_token_file']
@@ -31,12 +72,36 @@ signer = oci.auth.signers.SecurityTokenSigner(token, private_key)
 
 # Get Home Region
 homeRegion = configAPI["region"] 
-region_param = sys.argv[1] if len(sys.argv) > 1 else homeRegion
-date_from_param = sys.argv[2] if len(sys.argv) > 2 else datetime.date.today().replace(day=1) # Get the first day of the current month
-date_to_param = sys.argv[3] if len(sys.argv) > 3 else datetime.date.today() # Get the current day of the current month
+cli_flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+cli_args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+region_param = cli_args[0] if len(cli_args) > 0 else homeRegion
+date_from_param = cli_args[1] if len(cli_args) > 1 else datetime.date.today().replace(day=1) # Get the first day of the current month
+date_to_param = cli_args[2] if len(cli_args) > 2 else datetime.date.today() # Get the current day of the current month
+daily_costs_csv = "--daily-costs-csv" in cli_flags
+spill_daily_costs = "--spill-daily-costs" in cli_flags or daily_costs_csv
+cost_totals_only = "--cost-totals" in cli_flags and not spill_daily_costs
+cost_cube_enabled = "--cost-cube" in cli_flags
+shard_costs_by_compartment = "--shard-costs-by-compartment" in cli_flags
+shard_costs = "--shard-costs" in cli_flags or shard_costs_by_compartment
+cost_matrix_enabled = "--cost-matrix" in cli_flags
+parallel_xlsx = "--parallel-xlsx" in cli_flags
+parquet_enabled = "--parquet" in cli_flags
+jsonl_enabled = "--jsonl" in cli_flags
+sqlite_enabled = "--sqlite" in cli_flags
+shard_output = "--shards" in cli_flags
+shard_compression = "zstd" if "--zstd" in cli_flags else "gzip"
+denormalized_volumes = "--denormalized-volumes" in cli_flags
+raw_json_enabled = "--raw-json" in cli_flags
+memory_profiler = MemoryProfiler(enabled="--profile-memory" in cli_flags)
+api_stats = ApiStats(enabled="--api-stats" in cli_flags)
+tracer = Tracer(enabled="--trace" in cli_flags)
+run_span = tracer.start_span("oci-list-resources", region=region_param, date_from=date_from_param, date_to=date_to_param)
+bootstrap_span = tracer.start_span("bootstrap")
 
 # Initialize OCI client for Identity in home region
 identity_client = oci.identity.IdentityClient({'region': homeRegion}, signer=signer)
+api_stats.instrument(identity_client)
+tracer.instrument(identity_client)
 
 # Get the list of subscribed regions
 region_subscriptions = identity_client.list_region_subscriptions(tenancy_id=configAPI["tenancy"]).data
@@ -44,10 +109,16 @@ print(f"Subscribed regions: {[r.region_name for r in region_subscriptions]}")
 
 # Get Object Storage namespace (global, doesn't need region-specific client)
 object_storage_client = oci.object_storage.ObjectStorageClient({'region': homeRegion}, signer=signer)
+if raw_json_enabled:
+    enable_raw_json(object_storage_client)
+api_stats.instrument(object_storage_client)
+tracer.instrument(object_storage_client)
 namespace = object_storage_client.get_namespace().data
 
 # Initialize Usage API client for home region only (costs are only available from home region)
 usage_client = oci.usage_api.UsageapiClient({'region': homeRegion}, signer=signer)
+api_stats.instrument(usage_client)
+tracer.instrument(usage_client)
 # usage_client = oci.usage_api.UsageapiClient({'region': region_param}, signer=signer)
 
 # Get tenancy ID
@@ -60,12 +131,28 @@ resources = {}
 findings = {}
 globalresources = {}
 cost_usage_reports = []  # Store cost and usage report metadata
+reconciler = CostReconciler()  # Per-resource cost totals, joined to the inventory after discovery
+daily_cost_spool = DailyCostSpool() if spill_daily_costs else None  # Out-of-core Daily Costs rows
+cost_cube = None  # Precomputed cost rollups, loaded and updated incrementally with --cost-cube
+cost_matrix_builder = CostMatrixBuilder() if cost_matrix_enabled else None  # Sparse resource x day costs
+xlsx_writer = None  # --parallel-xlsx sheet renderer, closed in the finally block
 
 # Create the from and to dates for the usage query - using the previous calendar month
 dateto = datetime.date.today().replace(day=1) # Get the first day of the current month
 month, year = (dateto.month-1, dateto.year) if dateto.month != 1 else (12, dateto.year-1)
 datefrom = dateto.replace(day=1, month=month, year=year) # Get the first day of the previous month
 scipt_start_time = datetime.datetime.now()
+# Incremental exports, written as each compartment is discovered; every sink runs on
+# its own writer thread so exporting overlaps with the API calls of the next compartment
+record_sinks = []
+if jsonl_enabled:
+    record_sinks.append(JsonlSink(f"oci_resources_{region_param}_{namespace}_{scipt_start_time.strftime('%Y-%m-%d')}.jsonl"))
+if sqlite_enabled:
+    record_sinks.append(SqliteSink(f"oci_resources_{region_param}_{namespace}_{scipt_start_time.strftime('%Y-%m-%d')}.db"))
+if shard_output:
+    record_sinks.append(ShardedJsonlSink(f"oci_resources_{region_param}_{namespace}_{scipt_start_time.strftime('%Y-%m-%d')}_shards", compression=shard_compression))
+record_sinks = [BackgroundWriter(record_sink) for record_sink in record_sinks]
+inventory_counters = InventoryCounters()  # Running counts for the Summary and Visualizations sheets
 
 # Cost and Usage Reports bucket name (standard OCI bucket for cost reports)
 cost_reports_bucket = f"bling_{tenancy_ocid}"
@@ -84,14 +171,15 @@ try:
     # List and download usage reports
     print(f"Listing usage reports from bucket: {cost_reports_bucket}")
     try:
-        usage_objects = oci.pagination.list_call_get_all_results(
+        usage_objects = list_items(
             object_storage_client.list_objects,
+            raw_json=raw_json_enabled,
             namespace_name=namespace,
             bucket_name=cost_reports_bucket,
             prefix=usage_reports_prefix
-        ).data.objects
+        )
         
-        print(f"  Found {len(usage_objects)} usage report files")
+        reports_before = len(cost_usage_reports)
         for obj in usage_objects:
             cost_usage_reports.append({
                 "report_type": "Usage",
@@ -117,6 +205,7 @@ try:
             #     print(f"    Downloaded: {obj.name}")
             # except oci.exceptions.ServiceError as download_error:
             #     print(f"    Warning: Could not download {obj.name}: {download_error.message}")
+        print(f"  Found {len(cost_usage_reports) - reports_before} usage report files")
                 
     except oci.exceptions.ServiceError as e:
         print(f"  Warning: Could not list usage reports: {e.message}")
@@ -124,14 +213,15 @@ try:
     # List and download cost reports
     print(f"Listing cost reports from bucket: {cost_reports_bucket}")
     try:
-        cost_objects = oci.pagination.list_call_get_all_results(
+        cost_objects = list_items(
             object_storage_client.list_objects,
+            raw_json=raw_json_enabled,
             namespace_name=namespace,
             bucket_name=cost_reports_bucket,
             prefix=cost_reports_prefix
-        ).data.objects
+        )
         
-        print(f"  Found {len(cost_objects)} cost report files")
+        reports_before = len(cost_usage_reports)
         for obj in cost_objects:
             cost_usage_reports.append({
                 "report_type": "Cost",
@@ -157,11 +247,14 @@ try:
             #     print(f"    Downloaded: {obj.name}")
             # except oci.exceptions.ServiceError as download_error:
             #     print(f"    Warning: Could not download {obj.name}: {download_error.message}")
+        print(f"  Found {len(cost_usage_reports) - reports_before} cost report files")
                 
     except oci.exceptions.ServiceError as e:
         print(f"  Warning: Could not list cost reports: {e.message}")
 
     print(f"Total reports found: {len(cost_usage_reports)}")
+    for record_sink in record_sinks:
+        record_sink.write_resources("COST_USAGE_REPORTS", {"Cost Usage Reports": cost_usage_reports})
 
 except oci.exceptions.ServiceError as e:
     print(f"Warning: Could not access cost/usage reports bucket: {e.message}")
@@ -178,12 +271,15 @@ try:
     ).data
     cmp_list.append(oci.identity.models.Compartment(id=tenancy_ocid, name=identity_client.get_compartment(tenancy_ocid).data.name)) # Add root compartment
     # cmp_list.append(identity_client.get_compartment(tenancy_ocid).data)  # Add root compartment
+    memory_profiler.checkpoint("bootstrap")
+    tracer.end_span(bootstrap_span)
     
     # Iterate over each subscribed region
     for region_subscription in region_subscriptions:
     #  if region_subscription.region_name.upper() != "AP-TOKYO-1":
      if region_subscription.region_name.upper() == region_param.upper():
         current_region = region_subscription.region_name
+        region_span = tracer.start_span(f"region {current_region}", region=current_region)
         print(f"\n{'='*60}")
         print(f"Switching to region: {current_region}")
         print(f"{'='*60}")
@@ -214,6 +310,12 @@ try:
         # Initialize ResourceSearchClient for this region
         resource_search_client = oci.resource_search.ResourceSearchClient({'region': current_region}, signer=signer)
         resource_search_client.base_client.set_region(current_region)
+        if raw_json_enabled:
+            enable_raw_json(compute_client, block_storage_client, resource_search_client)
+        api_stats.instrument(region_identity_client, virtual_network_client, compute_client, block_storage_client,
+                             file_storage_client, database_client, load_balancer_client, resource_search_client)
+        tracer.instrument(region_identity_client, virtual_network_client, compute_client, block_storage_client,
+                          file_storage_client, database_client, load_balancer_client, resource_search_client)
         # Note: usage_client is NOT region-specific - it uses home region client defined above
         
         # Fetch availability domains for this specific region using region-specific identity client
@@ -228,206 +330,222 @@ try:
                 resource_key = f"{compartment.id}_{current_region}"
                 resources[resource_key] = {}
                 findings[resource_key] = []
+                compartment_span = tracer.start_span(f"compartment {compartment.name}", compartment_id=compartment.id, region=current_region)
 
                 # Compute Instances
+                collector_span = tracer.start_span("Compute Instances")
                 for ad in region_ads:
-                    vm_list = oci.pagination.list_call_get_all_results(
-                        compute_client.list_instances,
+                    # Boot volume attachments by instance, kept as (boot_volume_id, state) so the
+                    # SDK models are dropped as each page is read
+                    vm_boot_volumes = {}
+                    for bva in oci.pagination.list_call_get_all_results_generator(
+                        compute_client.list_boot_volume_attachments,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
-                    bv_attachments = oci.pagination.list_call_get_all_results(
-                        compute_client.list_boot_volume_attachments,
+                    ):
+                        vm_boot_volumes.setdefault(bva.instance_id, []).append((bva.boot_volume_id, bva.lifecycle_state))
+                    vm_list = list_items(
+                        compute_client.list_instances,
+                        raw_json=raw_json_enabled,
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data   
+                    )
                     vm_findings = []        
                     for vm in vm_list:        
-                        for bva in bv_attachments:
-                            if vm.id == bva.instance_id:
-                                resources[resource_key].setdefault("Compute Instances", []).append({
-                                    "compartment_name": compartment.name,
-                                    "region": current_region,
-                                    "name": vm.display_name,
-                                    "id": vm.id,
-                                    "state": vm.lifecycle_state,
-                                    "attached_to" : bva.boot_volume_id,
-                                    "volume_state": bva.lifecycle_state,
-                                    "availability_domain" : vm.availability_domain,
-                                    "defined_tags" : vm.defined_tags,
-                                    "freeform_tags" : vm.freeform_tags,
-                                    "time_created" : str((f"{vm.time_created}"))
-                                })                   
+                        for boot_volume_id, volume_state in vm_boot_volumes.get(vm.id, ()):
+                            resources[resource_key].setdefault("Compute Instances", []).append(ComputeInstanceRecord(
+                                compartment_name=compartment.name,
+                                region=current_region,
+                                name=vm.display_name,
+                                id=vm.id,
+                                state=vm.lifecycle_state,
+                                attached_to=boot_volume_id,
+                                volume_state=volume_state,
+                                availability_domain=vm.availability_domain,
+                                defined_tags=vm.defined_tags,
+                                freeform_tags=vm.freeform_tags,
+                                time_created=vm.time_created
+                            ))
                 findings[resource_key].extend(vm_findings)
                 
                 # Block Volumes
+                tracer.end_span(collector_span)
+                collector_span = tracer.start_span("Block Volumes")
                 for ad in region_ads:
-                    bv_list = oci.pagination.list_call_get_all_results(
+                    bv_list = list_items(
                         block_storage_client.list_volumes,
+                        raw_json=raw_json_enabled,
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
-                    bv_attachments = oci.pagination.list_call_get_all_results(
+                    )
+                    bv_attachments = oci.pagination.list_call_get_all_results_generator(
                         compute_client.list_volume_attachments,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data 
+                    )
                     bv_findings = []           
                     for bv in bv_list:
-                        resources[resource_key].setdefault("Block Volumes", []).append({
-                            "compartment_name": compartment.name,
-                            "region": current_region,
-                            "name": bv.display_name,
-                            "id": bv.id,
-                            "state": bv.lifecycle_state,
-                            "defined_tags" : bv.defined_tags,
-                            "freeform_tags" : bv.freeform_tags,
-                            "size_in_gbs" : bv.size_in_gbs,
-                            "time_created" : str((f"{bv.time_created}"))
-                        })
-                        for bva in bv_attachments:
-                            if bv.id == bva.volume_id:
-                                resources[resource_key].setdefault("Block Volumes", []).append({
-                                    "compartment_name": compartment.name,
-                                    "region": current_region,
-                                    "name": bv.display_name,
-                                    "id": bv.id,
-                                    "state": bva.lifecycle_state,
-                                    "defined_tags" : bv.defined_tags,
-                                    "freeform_tags" : bv.freeform_tags,
-                                    "attached_to_instance" : bva.instance_id,
-                                    "size_in_gbs" : bv.size_in_gbs,
-                                    "time_created" : str((f"{bv.time_created}"))
-                                })                       
+                        resources[resource_key].setdefault("Block Volumes", []).append(BlockVolumeRecord(
+                            compartment_name=compartment.name,
+                            region=current_region,
+                            name=bv.display_name,
+                            id=bv.id,
+                            state=bv.lifecycle_state,
+                            defined_tags=bv.defined_tags,
+                            freeform_tags=bv.freeform_tags,
+                            size_in_gbs=bv.size_in_gbs,
+                            time_created=bv.time_created
+                        ))
+                    # Attachments are kept as their own relation, joined with the volumes on export
+                    for bva in bv_attachments:
+                        resources[resource_key].setdefault("Volume Attachments", []).append(VolumeAttachmentRecord(
+                            volume_id=bva.volume_id,
+                            instance_id=bva.instance_id,
+                            state=bva.lifecycle_state,
+                            availability_domain=bva.availability_domain
+                        ))
                 findings[resource_key].extend(bv_findings)
 
                 # Block Volumes Bkp
-                bvBkp_list = oci.pagination.list_call_get_all_results(
+                tracer.end_span(collector_span)
+                collector_span = tracer.start_span("Block Volumes Bkp")
+                bvBkp_list = list_items(
                     block_storage_client.list_volume_backups,
+                    raw_json=raw_json_enabled,
                     compartment_id=compartment.id
-                ).data
+                )
                 bv_findings = []
                 for bvBkp in bvBkp_list:
-                    resources[resource_key].setdefault("Block Volumes Bkp", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": bvBkp.display_name,
-                        "id": bvBkp.id,
-                        "state": bvBkp.lifecycle_state,
-                        "defined_tags" : bvBkp.defined_tags,
-                        "freeform_tags" : bvBkp.freeform_tags,
-                        "attached_to" : bvBkp.volume_id,
-                        "size_in_gbs" : bvBkp.size_in_gbs,
-                        "time_created" : str((f"{bvBkp.time_created}"))
-                    })
+                    resources[resource_key].setdefault("Block Volumes Bkp", []).append(BlockVolumeBackupRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=bvBkp.display_name,
+                        id=bvBkp.id,
+                        state=bvBkp.lifecycle_state,
+                        defined_tags=bvBkp.defined_tags,
+                        freeform_tags=bvBkp.freeform_tags,
+                        attached_to=bvBkp.volume_id,
+                        size_in_gbs=bvBkp.size_in_gbs,
+                        time_created=bvBkp.time_created
+                    ))
                 findings[resource_key].extend(bv_findings)
 
                 # Boot Volumes
+                tracer.end_span(collector_span)
+                collector_span = tracer.start_span("Boot Volumes")
                 for ad in region_ads:
-                    bv_list = oci.pagination.list_call_get_all_results(
+                    bv_list = list_items(
                         block_storage_client.list_boot_volumes,
+                        raw_json=raw_json_enabled,
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
-                    bv_attachments = oci.pagination.list_call_get_all_results(
+                    )
+                    bv_attachments = oci.pagination.list_call_get_all_results_generator(
                         compute_client.list_boot_volume_attachments,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data   
+                    )
                     bv_findings = []        
                     for bv in bv_list:
-                        resources[resource_key].setdefault("Boot Volumes", []).append({
-                            "compartment_name": compartment.name,
-                            "region": current_region,
-                            "name": bv.display_name,
-                            "id": bv.id,
-                            "state": bv.lifecycle_state,
-                            "defined_tags" : bv.defined_tags,
-                            "freeform_tags" : bv.freeform_tags,
-                            "size_in_gbs" : bv.size_in_gbs,
-                            "time_created" : str((f"{bv.time_created}"))
-                        })          
-                        for bva in bv_attachments:
-                            if bv.id == bva.boot_volume_id:
-                                resources[resource_key].setdefault("Boot Volumes", []).append({
-                                    "compartment_name": compartment.name,
-                                    "region": current_region,
-                                    "name": bv.display_name,
-                                    "id": bv.id,
-                                    "state": bva.lifecycle_state,
-                                    "defined_tags" : bv.defined_tags,
-                                    "freeform_tags" : bv.freeform_tags,
-                                    "attached_to_instance" : bva.instance_id,
-                                    "availability_domain" : ad.name,
-                                    "size_in_gbs" : bv.size_in_gbs,
-                                    "time_created" : str((f"{bv.time_created}"))
-                                })                       
+                        resources[resource_key].setdefault("Boot Volumes", []).append(BootVolumeRecord(
+                            compartment_name=compartment.name,
+                            region=current_region,
+                            name=bv.display_name,
+                            id=bv.id,
+                            state=bv.lifecycle_state,
+                            defined_tags=bv.defined_tags,
+                            freeform_tags=bv.freeform_tags,
+                            availability_domain=bv.availability_domain,
+                            size_in_gbs=bv.size_in_gbs,
+                            time_created=bv.time_created
+                        ))
+                    for bva in bv_attachments:
+                        resources[resource_key].setdefault("Volume Attachments", []).append(VolumeAttachmentRecord(
+                            volume_id=bva.boot_volume_id,
+                            instance_id=bva.instance_id,
+                            state=bva.lifecycle_state,
+                            availability_domain=bva.availability_domain
+                        ))
                 findings[resource_key].extend(bv_findings)
 
                 # Boot Volumes Bkp
-                bvBkp_list = oci.pagination.list_call_get_all_results(
+                tracer.end_span(collector_span)
+                collector_span = tracer.start_span("Boot Volumes Bkp")
+                bvBkp_list = list_items(
                     block_storage_client.list_boot_volume_backups,
+                    raw_json=raw_json_enabled,
                     compartment_id=compartment.id
-                ).data
+                )
                 bv_findings = []
                 for bv in bvBkp_list:
-                    resources[resource_key].setdefault("Boot Volumes Bkp", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": bv.display_name,
-                        "id": bv.id,
-                        "state": bv.lifecycle_state,
-                        "defined_tags" : bv.defined_tags,
-                        "freeform_tags" : bv.freeform_tags,
-                        "size_in_gbs" : bv.size_in_gbs,
-                        "time_created" : str((f"{bv.time_created}"))
-                    })
+                    resources[resource_key].setdefault("Boot Volumes Bkp", []).append(BootVolumeBackupRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=bv.display_name,
+                        id=bv.id,
+                        state=bv.lifecycle_state,
+                        defined_tags=bv.defined_tags,
+                        freeform_tags=bv.freeform_tags,
+                        size_in_gbs=bv.size_in_gbs,
+                        time_created=bv.time_created
+                    ))
                 findings[resource_key].extend(bv_findings)
 
                 # File Systems 
+                tracer.end_span(collector_span)
+                collector_span = tracer.start_span("File Systems")
                 for ad in region_ads:  
-                    fss_list = oci.pagination.list_call_get_all_results(
+                    fss_list = oci.pagination.list_call_get_all_results_generator(
                         file_storage_client.list_file_systems,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
+                    )
                     fss_findings = []
                     for fss in fss_list:
-                        resources[resource_key].setdefault("File Systems", []).append({
-                            "compartment_name": compartment.name,
-                            "region": current_region,
-                            "name": fss.display_name,
-                            "id": fss.id,
-                            "state": fss.lifecycle_state,
-                            "defined_tags" : fss.defined_tags,
-                            "freeform_tags" : fss.freeform_tags,
-                            "metered_bytes" : fss.metered_bytes,
-                            "time_created" : str((f"{fss.time_created}"))
-                        })
+                        resources[resource_key].setdefault("File Systems", []).append(FileSystemRecord(
+                            compartment_name=compartment.name,
+                            region=current_region,
+                            name=fss.display_name,
+                            id=fss.id,
+                            state=fss.lifecycle_state,
+                            defined_tags=fss.defined_tags,
+                            freeform_tags=fss.freeform_tags,
+                            metered_bytes=fss.metered_bytes,
+                            time_created=fss.time_created
+                        ))
                     findings[resource_key].extend(fss_findings)
 
                 # Autonomous Databases
-                adb_list = oci.pagination.list_call_get_all_results(
+                tracer.end_span(collector_span)
+                collector_span = tracer.start_span("Autonomous Databases")
+                adb_list = oci.pagination.list_call_get_all_results_generator(
                     database_client.list_autonomous_databases,
+                    "record",
                     compartment_id=compartment.id
-                ).data
+                )
                 adb_findings = []
                 for adb in adb_list:
-                    resources[resource_key].setdefault("Autonomous Databases", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": adb.display_name,
-                        "id": adb.id,
-                        "state": adb.lifecycle_state,
-                        "defined_tags" : adb.defined_tags,
-                        "freeform_tags" : adb.freeform_tags,
-                        "ocups": adb.compute_count,
-                        "size_in_gbs" : adb.data_storage_size_in_gbs,
-                        "time_created" : str((f"{adb.time_created}"))
-                    })
+                    resources[resource_key].setdefault("Autonomous Databases", []).append(AutonomousDatabaseRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=adb.display_name,
+                        id=adb.id,
+                        state=adb.lifecycle_state,
+                        defined_tags=adb.defined_tags,
+                        freeform_tags=adb.freeform_tags,
+                        ocups=adb.compute_count,
+                        size_in_gbs=adb.data_storage_size_in_gbs,
+                        time_created=adb.time_created
+                    ))
                 findings[resource_key].extend(adb_findings)
 
                 # All Resources using ResourceSearchClient
+                tracer.end_span(collector_span)
+                collector_span = tracer.start_span("All Resources")
                 print(f"  Discovering all resources using Resource Search API in compartment: {compartment.name}")
                 try:
                     # Query all resources in the compartment using a single query
@@ -436,27 +554,37 @@ try:
                         type='Structured',
                         matching_context_type=oci.resource_search.models.SearchDetails.MATCHING_CONTEXT_TYPE_NONE
                     )
-                    search_results = oci.pagination.list_call_get_all_results(
+                    search_results = list_items(
                         resource_search_client.search_resources,
+                        raw_json=raw_json_enabled,
                         search_details=structured_search
-                    ).data
+                    )
                     
-                    if len(search_results) > 0:
-                        for item in search_results:
-                            resources[resource_key].setdefault("All Resources", []).append({
-                                "compartment_name": compartment.name,
-                                "region": current_region,
-                                "resource_type": item.resource_type,
-                                "name": item.display_name,
-                                "id": item.identifier,
-                                "state": item.lifecycle_state,
-                                "defined_tags": item.defined_tags,
-                                "freeform_tags": item.freeform_tags,
-                                "time_created": str(item.time_created) if item.time_created else "N/A"
-                            })
-                        print(f"    Found {len(search_results)} resources")
+                    search_count = 0
+                    for item in search_results:
+                        resources[resource_key].setdefault("All Resources", []).append(SearchResourceRecord(
+                            compartment_name=compartment.name,
+                            region=current_region,
+                            resource_type=item.resource_type,
+                            name=item.display_name,
+                            id=item.identifier,
+                            state=item.lifecycle_state,
+                            defined_tags=item.defined_tags,
+                            freeform_tags=item.freeform_tags,
+                            time_created=str(item.time_created) if item.time_created else "N/A"
+                        ))
+                        search_count += 1
+                    if search_count > 0:
+                        print(f"    Found {search_count} resources")
                 except oci.exceptions.ServiceError as e:
                     print(f"  Warning: Resource Search API error: {e.message}")
+                tracer.end_span(collector_span)
+
+                # Persist this compartment/region before moving on to the next one
+                inventory_counters.write_resources(resource_key, resources[resource_key], findings[resource_key])
+                for record_sink in record_sinks:
+                    record_sink.write_resources(resource_key, resources[resource_key], findings[resource_key])
+                tracer.end_span(compartment_span, records=sum(len(items) for items in resources[resource_key].values()))
 
             # Usage Costs - Compute
 
@@ -474,6 +602,9 @@ try:
             # ]
             # )
 
+        memory_profiler.checkpoint(f"discovery {current_region}")
+        tracer.end_span(region_span)
+
         if compartment.id.startswith("ocid1.tenancy.oc1..") and current_region.upper() == homeRegion.upper(): 
             print(f"Discovering Costs in Root Compartment: {compartment.name}")
             print(f"Date from: {date_from_param} to Date to: {date_to_param}")
@@ -481,127 +612,125 @@ try:
             # print(f"Date from: {datefrom} to Date to: {dateto }")
             resources[compartment.id] = {}
             findings[compartment.id] = []
+            cost_span = tracer.start_span("cost fetch", region=homeRegion)
 
             # Enable debug logging
             #oci.base_client.is_http_log_enabled(True)
 
+            # Sharded cost queries: one request per service (and top-level compartment), run in parallel
+            cost_fetcher = None
+            if shard_costs:
+                cost_fetcher = ShardedUsageFetcher(
+                    lambda: tracer.instrumented(api_stats.instrumented(oci.usage_api.UsageapiClient({'region': homeRegion}, signer=signer))),
+                    tenancy_ocid,
+                    compartment_shards=top_level_compartment_shards(cmp_list, tenancy_ocid) if shard_costs_by_compartment else None
+                )
+
+            if cost_totals_only:
+                # Totals mode: one time-aggregated row per resource, no Daily Costs sheet
+                cost_rows = fetch_cost_totals(usage_client, reconciler, tenancy_ocid, date_from_param, date_to_param, fetcher=cost_fetcher)
+                print(f"Cost totals fetched for {cost_rows} resources")
+
             # usage_list = oci.pagination.list_call_get_all_results(
-            costs_list = usage_client.request_summarized_usages(
-                request_summarized_usages_details=oci.usage_api.models.RequestSummarizedUsagesDetails(
+            daily_costs_details = summarized_usages_details(
                 # compartment_id=compartment.id,
-                tenant_id=tenancy_ocid,
-                time_usage_started=date_from_param,
-                time_usage_ended=date_to_param,
+                tenancy_ocid=tenancy_ocid,
+                date_from=date_from_param,
+                date_to=date_to_param,
                 # time_usage_started=(datefrom.strftime('%Y-%m-%dT%H:%M:%SZ')),
                 # time_usage_ended=(dateto.strftime('%Y-%m-%dT%H:%M:%SZ')),
                 granularity="DAILY",
                 # filter=filter_details,
-                is_aggregate_by_time=False,
-                query_type="COST",
-                group_by=["resourceId"],
+                aggregate_by_time=False,
                 # group_by_tag=[
                 #     oci.usage_api.models.Tag( # Return results by the CreatedBy tag, which will indicate the user who created the resource (who the usage cost will be attributed to)
                 #         namespace="Oracle-Tags",
                 #         key="CreatedBy")],
                 # compartment_depth=1
-                compartment_depth=6              
-                )
+                compartment_depth=6
             )
+            # Daily rows are only downloaded when the Daily Costs sheet (or CSV) is produced
+            if cost_totals_only:
+                daily_costs = []
+            elif cost_fetcher is not None:
+                daily_costs = cost_fetcher.items(daily_costs_details)
+            else:
+                daily_costs = summarized_usage_items(usage_client, daily_costs_details)
             cost_findings = []
-            for cost in costs_list.data.items:
+            # Spilled rows skip resources, so they reach the record sinks in batches as they are fetched
+            spilled_costs = []
+            for cost in daily_costs:
                 start_time = cost.time_usage_started.strftime("%Y-%m-%d")
                 # Extract region from resource OCID
-                region_from_ocid = "unknown"
-                if cost.resource_id:
-                    parts = cost.resource_id.split(".")
-                    if len(parts) >= 4:
-                        region_from_ocid = parts[3] if parts[3] else "unknown"
-                resources[compartment.id].setdefault("Daily Costs", []).append({
-                    "compartment_name": compartment.name,
-                    "region": region_from_ocid,
-                    "id": cost.resource_id,
-                    "currency": cost.currency,
-                    "cost": cost.computed_amount,
-                    "starttime": start_time
-                })
+                region_from_ocid = ocid_region(cost.resource_id)
+                reconciler.add_cost(cost.resource_id, cost.computed_amount, cost.currency, region_from_ocid)
+                if cost_matrix_builder is not None:
+                    cost_matrix_builder.add(cost.resource_id, start_time, cost.computed_amount)
+                if daily_cost_spool is not None:
+                    daily_cost_spool.add_cost(compartment.name, region_from_ocid, cost.resource_id, cost.currency, cost.computed_amount, start_time)
+                    if not record_sinks:
+                        continue
+                daily_cost = DailyCostRecord(
+                    compartment_name=compartment.name,
+                    region=region_from_ocid,
+                    id=cost.resource_id,
+                    currency=cost.currency,
+                    cost=cost.computed_amount,
+                    starttime=start_time
+                )
+                if daily_cost_spool is None:
+                    resources[compartment.id].setdefault("Daily Costs", []).append(daily_cost)
+                    continue
+                spilled_costs.append(daily_cost)
+                if len(spilled_costs) >= 5000:
+                    for record_sink in record_sinks:
+                        record_sink.write_resources(compartment.id, {"Daily Costs": spilled_costs}, [])
+                    spilled_costs = []
+            if spilled_costs:
+                for record_sink in record_sinks:
+                    record_sink.write_resources(compartment.id, {"Daily Costs": spilled_costs}, [])
             findings[compartment.id].extend(cost_findings)
+            inventory_counters.write_resources(compartment.id, resources[compartment.id], findings[compartment.id])
+            for record_sink in record_sinks:
+                record_sink.write_resources(compartment.id, resources[compartment.id], findings[compartment.id])
+
+            # Sparse resource x day cost matrix for time-series analysis
+            if cost_matrix_builder is not None:
+                cost_matrix = cost_matrix_builder.build()
+                cost_matrix_builder = None
+                cost_matrix_dir = f"oci_cost_matrix_{namespace}_{datetime.datetime.now().strftime('%Y-%m-%d')}"
+                cost_matrix.save(cost_matrix_dir)
+                print(f"Cost matrix {cost_matrix.shape[0]} resources x {cost_matrix.shape[1]} days ({cost_matrix.nnz} non-zero cells) saved to: {cost_matrix_dir}")
+
+            # Cost cube: only the days missing from the saved cube are fetched
+            if cost_cube_enabled:
+                cost_cube_file_name = f"oci_cost_cube_{namespace}.npz"
+                cost_cube = CostCube.load(cost_cube_file_name)
+                cube_rows = update_cost_cube(usage_client, cost_cube, tenancy_ocid, date_from_param, date_to_param, fetcher=cost_fetcher)
+                cost_cube.save(cost_cube_file_name)
+                print(f"Cost cube updated with {cube_rows} rows ({len(cost_cube.days)} days) saved to: {cost_cube_file_name}")
+            tracer.end_span(cost_span, cost_rows=reconciler.cost_rows)
+        memory_profiler.checkpoint("cost fetch")
+        reconciliation_span = tracer.start_span("reconciliation")
     
-        # Build a set of all existing resource IDs from all Resource sheets
-        existing_resource_ids = set()
-        for resource_key, resource_data in resources.items():
-            for resource_type, resource_list in resource_data.items():
-                if resource_type != "Daily Costs":
-                    for item in resource_list:
-                        if item.get("id"):
-                            existing_resource_ids.add(item.get("id"))
-        
-        print(f"\nTotal existing resources found: {len(existing_resource_ids)}")
-        
-        # Collect all unique cost-incurring resource IDs and aggregate their total cost
-        # Extract region from OCID (format: ocid1.<resource_type>.<realm>.<region>.<unique_id>)
-        cost_resource_ids = {}
-        for resource_key, resource_data in resources.items():
-            for cost_item in resource_data.get("Daily Costs", []):
-                resource_id = cost_item.get("id")
-                if resource_id:
-                    # Extract region from OCID
-                    region_from_ocid = "unknown"
-                    parts = resource_id.split(".")
-                    if len(parts) >= 4:
-                        region_from_ocid = parts[3] if parts[3] else "unknown"
-                    
-                    if resource_id not in cost_resource_ids:
-                        cost_resource_ids[resource_id] = {
-                            "total_cost": 0,
-                            "currency": cost_item.get("currency"),
-                            "region": region_from_ocid
-                        }
-                    cost_resource_ids[resource_id]["total_cost"] += cost_item.get("cost", 0) or 0
-        
-        print(f"Total cost-incurring resources: {len(cost_resource_ids)}")
-        
-        # Aggregate costs by region
-        # costs_by_region = {}
-        # for resource_id, cost_info in cost_resource_ids.items():
-        #     region = cost_info.get("region", "unknown")
-        #     if region not in costs_by_region:
-        #         costs_by_region[region] = {"total_cost": 0, "resource_count": 0}
-        #     costs_by_region[region]["total_cost"] += cost_info.get("total_cost", 0)
-        #     costs_by_region[region]["resource_count"] += 1
-        
-        # print(f"\nCosts aggregated by region:")
-        # for region, data in sorted(costs_by_region.items()):
-        #     print(f"  {region}: {data['total_cost']:.12f} ({data['resource_count']} resources)")
-        
-        # Find resources that incurred costs but no longer exist
-        deleted_resource_ids = set(cost_resource_ids.keys()) - existing_resource_ids
-        # Filter out None and empty strings
-        deleted_resource_ids = {rid for rid in deleted_resource_ids if rid}
-        
+        # Join Daily Costs to the discovered inventory by OCID
+        reconciler.add_inventory(resources)
+        cost_resource_ids = reconciler.cost_index
+        matched_resource_ids, deleted_resource_ids, uncosted_resource_ids = reconciler.reconcile()
+
+        print(f"\nTotal existing resources found: {len(reconciler.inventory_index)}")
+        print(f"Total cost-incurring resources: {len(cost_resource_ids)} (from {reconciler.cost_rows} cost rows)")
+        print(f"Existing resources with costs: {len(matched_resource_ids)}")
+        print(f"Existing resources without costs: {len(uncosted_resource_ids)}")
         print(f"Deleted/Not found resources with costs: {len(deleted_resource_ids)}")
         
-        # Map OCID prefixes to resource types
-        ocid_to_resource_type = {
-            "ocid1.instance.": "Compute Instances",
-            "ocid1.volume.": "Block Volumes",
-            "ocid1.volumebackup.": "Block Volumes Bkp",
-            "ocid1.bootvolume.": "Boot Volumes",
-            "ocid1.bootvolumebackup.": "Boot Volumes Bkp",
-            "ocid1.filesystem.": "File Systems",
-            "ocid1.autonomousdatabase.": "Autonomous Databases",
-        }
-        
         # Add deleted resources to appropriate Resource sheets
         deleted_resources_key = "DELETED_RESOURCES"
         resources[deleted_resources_key] = {}
         
         for resource_id in deleted_resource_ids:
-            # Determine resource type from OCID
-            resource_type = "Unknown"
-            for ocid_prefix, rtype in ocid_to_resource_type.items():
-                if resource_id and resource_id.startswith(ocid_prefix):
-                    resource_type = rtype
-                    break
+            # Determine resource type from the OCID type segment
+            resource_type = reconciler.classify(resource_id)
             
             # Get region from cost_resource_ids (already extracted from OCID)
             cost_info = cost_resource_ids.get(resource_id, {})
@@ -641,11 +770,23 @@ try:
                 deleted_entry["size_in_gbs"] = "N/A"
             
             resources[deleted_resources_key].setdefault(resource_type, []).append(deleted_entry)
+        inventory_counters.write_resources(deleted_resources_key, resources[deleted_resources_key])
+        for record_sink in record_sinks:
+            record_sink.write_resources(deleted_resources_key, resources[deleted_resources_key])
+            record_sink.write_costs(cost_resource_ids)
         
         # Count deleted resources by type
         for rtype, rlist in resources.get(deleted_resources_key, {}).items():
             print(f"  - {rtype}: {len(rlist)} deleted resources with costs")
+        memory_profiler.checkpoint("reconciliation")
+        tracer.end_span(reconciliation_span)
         
+    export_span = tracer.start_span("export")
+    # Discovery totals from the running counters
+    print(f"\nDiscovered resources by type ({inventory_counters.findings} findings):")
+    for resource_type, count in inventory_counters.inventory_counts().items():
+        print(f"  - {resource_type}: {count}")
+
     # Get current date for the file name
     current_date = datetime.datetime.now().strftime("%Y-%m-%d")
    
@@ -658,16 +799,47 @@ try:
     #     json.dump({"resources": resources, "findings": findings}, file, indent=4)
 
     # print(f"Resource discovery and validation completed. Results saved to: {file_name}")
+
+    # Flattened tag columns ("namespace.key") of every resource type, shared by the Parquet and XLSX exports
+    tag_columns = TagColumns().scan(resources)
+
+    # Export typed Parquet files, one per resource type
+    if parquet_enabled:
+        parquet_dir = f"oci_resources_{region_param}_{namespace}_{current_date}_parquet"
+        volume_attachments = attachment_index(resources)
+        with ParquetSink(parquet_dir, tag_columns=tag_columns, shard_by_region=shard_output) as parquet_sink:
+            for resource_type in INVENTORY_SCHEMAS:
+                if resource_type == "Cost Usage Reports":
+                    for report in cost_usage_reports:
+                        parquet_sink.write(resource_type, report)
+                elif resource_type == "Daily Costs" and daily_cost_spool is not None:
+                    for compartment_name, region, resource_id, currency, cost, starttime in daily_cost_spool:
+                        parquet_sink.write(resource_type, {}, compartment_name=compartment_name, region=region, id=resource_id, currency=currency, cost=cost, starttime=starttime)
+                else:
+                    for resource_key, resource_data in resources.items():
+                        items = resource_data.get(resource_type, [])
+                        if resource_type in ATTACHED_VOLUME_TYPES:
+                            items = join_attachments(items, volume_attachments)
+                        for item in items:
+                            cost_info = cost_resource_ids.get(item.get("id"))
+                            if "total_cost_in_period" in item or cost_info is None:
+                                parquet_sink.write(resource_type, item)
+                            else:
+                                parquet_sink.write(resource_type, item, total_cost_in_period=cost_info["total_cost"])
+        for resource_type, count in parquet_sink.counts.items():
+            print(f"  - {resource_type}: {count} rows saved to {parquet_sink.path(resource_type)}")
+        memory_profiler.checkpoint("parquet export")
     
     # # Export data to Excel
-    workbook = Workbook()
-    summary_sheet = workbook.active
+    # Write-only workbook: rows are streamed to disk as they are appended instead of being held in memory
+    workbook = Workbook(write_only=True)
+    xlsx_writer = ParallelXlsxWriter(workbook) if parallel_xlsx else None
     # summary_sheet.title = "Findings Summary"
     script_end_time = datetime.datetime.now()
-    summary_sheet = workbook.active
-    summary_sheet.title = "Summary"
+    summary_sheet = workbook.create_sheet(title="Summary")
     summary_sheet.append(["started_at", "completed_at"])
     summary_sheet.append([str((f"{scipt_start_time}")), str((f"{script_end_time}"))])
+    inventory_counters.write_summary(summary_sheet)
 
     # # Add findings summary
     # summary_sheet.append(["Compartment", "Remarks"])
@@ -705,202 +877,37 @@ try:
     # bar_chart.y_axis.title = "Number of Issues"
     # summary_sheet.add_chart(bar_chart, f"E{summary_start_row}")
 
-    # Add data sheets for each resource type
-    for resource_type in ["Daily Costs",
+    # Add data sheets for each resource type, filled in a single pass over the inventory
+    # (spilled Daily Costs are merged into their sheet afterwards)
+    sheet_titles = (["Daily Costs"] if not cost_totals_only else []) + [
                         "Compute Instances", 
                         "Block Volumes", 
                         "Block Volumes Bkp", 
                         "Boot Volumes",
                         "Boot Volumes Bkp",
                         "File Systems",
-                        "Autonomous Databases"]:
-        sheet = workbook.create_sheet(title=resource_type)   
-        if resource_type == "Compute Instances":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "BootVolume_state", "Availability_domain", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Block Volumes":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Block Volumes Bkp":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Boot Volumes":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "Availability_domain" , "Size_in_gbs", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Boot Volumes Bkp":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
-        if resource_type == "File Systems":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags" , "Metered_bytes", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Autonomous Databases":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags" , "Ocpus", "Size_in_gbs", "Time_created", "Total_cost_in_period"])    
-        if resource_type == "Daily Costs":
-            sheet.append(["Compartment", "Region", "ID", "Currency", "Cost", "Starttime"])              
-        
-        for compartment, resource_data in resources.items():
-            for item in resource_data.get(resource_type, []):
-                # Get total cost for this resource from cost_resource_ids
-                resource_id = item.get("id")
-                total_cost_str = item.get("total_cost_in_period", "")  # For deleted resources
-                if not total_cost_str and resource_id and resource_id in cost_resource_ids:
-                    cost_info = cost_resource_ids[resource_id]
-                    total_cost_str = f"{cost_info['total_cost']:.12f}"
-                           
-                if resource_type == "Compute Instances":
-                    sheet.append([
-                             item.get("compartment_name"),
-                             item.get("region"), 
-                             item.get("name"), 
-                             item.get("id"),
-                             item.get("state"),
-                             str(item.get(f"defined_tags")),
-                             str(item.get(f"freeform_tags")),
-                             str(item.get(f"attached_to")),
-                             str(item.get(f"volume_state")),
-                             str(item.get(f"availability_domain")),
-                             str(item.get(f"time_created")),
-                             total_cost_str
-                             ])
-                if resource_type == "Block Volumes":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                str(item.get(f"attached_to_instance")),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Block Volumes Bkp":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                str(item.get(f"attached_to")),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Boot Volumes":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                str(item.get(f"attached_to_instance")),
-                                str(item.get(f"availability_domain")),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Boot Volumes Bkp":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "File Systems":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                item.get(f"metered_bytes"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Autonomous Databases":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                item.get(f"compute_count"),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Daily Costs":
-                    # Daily Costs are handled separately with sorting
-                    pass
-
-        # For Daily Costs, collect all items, sort by region and starttime, then write
-        if resource_type == "Daily Costs":
-            all_daily_costs = []
-            for compartment, resource_data in resources.items():
-                for item in resource_data.get("Daily Costs", []):
-                    all_daily_costs.append(item)
-            
-            # Sort by region first, then by starttime
-            all_daily_costs.sort(key=lambda x: (x.get("region", ""), x.get("starttime", "")))
-            
-            for item in all_daily_costs:
-                sheet.append([
-                    item.get("compartment_name"),
-                    item.get("region"),
-                    item.get("id"),
-                    item.get("currency"),
-                    item.get("cost"),
-                    item.get("starttime")
-                ])                        
-
-    # Add "All Resources" sheet using ResourceSearchClient data
-    all_resources_sheet = workbook.create_sheet(title="All Resources")
-    all_resources_sheet.append(["Compartment", "Region", "Resource_Type", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Time_created"])
-    
-    # Collect all resources from Resource Search API
-    all_search_resources = []
-    for compartment_key, resource_data in resources.items():
-        for item in resource_data.get("All Resources", []):
-            all_search_resources.append({
-                "compartment_name": item.get("compartment_name"),
-                "region": item.get("region"),
-                "resource_type": item.get("resource_type"),
-                "name": item.get("name"),
-                "id": item.get("id"),
-                "state": item.get("state"),
-                "defined_tags": str(item.get("defined_tags")),
-                "freeform_tags": str(item.get("freeform_tags")),
-                "time_created": item.get("time_created")
-            })
-    
-    # Sort by compartment, then by resource type, then by name
-    all_search_resources.sort(key=lambda x: (x.get("compartment_name", ""), x.get("resource_type", ""), x.get("name", "")))
-    
-    # Write to sheet
-    for item in all_search_resources:
-        all_resources_sheet.append([
-            item.get("compartment_name"),
-            item.get("region"),
-            item.get("resource_type"),
-            item.get("name"),
-            item.get("id"),
-            item.get("state"),
-            item.get("defined_tags"),
-            item.get("freeform_tags"),
-            item.get("time_created")
-        ])
-    
-    print(f"Total resources in 'All Resources' sheet: {len(all_search_resources)}")
+                        "Autonomous Databases",
+                        "All Resources",
+                        "Volume Attachments"]
+    if xlsx_writer:
+        resource_sheets = xlsx_writer.create_sheets(sheet_titles)
+    else:
+        resource_sheets = {title: workbook.create_sheet(title=title) for title in sheet_titles}
+    resource_sheet_rows = write_resource_sheets(resource_sheets, resources, SHEET_COLUMNS, cost_resource_ids, tag_columns=tag_columns,
+                                                denormalized_attachments=denormalized_volumes)
+
+    # Out-of-core Daily Costs: k-way merge the sorted runs straight into the sheet or CSV
+    if "Daily Costs" in resource_sheets and daily_cost_spool is not None:
+        if daily_costs_csv:
+            daily_costs_file_name = f"oci_daily_costs_{region_param}_{namespace}_{current_date}.csv"
+            daily_cost_spool.write_csv(daily_costs_file_name)
+            print(f"Daily Costs ({len(daily_cost_spool)} rows) saved to: {daily_costs_file_name}")
+        else:
+            daily_cost_spool.write_sheet(resource_sheets["Daily Costs"])
+        daily_cost_spool.close()
+
+    print(f"Total resources in 'All Resources' sheet: {resource_sheet_rows['All Resources']}")
+    memory_profiler.checkpoint("resource sheets")
 
     # Add "Cost Usage Reports" sheet
     reports_sheet = workbook.create_sheet(title="Cost Usage Reports")
@@ -920,20 +927,34 @@ try:
         ])
     
     print(f"Total reports in 'Cost Usage Reports' sheet: {len(cost_usage_reports)}")
+    memory_profiler.checkpoint("sheet Cost Usage Reports")
+
+    # Add "Cost Rollup" sheet answered from the cost cube
+    if cost_cube is not None:
+        rollup_sheet = workbook.create_sheet(title="Cost Rollup")
+        rollup_sheet.append(["Region", "Compartment", "Service", "Total_cost"])
+        cube_rollup = cost_cube.rollup(("region", "compartment", "service"))
+        for (region, compartment_name, service), total_cost in sorted(cube_rollup.items()):
+            rollup_sheet.append([region, compartment_name, service, total_cost])
+        rollup_sheet.append([])
+        rollup_sheet.append(["Top_resource", "Total_cost"])
+        for resource_id, total_cost in cost_cube.top_resources(25):
+            rollup_sheet.append([resource_id, total_cost])
+        print(f"Total rows in 'Cost Rollup' sheet: {len(cube_rollup)}")
+        memory_profiler.checkpoint("sheet Cost Rollup")
+
+    # Add "API Stats" sheet: every OCI request made so far, slowest operations first
+    if api_stats.enabled:
+        api_stats_rows = api_stats.write_sheet(workbook.create_sheet(title="API Stats"))
+        print(f"Total rows in 'API Stats' sheet: {api_stats_rows}")
 
     # Add visualization sheet
     visualization_sheet = workbook.create_sheet(title="Visualizations")
     visualization_sheet.append(["Resource Type", "Count"])
 
-    # Prepare summary data for visualization
-    summary_data = {}
-    for compartment, resource_types in resources.items():
-        for resource_type, resource_list in resource_types.items():
-          if resource_type != "Daily Costs" and resource_type != "All Resources" and resource_type != "Cost Usage Reports":  
-            summary_data[resource_type] = summary_data.get(resource_type, 0) + len(resource_list)
-
+    # Summary data for visualization, counted during discovery
+    summary_data = inventory_counters.inventory_counts()
     for resource_type, count in summary_data.items():
-      if resource_type != "Daily Costs" and resource_type != "All Resources" and resource_type != "Cost Usage Reports": 
         visualization_sheet.append([resource_type, count])
 
     # Create Pie Chart
@@ -953,16 +974,41 @@ try:
     bar_chart.x_axis.title = "Resource Type"
     bar_chart.y_axis.title = "Count"
     visualization_sheet.add_chart(bar_chart, "D20")
+    memory_profiler.checkpoint("sheet Visualizations")
 
     # Generate file name with dynamic titles
     # file_name = f"oci_resources_all_regions_{namespace}_{current_date}.xlsx"
     file_name = f"oci_resources_{region_param}_{namespace}_{current_date}.xlsx"
     
     # Save the Excel workbook
-    workbook.save(file_name)
+    if xlsx_writer:
+        xlsx_writer.save(file_name)
+    else:
+        workbook.save(file_name)
     print(f"Detailed findings and visualizations saved to: {file_name}")
+    memory_profiler.checkpoint("xlsx save")
+    tracer.end_span(export_span)
 
 except oci.exceptions.ServiceError as e:
     print(f"Service Error: {e}")
 except Exception as e:
-    print(f"Unexpected Error: {e}")
\ No newline at end of file
+    print(f"Unexpected Error: {e}")
+finally:
+    # Stop the --parallel-xlsx workers and remove their temporary files when the export failed
+    if xlsx_writer is not None:
+        xlsx_writer.close()
+    # Remove any Daily Costs runs still spilled on disk
+    if daily_cost_spool is not None:
+        daily_cost_spool.close()
+    # Sync whatever was discovered, even when the run was interrupted
+    for record_sink in record_sinks:
+        record_sink.close()
+        if record_sink.error is not None:
+            print(f"Warning: Could not write {record_sink.file_name}: {record_sink.error}")
+        else:
+            print(f"Records ({record_sink.count}) saved to: {record_sink.file_name}")
+    memory_profiler.write_report(f"oci_memory_profile_{region_param}_{namespace}_{scipt_start_time.strftime('%Y-%m-%d')}.txt")
+    memory_profiler.close()
+    api_stats.write_summary(f"oci_api_stats_{region_param}_{namespace}_{scipt_start_time.strftime('%Y-%m-%d')}.json")
+    tracer.end_span(run_span)
+    tracer.write(f"oci_trace_{region_param}_{namespace}_{scipt_start_time.strftime('%Y-%m-%d')}.json")
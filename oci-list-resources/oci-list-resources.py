@@ -9,15 +9,23 @@ import logging
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
 from openpyxl.chart import PieChart, BarChart, Reference
+from oci_records import AutonomousDatabaseRecord, BlockVolumeBackupRecord, BlockVolumeRecord, BootVolumeBackupRecord, BootVolumeRecord, ComputeInstanceRecord, DailyCostRecord, FileSystemRecord, VolumeAttachmentRecord
+from oci_export import SHEET_COLUMNS, BackgroundWriter, InventoryCounters, JsonlSink, write_resource_sheets
 
 # Load OCI configuration
 configAPI = oci.config.from_file("~/.oci/config")
 
 # Get Home Region
 homeRegion = configAPI["region"] 
-# region_param = sys.argv[1] if len(sys.argv) > 1 else homeRegion
-date_from_param = sys.argv[1] if len(sys.argv) > 2 else datetime.date.today().replace(day=1) # Get the first day of the current month
-date_to_param = sys.argv[2] if len(sys.argv) > 3 else datetime.date.today() # Get the current day of the current month
+# Options (may appear anywhere on the command line):
+#        --jsonl   append every record to oci_resources_all_regions_<namespace>_<date>.jsonl as each compartment
+#                  is discovered (fsynced periodically, so an interrupted run keeps its partial results)
+cli_flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+cli_args = [arg for arg in sys.argv if not arg.startswith("--")]
+# region_param = cli_args[1] if len(cli_args) > 1 else homeRegion
+date_from_param = cli_args[1] if len(cli_args) > 2 else datetime.date.today().replace(day=1) # Get the first day of the current month
+date_to_param = cli_args[2] if len(cli_args) > 3 else datetime.date.today() # Get the current day of the current month
+jsonl_enabled = "--jsonl" in cli_flags
 
 # Initialize OCI clients
 identity_client = oci.identity.IdentityClient(configAPI)
@@ -47,6 +55,9 @@ dateto = datetime.date.today().replace(day=1) # Get the first day of the current
 month, year = (dateto.month-1, dateto.year) if dateto.month != 1 else (12, dateto.year-1)
 datefrom = dateto.replace(day=1, month=month, year=year) # Get the first day of the previous month
 scipt_start_time = datetime.datetime.now()
+jsonl_file_name = f"oci_resources_all_regions_{namespace}_{scipt_start_time.strftime('%Y-%m-%d')}.jsonl"
+inventory_counters = InventoryCounters()  # Running counts for the Summary and Visualizations sheets
+jsonl_sink = BackgroundWriter(JsonlSink(jsonl_file_name)) if jsonl_enabled else None  # Incremental JSONL export, written on its own thread
 
 try:
     # Fetch all compartments
@@ -106,199 +117,204 @@ try:
 
                 # Compute Instances
                 for ad in region_ads:
-                    vm_list = oci.pagination.list_call_get_all_results(
-                        compute_client.list_instances,
+                    # Boot volume attachments by instance, kept as (boot_volume_id, state) so the
+                    # SDK models are dropped as each page is read
+                    vm_boot_volumes = {}
+                    for bva in oci.pagination.list_call_get_all_results_generator(
+                        compute_client.list_boot_volume_attachments,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
-                    bv_attachments = oci.pagination.list_call_get_all_results(
-                        compute_client.list_boot_volume_attachments,
+                    ):
+                        vm_boot_volumes.setdefault(bva.instance_id, []).append((bva.boot_volume_id, bva.lifecycle_state))
+                    vm_list = oci.pagination.list_call_get_all_results_generator(
+                        compute_client.list_instances,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data   
+                    )
                     vm_findings = []        
                     for vm in vm_list:        
-                        for bva in bv_attachments:
-                            if vm.id == bva.instance_id:
-                                resources[resource_key].setdefault("Compute Instances", []).append({
-                                    "compartment_name": compartment.name,
-                                    "region": current_region,
-                                    "name": vm.display_name,
-                                    "id": vm.id,
-                                    "state": vm.lifecycle_state,
-                                    "attached_to" : bva.boot_volume_id,
-                                    "volume_state": bva.lifecycle_state,
-                                    "availability_domain" : vm.availability_domain,
-                                    "defined_tags" : vm.defined_tags,
-                                    "freeform_tags" : vm.freeform_tags,
-                                    "time_created" : str((f"{vm.time_created}"))
-                                })                   
+                        for boot_volume_id, volume_state in vm_boot_volumes.get(vm.id, ()):
+                            resources[resource_key].setdefault("Compute Instances", []).append(ComputeInstanceRecord(
+                                compartment_name=compartment.name,
+                                region=current_region,
+                                name=vm.display_name,
+                                id=vm.id,
+                                state=vm.lifecycle_state,
+                                attached_to=boot_volume_id,
+                                volume_state=volume_state,
+                                availability_domain=vm.availability_domain,
+                                defined_tags=vm.defined_tags,
+                                freeform_tags=vm.freeform_tags,
+                                time_created=vm.time_created
+                            ))
                 findings[resource_key].extend(vm_findings)
 
                 # Block Volumes
-                bv_list = oci.pagination.list_call_get_all_results(
+                bv_list = oci.pagination.list_call_get_all_results_generator(
                     block_storage_client.list_volumes,
+                    "record",
                     compartment_id=compartment.id
-                ).data
-                bv_attachments = oci.pagination.list_call_get_all_results(
+                )
+                bv_attachments = oci.pagination.list_call_get_all_results_generator(
                     compute_client.list_volume_attachments,
+                    "record",
                     compartment_id=compartment.id
-                ).data 
+                )
                 bv_findings = []           
                 for bv in bv_list:
-                    resources[resource_key].setdefault("Block Volumes", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": bv.display_name,
-                        "id": bv.id,
-                        "state": bv.lifecycle_state,
-                        "defined_tags" : bv.defined_tags,
-                        "freeform_tags" : bv.freeform_tags,
-                        "size_in_gbs" : bv.size_in_gbs,
-                        "time_created" : str((f"{bv.time_created}"))
-                    })
-                    for bva in bv_attachments:
-                        if bv.id == bva.volume_id:
-                            resources[resource_key].setdefault("Block Volumes", []).append({
-                                "compartment_name": compartment.name,
-                                "region": current_region,
-                                "name": bv.display_name,
-                                "id": bv.id,
-                                "state": bva.lifecycle_state,
-                                "defined_tags" : bv.defined_tags,
-                                "freeform_tags" : bv.freeform_tags,
-                                "attached_to_instance" : bva.instance_id,
-                                "size_in_gbs" : bv.size_in_gbs,
-                                "time_created" : str((f"{bv.time_created}"))
-                            })                       
+                    resources[resource_key].setdefault("Block Volumes", []).append(BlockVolumeRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=bv.display_name,
+                        id=bv.id,
+                        state=bv.lifecycle_state,
+                        defined_tags=bv.defined_tags,
+                        freeform_tags=bv.freeform_tags,
+                        size_in_gbs=bv.size_in_gbs,
+                        time_created=bv.time_created
+                    ))
+                # Attachments are kept as their own relation, joined with the volumes on export
+                for bva in bv_attachments:
+                    resources[resource_key].setdefault("Volume Attachments", []).append(VolumeAttachmentRecord(
+                        volume_id=bva.volume_id,
+                        instance_id=bva.instance_id,
+                        state=bva.lifecycle_state,
+                        availability_domain=bva.availability_domain
+                    ))
                 findings[resource_key].extend(bv_findings)
 
                 # Block Volumes Bkp
-                bvBkp_list = oci.pagination.list_call_get_all_results(
+                bvBkp_list = oci.pagination.list_call_get_all_results_generator(
                     block_storage_client.list_volume_backups,
+                    "record",
                     compartment_id=compartment.id
-                ).data
+                )
                 bv_findings = []
                 for bvBkp in bvBkp_list:
-                    resources[resource_key].setdefault("Block Volumes Bkp", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": bvBkp.display_name,
-                        "id": bvBkp.id,
-                        "state": bvBkp.lifecycle_state,
-                        "defined_tags" : bvBkp.defined_tags,
-                        "freeform_tags" : bvBkp.freeform_tags,
-                        "attached_to" : bvBkp.volume_id,
-                        "size_in_gbs" : bvBkp.size_in_gbs,
-                        "time_created" : str((f"{bvBkp.time_created}"))
-                    })
+                    resources[resource_key].setdefault("Block Volumes Bkp", []).append(BlockVolumeBackupRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=bvBkp.display_name,
+                        id=bvBkp.id,
+                        state=bvBkp.lifecycle_state,
+                        defined_tags=bvBkp.defined_tags,
+                        freeform_tags=bvBkp.freeform_tags,
+                        attached_to=bvBkp.volume_id,
+                        size_in_gbs=bvBkp.size_in_gbs,
+                        time_created=bvBkp.time_created
+                    ))
                 findings[resource_key].extend(bv_findings)
 
                 # Boot Volumes
                 for ad in region_ads:
-                    bv_list = oci.pagination.list_call_get_all_results(
+                    bv_list = oci.pagination.list_call_get_all_results_generator(
                         block_storage_client.list_boot_volumes,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
-                    bv_attachments = oci.pagination.list_call_get_all_results(
+                    )
+                    bv_attachments = oci.pagination.list_call_get_all_results_generator(
                         compute_client.list_boot_volume_attachments,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data   
+                    )
                     bv_findings = []        
                     for bv in bv_list:
-                        resources[resource_key].setdefault("Boot Volumes", []).append({
-                            "compartment_name": compartment.name,
-                            "region": current_region,
-                            "name": bv.display_name,
-                            "id": bv.id,
-                            "state": bv.lifecycle_state,
-                            "defined_tags" : bv.defined_tags,
-                            "freeform_tags" : bv.freeform_tags,
-                            "size_in_gbs" : bv.size_in_gbs,
-                            "time_created" : str((f"{bv.time_created}"))
-                        })          
-                        for bva in bv_attachments:
-                            if bv.id == bva.boot_volume_id:
-                                resources[resource_key].setdefault("Boot Volumes", []).append({
-                                    "compartment_name": compartment.name,
-                                    "region": current_region,
-                                    "name": bv.display_name,
-                                    "id": bv.id,
-                                    "state": bva.lifecycle_state,
-                                    "defined_tags" : bv.defined_tags,
-                                    "freeform_tags" : bv.freeform_tags,
-                                    "attached_to_instance" : bva.instance_id,
-                                    "availability_domain" : ad.name,
-                                    "size_in_gbs" : bv.size_in_gbs,
-                                    "time_created" : str((f"{bv.time_created}"))
-                                })                       
+                        resources[resource_key].setdefault("Boot Volumes", []).append(BootVolumeRecord(
+                            compartment_name=compartment.name,
+                            region=current_region,
+                            name=bv.display_name,
+                            id=bv.id,
+                            state=bv.lifecycle_state,
+                            defined_tags=bv.defined_tags,
+                            freeform_tags=bv.freeform_tags,
+                            availability_domain=bv.availability_domain,
+                            size_in_gbs=bv.size_in_gbs,
+                            time_created=bv.time_created
+                        ))
+                    for bva in bv_attachments:
+                        resources[resource_key].setdefault("Volume Attachments", []).append(VolumeAttachmentRecord(
+                            volume_id=bva.boot_volume_id,
+                            instance_id=bva.instance_id,
+                            state=bva.lifecycle_state,
+                            availability_domain=bva.availability_domain
+                        ))
                 findings[resource_key].extend(bv_findings)
 
                 # Boot Volumes Bkp
-                bvBkp_list = oci.pagination.list_call_get_all_results(
+                bvBkp_list = oci.pagination.list_call_get_all_results_generator(
                     block_storage_client.list_boot_volume_backups,
+                    "record",
                     compartment_id=compartment.id
-                ).data
+                )
                 bv_findings = []
                 for bv in bvBkp_list:
-                    resources[resource_key].setdefault("Boot Volumes Bkp", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": bv.display_name,
-                        "id": bv.id,
-                        "state": bv.lifecycle_state,
-                        "defined_tags" : bv.defined_tags,
-                        "freeform_tags" : bv.freeform_tags,
-                        "size_in_gbs" : bv.size_in_gbs,
-                        "time_created" : str((f"{bv.time_created}"))
-                    })
+                    resources[resource_key].setdefault("Boot Volumes Bkp", []).append(BootVolumeBackupRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=bv.display_name,
+                        id=bv.id,
+                        state=bv.lifecycle_state,
+                        defined_tags=bv.defined_tags,
+                        freeform_tags=bv.freeform_tags,
+                        size_in_gbs=bv.size_in_gbs,
+                        time_created=bv.time_created
+                    ))
                 findings[resource_key].extend(bv_findings)
 
                 # File Systems 
                 for ad in region_ads:  
-                    fss_list = oci.pagination.list_call_get_all_results(
+                    fss_list = oci.pagination.list_call_get_all_results_generator(
                         file_storage_client.list_file_systems,
+                        "record",
                         compartment_id=compartment.id,
                         availability_domain=ad.name
-                    ).data
+                    )
                     fss_findings = []
                     for fss in fss_list:
-                        resources[resource_key].setdefault("File Systems", []).append({
-                            "compartment_name": compartment.name,
-                            "region": current_region,
-                            "name": fss.display_name,
-                            "id": fss.id,
-                            "state": fss.lifecycle_state,
-                            "defined_tags" : fss.defined_tags,
-                            "freeform_tags" : fss.freeform_tags,
-                            "metered_bytes" : fss.metered_bytes,
-                            "time_created" : str((f"{fss.time_created}"))
-                        })
+                        resources[resource_key].setdefault("File Systems", []).append(FileSystemRecord(
+                            compartment_name=compartment.name,
+                            region=current_region,
+                            name=fss.display_name,
+                            id=fss.id,
+                            state=fss.lifecycle_state,
+                            defined_tags=fss.defined_tags,
+                            freeform_tags=fss.freeform_tags,
+                            metered_bytes=fss.metered_bytes,
+                            time_created=fss.time_created
+                        ))
                     findings[resource_key].extend(fss_findings)
 
                 # Autonomous Databases
-                adb_list = oci.pagination.list_call_get_all_results(
+                adb_list = oci.pagination.list_call_get_all_results_generator(
                     database_client.list_autonomous_databases,
+                    "record",
                     compartment_id=compartment.id
-                ).data
+                )
                 adb_findings = []
                 for adb in adb_list:
-                    resources[resource_key].setdefault("Autonomous Databases", []).append({
-                        "compartment_name": compartment.name,
-                        "region": current_region,
-                        "name": adb.display_name,
-                        "id": adb.id,
-                        "state": adb.lifecycle_state,
-                        "defined_tags" : adb.defined_tags,
-                        "freeform_tags" : adb.freeform_tags,
-                        "ocups": adb.compute_count,
-                        "size_in_gbs" : adb.data_storage_size_in_gbs,
-                        "time_created" : str((f"{adb.time_created}"))
-                    })
+                    resources[resource_key].setdefault("Autonomous Databases", []).append(AutonomousDatabaseRecord(
+                        compartment_name=compartment.name,
+                        region=current_region,
+                        name=adb.display_name,
+                        id=adb.id,
+                        state=adb.lifecycle_state,
+                        defined_tags=adb.defined_tags,
+                        freeform_tags=adb.freeform_tags,
+                        ocups=adb.compute_count,
+                        size_in_gbs=adb.data_storage_size_in_gbs,
+                        time_created=adb.time_created
+                    ))
                 findings[resource_key].extend(adb_findings)
 
+                # Persist this compartment/region before moving on to the next one
+                inventory_counters.write_resources(resource_key, resources[resource_key], findings[resource_key])
+                if jsonl_sink is not None:
+                    jsonl_sink.write_resources(resource_key, resources[resource_key], findings[resource_key])
+
             # Usage Costs - Compute
 
             # filter_details = oci.usage_api.models.Filter(
@@ -353,14 +369,17 @@ try:
 
             for cost in costs_list.data.items:
                 start_time = cost.time_usage_started.strftime("%Y-%m-%d")
-                resources[compartment.id].setdefault("Daily Costs", []).append({
-                    "compartment_name": compartment.name,
-                    "id": cost.resource_id,
-                    "currency": cost.currency,
-                    "cost": cost.computed_amount,
-                    "starttime": start_time
-                })
+                resources[compartment.id].setdefault("Daily Costs", []).append(DailyCostRecord(
+                    compartment_name=compartment.name,
+                    id=cost.resource_id,
+                    currency=cost.currency,
+                    cost=cost.computed_amount,
+                    starttime=start_time
+                ))
             findings[compartment.id].extend(cost_findings)
+            inventory_counters.write_resources(compartment.id, resources[compartment.id], findings[compartment.id])
+            if jsonl_sink is not None:
+                jsonl_sink.write_resources(compartment.id, resources[compartment.id], findings[compartment.id])
     
     # Build a set of all existing resource IDs from all resource sheets
     existing_resource_ids = set()
@@ -461,11 +480,19 @@ try:
             deleted_entry["size_in_gbs"] = "N/A"
         
         resources[deleted_resources_key].setdefault(resource_type, []).append(deleted_entry)
+    inventory_counters.write_resources(deleted_resources_key, resources[deleted_resources_key])
+    if jsonl_sink is not None:
+        jsonl_sink.write_resources(deleted_resources_key, resources[deleted_resources_key])
     
     # Count deleted resources by type
     for rtype, rlist in resources.get(deleted_resources_key, {}).items():
         print(f"  - {rtype}: {len(rlist)} deleted resources with costs")
         
+    # Discovery totals from the running counters
+    print(f"\nDiscovered resources by type ({inventory_counters.findings} findings):")
+    for resource_type, count in inventory_counters.inventory_counts().items():
+        print(f"  - {resource_type}: {count}")
+
     # Get current date for the file name
     current_date = datetime.datetime.now().strftime("%Y-%m-%d")
    
@@ -479,14 +506,14 @@ try:
     # print(f"Resource discovery and validation completed. Results saved to: {file_name}")
     
     # # Export data to Excel
-    workbook = Workbook()
-    summary_sheet = workbook.active
+    # Write-only workbook: rows are streamed to disk as they are appended instead of being held in memory
+    workbook = Workbook(write_only=True)
     # summary_sheet.title = "Findings Summary"
     script_end_time = datetime.datetime.now()
-    summary_sheet = workbook.active
-    summary_sheet.title = "Summary"
+    summary_sheet = workbook.create_sheet(title="Summary")
     summary_sheet.append(["started_at", "completed_at"])
     summary_sheet.append([str((f"{scipt_start_time}")), str((f"{script_end_time}"))])
+    inventory_counters.write_summary(summary_sheet)
 
     # # Add findings summary
     # summary_sheet.append(["Compartment", "Remarks"])
@@ -524,7 +551,13 @@ try:
     # bar_chart.y_axis.title = "Number of Issues"
     # summary_sheet.add_chart(bar_chart, f"E{summary_start_row}")
 
-    # Add data sheets for each resource type
+    # Add data sheets for each resource type, filled in a single pass over the inventory
+    sheet_columns = dict(SHEET_COLUMNS)
+    sheet_columns["Daily Costs"] = [
+        ("Compartment", "compartment_name", "value"), ("ID", "id", "value"), ("Currency", "currency", "value"),
+        ("Cost", "cost", "value"), ("Starttime", "starttime", "value"),
+    ]
+    resource_sheets = {}
     for resource_type in ["Daily Costs",
                         "Compute Instances", 
                         "Block Volumes", 
@@ -533,153 +566,16 @@ try:
                         "Boot Volumes Bkp",
                         "File Systems",
                         "Autonomous Databases"]:
-        sheet = workbook.create_sheet(title=resource_type)   
-        if resource_type == "Compute Instances":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "BootVolume_state", "Availability_domain", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Block Volumes":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Block Volumes Bkp":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Boot Volumes":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Attached_to", "Availability_domain" , "Size_in_gbs", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Boot Volumes Bkp":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags", "Size_in_gbs", "Time_created", "Total_cost_in_period"])
-        if resource_type == "File Systems":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags" , "Metered_bytes", "Time_created", "Total_cost_in_period"])
-        if resource_type == "Autonomous Databases":
-            sheet.append(["Compartment", "Region", "Name", "ID", "STATE", "Defined_tags", "Freeform_tags" , "Ocpus", "Size_in_gbs", "Time_created", "Total_cost_in_period"])    
-        if resource_type == "Daily Costs":
-            sheet.append(["Compartment", "ID", "Currency","Cost", "Starttime"])              
-        
-        for compartment, resource_data in resources.items():
-            for item in resource_data.get(resource_type, []):
-                # Get total cost for this resource from cost_resource_ids
-                resource_id = item.get("id")
-                total_cost_str = item.get("total_cost_in_period", "")  # For deleted resources
-                if not total_cost_str and resource_id and resource_id in cost_resource_ids:
-                    cost_info = cost_resource_ids[resource_id]
-                    total_cost_str = f"{cost_info['total_cost']:.4f} {cost_info['currency']}"
-                           
-                if resource_type == "Compute Instances":
-                    sheet.append([
-                             item.get("compartment_name"),
-                             item.get("region"), 
-                             item.get("name"), 
-                             item.get("id"),
-                             item.get("state"),
-                             str(item.get(f"defined_tags")),
-                             str(item.get(f"freeform_tags")),
-                             str(item.get(f"attached_to")),
-                             str(item.get(f"volume_state")),
-                             str(item.get(f"availability_domain")),
-                             str(item.get(f"time_created")),
-                             total_cost_str
-                             ])
-                if resource_type == "Block Volumes":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                str(item.get(f"attached_to_instance")),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Block Volumes Bkp":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                str(item.get(f"attached_to")),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Boot Volumes":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                str(item.get(f"attached_to_instance")),
-                                str(item.get(f"availability_domain")),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Boot Volumes Bkp":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "File Systems":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                item.get(f"metered_bytes"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Autonomous Databases":
-                    sheet.append([
-                                item.get("compartment_name"),
-                                item.get("region"), 
-                                item.get("name"), 
-                                item.get("id"),
-                                item.get("state"),
-                                str(item.get(f"defined_tags")),
-                                str(item.get(f"freeform_tags")),
-                                item.get(f"compute_count"),
-                                item.get(f"size_in_gbs"),
-                                str(item.get(f"time_created")),
-                                total_cost_str
-                                ])
-                if resource_type == "Daily Costs":
-                    sheet.append([
-                                item.get("compartment_name"), 
-                                item.get("id"),
-                                item.get("currency"),
-                                item.get("cost"),
-                                item.get("starttime")
-                                ])                        
+        resource_sheets[resource_type] = workbook.create_sheet(title=resource_type)
+    write_resource_sheets(resource_sheets, resources, sheet_columns, cost_resource_ids, cost_format="{total_cost:.4f} {currency}", sort_keys={})
 
     # Add visualization sheet
     visualization_sheet = workbook.create_sheet(title="Visualizations")
     visualization_sheet.append(["Resource Type", "Count"])
 
-    # Prepare summary data for visualization
-    summary_data = {}
-    for compartment, resource_types in resources.items():
-        for resource_type, resource_list in resource_types.items():
-          if resource_type != "Daily Costs":  
-            summary_data[resource_type] = summary_data.get(resource_type, 0) + len(resource_list)
-
+    # Summary data for visualization, counted during discovery
+    summary_data = inventory_counters.inventory_counts()
     for resource_type, count in summary_data.items():
-      if resource_type != "Daily Costs": 
         visualization_sheet.append([resource_type, count])
 
     # Create Pie Chart
@@ -712,4 +608,12 @@ try:
 except oci.exceptions.ServiceError as e:
     print(f"Service Error: {e}")
 except Exception as e:
-    print(f"Unexpected Error: {e}")
\ No newline at end of file
+    print(f"Unexpected Error: {e}")
+finally:
+    # Sync whatever was discovered, even when the run was interrupted
+    if jsonl_sink is not None:
+        jsonl_sink.close()
+        if jsonl_sink.error is not None:
+            print(f"Warning: Could not write {jsonl_file_name}: {jsonl_sink.error}")
+        else:
+            print(f"JSONL records ({jsonl_sink.count}) saved to: {jsonl_file_name}")
\ No newline at end of file
@@ -0,0 +1,787 @@
+import copy
+import csv
+import datetime
+import heapq
+import os
+import pickle
+from array import array
+import shutil
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import json
+from operator import itemgetter
+
+import numpy as np
+import oci
+
+# Cost helpers shared by the oci-list-resources scripts.
+# Usage:
+#        from oci_costs import CostReconciler
+#        reconciler = CostReconciler()
+#        reconciler.add_inventory(resources)
+#        reconciler.add_costs(resources[tenancy_ocid]["Daily Costs"])
+#        matched, orphaned, uncosted = reconciler.reconcile()
+#
+#        from oci_costs import DailyCostSpool
+#        with DailyCostSpool() as spool:
+#            spool.add_cost(compartment_name, region, resource_id, currency, cost, starttime)
+#            spool.write_csv(file_name)
+#
+#        from oci_costs import CostCube, update_cost_cube
+#        cube = CostCube.load(cube_file_name)
+#        update_cost_cube(usage_client, cube, tenancy_ocid, date_from, date_to)
+#        cube.rollup(("region", "service"))
+#
+#        from oci_costs import ShardedUsageFetcher
+#        fetcher = ShardedUsageFetcher(lambda: oci.usage_api.UsageapiClient(config), tenancy_ocid)
+#        for cost in fetcher.items(summarized_usages_details(tenancy_ocid, date_from, date_to)):
+#
+#        from oci_costs import CostMatrixBuilder, CostMatrix
+#        builder = CostMatrixBuilder()
+#        builder.add(resource_id, "2025-10-01", cost)
+#        builder.build().save(directory)
+#        CostMatrix.load(directory).day_totals()
+
+# Build the Usage API request grouped by resourceId.
+# With aggregate_by_time=True the service sums the whole period per resource,
+# returning one row per resource instead of one per resource and day.
+def summarized_usages_details(tenancy_ocid, date_from, date_to, aggregate_by_time=False, granularity="DAILY", compartment_depth=6, filter_details=None, group_by=("resourceId",)):
+    return oci.usage_api.models.RequestSummarizedUsagesDetails(
+        tenant_id=tenancy_ocid,
+        time_usage_started=date_from,
+        time_usage_ended=date_to,
+        granularity=granularity,
+        filter=filter_details,
+        is_aggregate_by_time=aggregate_by_time,
+        query_type="COST",
+        group_by=list(group_by),
+        compartment_depth=compartment_depth
+    )
+
+
+# Yield every UsageSummary of a request_summarized_usages call, following opc-next-page
+def summarized_usage_items(usage_client, details):
+    page = None
+    while True:
+        response = usage_client.request_summarized_usages(request_summarized_usages_details=details, page=page)
+        yield from response.data.items
+        page = response.next_page
+        if not page:
+            return
+
+
+# Feed the per-resource totals of the period into a CostReconciler without downloading daily rows
+# (pass a ShardedUsageFetcher as fetcher to split the request by service/compartment)
+def fetch_cost_totals(usage_client, reconciler, tenancy_ocid, date_from, date_to, compartment_depth=6, fetcher=None):
+    details = summarized_usages_details(tenancy_ocid, date_from, date_to, aggregate_by_time=True, compartment_depth=compartment_depth)
+    items = fetcher.items(details) if fetcher is not None else summarized_usage_items(usage_client, details)
+    rows = 0
+    for cost in items:
+        reconciler.add_cost(cost.resource_id, cost.computed_amount, cost.currency)
+        rows += 1
+    return rows
+
+
+# Group the compartment list into one shard per top-level compartment (its whole subtree),
+# plus a shard for resources that live directly in the root compartment.
+def top_level_compartment_shards(compartments, tenancy_ocid):
+    parents = {compartment.id: getattr(compartment, "compartment_id", None) for compartment in compartments}
+    shards = {tenancy_ocid: [tenancy_ocid]}
+    for compartment_id in parents:
+        if compartment_id == tenancy_ocid:
+            continue
+        top_level_id = compartment_id
+        while parents.get(top_level_id) not in (None, tenancy_ocid):
+            top_level_id = parents[top_level_id]
+        shards.setdefault(top_level_id, []).append(compartment_id)
+    return shards
+
+
+# Largest number of dimensions in one Usage API filter: longer value lists (a big
+# compartment subtree, many services) are split into several filters of this size
+MAX_FILTER_DIMENSIONS = 50
+
+
+# Filters matching any of the values of a dimension key, one OR filter per chunk of
+# at most MAX_FILTER_DIMENSIONS values
+def dimension_filters(key, values):
+    values = list(values)
+    return [
+        oci.usage_api.models.Filter(operator="OR", dimensions=[oci.usage_api.models.Dimension(key=key, value=value) for value in values[start:start + MAX_FILTER_DIMENSIONS]])
+        for start in range(0, len(values), MAX_FILTER_DIMENSIONS)
+    ]
+
+
+# Filter matching none of the values of a dimension key: the NOT of every chunk of
+# dimension_filters, ANDed, so no nested filter exceeds MAX_FILTER_DIMENSIONS
+def excluding_filter(key, values):
+    return oci.usage_api.models.Filter(operator="AND", filters=[
+        oci.usage_api.models.Filter(operator="NOT", filters=[values_filter]) for values_filter in dimension_filters(key, values)
+    ])
+
+
+# Run one summarized usages query as parallel shards and union the results.
+# The query is split by service (Filter/Dimension key "service") and optionally by
+# top-level compartment, so every request stays small and predictable. Shards are
+# disjoint, so their results are simply concatenated as they complete. Rows without
+# a service value go to a catch-all shard (NOT any listed service), rows of compartments
+# missing from compartment_shards (deleted compartments) to a catch-all shard (NOT any
+# listed compartment), and the union is checked against the per-service totals so any
+# cost left out of every shard is reported. Compartment lists longer than
+# MAX_FILTER_DIMENSIONS are split into several shards.
+# OCI clients are not shared across threads: client_factory builds one per worker.
+class ShardedUsageFetcher:
+
+    def __init__(self, client_factory, tenancy_ocid, compartment_shards=None, max_workers=8):
+        self.client_factory = client_factory
+        self.tenancy_ocid = tenancy_ocid
+        self.compartment_shards = compartment_shards
+        self.max_workers = max_workers
+        self.local = threading.local()
+
+    def _client(self):
+        client = getattr(self.local, "client", None)
+        if client is None:
+            client = self.local.client = self.client_factory()
+        return client
+
+    # Cost of every service in the period (None: rows without a service value),
+    # from a single time-aggregated row per service
+    def service_totals(self, details):
+        service_details = copy.copy(details)
+        service_details.is_aggregate_by_time = True
+        service_details.group_by = ["service"]
+        totals = {}
+        for item in summarized_usage_items(self._client(), service_details):
+            totals[item.service or None] = totals.get(item.service or None, 0) + (item.computed_amount or 0)
+        return totals
+
+    def shard_filters(self, services):
+        service_filters = [
+            oci.usage_api.models.Filter(operator="AND", dimensions=[oci.usage_api.models.Dimension(key="service", value=service)])
+            for service in services
+        ]
+        # Catch-all shard: everything that is none of the listed services
+        if services:
+            service_filters.append(excluding_filter("service", services))
+        if not self.compartment_shards:
+            return service_filters
+        compartment_filters = [
+            compartment_filter
+            for compartment_ids in self.compartment_shards.values()
+            for compartment_filter in dimension_filters("compartmentId", compartment_ids)
+        ]
+        # Catch-all shard: compartments that are in none of the shards
+        compartment_filters.append(excluding_filter("compartmentId", [
+            compartment_id for compartment_ids in self.compartment_shards.values() for compartment_id in compartment_ids
+        ]))
+        return [
+            oci.usage_api.models.Filter(operator="AND", filters=[service_filter, compartment_filter])
+            for service_filter in service_filters
+            for compartment_filter in compartment_filters
+        ]
+
+    def _fetch_shard(self, details, shard_filter):
+        shard_details = copy.copy(details)
+        if shard_filter is None:
+            return list(summarized_usage_items(self._client(), shard_details))
+        if details.filter is not None:
+            shard_filter = oci.usage_api.models.Filter(operator="AND", filters=[details.filter, shard_filter])
+        shard_details.filter = shard_filter
+        return list(summarized_usage_items(self._client(), shard_details))
+
+    # Yield the union of every shard's UsageSummary items, in completion order
+    def items(self, details):
+        totals = self.service_totals(details)
+        # No service to split on: a single unfiltered request
+        shard_filters = self.shard_filters(sorted(service for service in totals if service)) or [None]
+        fetched = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = [executor.submit(self._fetch_shard, details, shard_filter) for shard_filter in shard_filters]
+            for future in as_completed(futures):
+                for item in future.result():
+                    fetched += item.computed_amount or 0
+                    yield item
+        expected = sum(totals.values())
+        if abs(fetched - expected) > max(0.01, abs(expected) * 1e-6):
+            print(f"Warning: sharded cost query returned {fetched:.2f}, the unsharded total is {expected:.2f} "
+                  f"({expected - fetched:.2f} not covered by any shard)")
+
+
+# Map OCID type segments (ocid1.<type>.<realm>.<region>.<unique_id>) to resource sheets
+OCID_RESOURCE_TYPES = {
+    "instance": "Compute Instances",
+    "volume": "Block Volumes",
+    "volumebackup": "Block Volumes Bkp",
+    "bootvolume": "Boot Volumes",
+    "bootvolumebackup": "Boot Volumes Bkp",
+    "filesystem": "File Systems",
+    "autonomousdatabase": "Autonomous Databases",
+}
+
+OCID_PREFIX = "ocid1."
+
+
+# Extract the region from an OCID (format: ocid1.<resource_type>.<realm>.<region>.<unique_id>)
+def ocid_region(resource_id):
+    if not resource_id:
+        return "unknown"
+    parts = resource_id.split(".", 4)
+    if len(parts) >= 4 and parts[3]:
+        return parts[3]
+    return "unknown"
+
+
+# Character trie over the OCID type segment.
+# A lookup walks the characters after "ocid1." once and stops at the first ".",
+# so classifying an OCID costs O(len(type segment)) whatever the number of known types.
+class OcidTypeTrie:
+
+    def __init__(self, ocid_types=None):
+        self.root = {}
+        for type_segment, resource_type in (ocid_types or OCID_RESOURCE_TYPES).items():
+            self.insert(type_segment, resource_type)
+
+    def insert(self, type_segment, resource_type):
+        node = self.root
+        for char in type_segment:
+            node = node.setdefault(char, {})
+        # "." terminates the segment, so "volume" never matches "volumebackup"
+        node["."] = resource_type
+
+    def classify(self, resource_id, default="Unknown"):
+        if not resource_id or not resource_id.startswith(OCID_PREFIX):
+            return default
+        node = self.root
+        for index in range(len(OCID_PREFIX), len(resource_id)):
+            node = node.get(resource_id[index])
+            if node is None:
+                return default
+            if isinstance(node, str):
+                return node
+        return default
+
+
+# Join Daily Costs rows to the discovered inventory by OCID.
+# Both sides are kept in hashed indexes keyed by OCID, so each cost row is a
+# single dict probe; totals per resource are aggregated as rows are added.
+class CostReconciler:
+
+    def __init__(self, type_trie=None, skip_types=("Daily Costs",)):
+        self.type_trie = type_trie or OcidTypeTrie()
+        self.skip_types = set(skip_types)
+        # OCID -> (resource_key, resource_type) for every discovered resource
+        self.inventory_index = {}
+        # OCID -> {"total_cost", "currency", "region"} for every cost-incurring resource
+        self.cost_index = {}
+        self.cost_rows = 0
+
+    # Index every resource of a resources[resource_key][resource_type] mapping
+    def add_inventory(self, resources):
+        inventory_index = self.inventory_index
+        for resource_key, resource_data in resources.items():
+            for resource_type, resource_list in resource_data.items():
+                if resource_type in self.skip_types:
+                    continue
+                for item in resource_list:
+                    resource_id = item.get("id")
+                    if resource_id and resource_id not in inventory_index:
+                        inventory_index[sys.intern(resource_id)] = (resource_key, resource_type)
+
+    # Aggregate cost rows ({"id", "cost", "currency", ...}) into per-OCID totals
+    def add_costs(self, cost_rows):
+        for cost_item in cost_rows:
+            self.add_cost(cost_item.get("id"), cost_item.get("cost", 0), cost_item.get("currency"), cost_item.get("region"))
+
+    def add_cost(self, resource_id, cost, currency=None, region=None):
+        self.cost_rows += 1
+        if not resource_id:
+            return
+        cost_info = self.cost_index.get(resource_id)
+        if cost_info is None:
+            cost_info = self.cost_index[sys.intern(resource_id)] = {
+                "total_cost": 0,
+                "currency": currency,
+                "region": region or ocid_region(resource_id)
+            }
+        cost_info["total_cost"] += cost or 0
+
+    # Returns (matched, orphaned, uncosted) OCID sets:
+    #   matched  - discovered resources that incurred costs
+    #   orphaned - cost-incurring resources that were not discovered (deleted/not found)
+    #   uncosted - discovered resources without any cost in the period
+    def reconcile(self):
+        inventory_keys = self.inventory_index.keys()
+        cost_keys = self.cost_index.keys()
+        matched = cost_keys & inventory_keys
+        orphaned = cost_keys - inventory_keys
+        uncosted = inventory_keys - cost_keys
+        return matched, orphaned, uncosted
+
+    def classify(self, resource_id):
+        return self.type_trie.classify(resource_id)
+
+    # Group orphaned OCIDs by the resource sheet their OCID type maps to
+    def orphaned_by_type(self, orphaned=None):
+        if orphaned is None:
+            orphaned = self.reconcile()[1]
+        by_type = {}
+        classify = self.type_trie.classify
+        for resource_id in orphaned:
+            by_type.setdefault(classify(resource_id), []).append(resource_id)
+        return by_type
+
+
+# Sort rows that do not fit in memory.
+# Rows are buffered up to run_size, each full buffer is sorted and spilled to a
+# temporary file as one sorted run, and iteration k-way merges the runs with
+# heapq.merge, so at most run_size rows plus one chunk per run are held in memory.
+# The merge is stable: rows with equal keys keep the order they were added in.
+class ExternalSorter:
+
+    def __init__(self, key, run_size=250000, chunk_size=5000, directory=None):
+        self.key = key
+        self.run_size = run_size
+        self.chunk_size = chunk_size
+        self.directory = tempfile.mkdtemp(prefix="oci_sort_", dir=directory)
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def add(self, row):
+        self.buffer.append(row)
+        self.count += 1
+        if len(self.buffer) >= self.run_size:
+            self._spill()
+
+    def _spill(self):
+        self.buffer.sort(key=self.key)
+        run_path = os.path.join(self.directory, f"run_{len(self.runs):05d}.pkl")
+        with open(run_path, "wb") as run_file:
+            for start in range(0, len(self.buffer), self.chunk_size):
+                pickle.dump(self.buffer[start:start + self.chunk_size], run_file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.runs.append(run_path)
+        self.buffer = []
+
+    @staticmethod
+    def _read_run(run_path):
+        with open(run_path, "rb") as run_file:
+            while True:
+                try:
+                    chunk = pickle.load(run_file)
+                except EOFError:
+                    return
+                yield from chunk
+
+    # Yield every added row in key order
+    def __iter__(self):
+        if not self.runs:
+            self.buffer.sort(key=self.key)
+            return iter(self.buffer)
+        if self.buffer:
+            self._spill()
+        return heapq.merge(*[self._read_run(run_path) for run_path in self.runs], key=self.key)
+
+    def close(self):
+        self.buffer = []
+        self.runs = []
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+DAILY_COSTS_HEADER = ["Compartment", "Region", "ID", "Currency", "Cost", "Starttime"]
+
+
+# Daily Costs rows kept as compact tuples in the Daily Costs sheet column order
+# and sorted by (region, starttime) out of core.
+class DailyCostSpool(ExternalSorter):
+
+    def __init__(self, run_size=250000, directory=None):
+        # (compartment_name, region, id, currency, cost, starttime)
+        super().__init__(key=itemgetter(1, 5), run_size=run_size, directory=directory)
+
+    def add_cost(self, compartment_name, region, resource_id, currency, cost, starttime):
+        self.add((compartment_name, region, resource_id, currency, cost, starttime))
+
+    # Stream the sorted rows into an (ideally write-only) openpyxl sheet
+    def write_sheet(self, sheet):
+        for row in self:
+            sheet.append(list(row))
+
+    def write_csv(self, file_name):
+        with open(file_name, "w", newline="") as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(DAILY_COSTS_HEADER)
+            writer.writerows(self)
+
+
+# Normalize a date, datetime or ISO-8601 string to a UTC day boundary
+def as_utc_day(value):
+    if isinstance(value, str):
+        value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return datetime.datetime(value.year, value.month, value.day, tzinfo=datetime.timezone.utc)
+
+
+# Dictionary encoding of one cube dimension: value <-> integer code
+class Dimension:
+
+    def __init__(self, values=()):
+        self.values = []
+        self.codes = {}
+        for value in values:
+            self.encode(value)
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+# Precomputed cost cube: a dense float64 array indexed by dictionary-encoded
+# (region, compartment, service, day) plus per-resource totals.
+# New days are appended incrementally (axes grow by doubling) and every
+# rollup, slice or top-N is answered from the arrays without rescanning rows.
+# The per-resource costs of the most recent days are kept as well, so those days
+# can be replaced when they are re-fetched after billing has completed.
+class CostCube:
+
+    DIMENSIONS = ("region", "compartment", "service", "day")
+
+    def __init__(self):
+        self.dimensions = {name: Dimension() for name in self.DIMENSIONS}
+        self.resources = Dimension()
+        self.cells = np.zeros((4, 16, 16, 32))
+        self.resource_totals = np.zeros(1024)
+        self.day_resource_costs = {}  # day -> {resource code: cost} of the replaceable days
+
+    def _grow(self, shape):
+        if any(size > capacity for size, capacity in zip(shape, self.cells.shape)):
+            grown = np.zeros(tuple(max(capacity, 1 << max(size - 1, 0).bit_length()) for size, capacity in zip(shape, self.cells.shape)))
+            grown[tuple(slice(0, size) for size in self.cells.shape)] = self.cells
+            self.cells = grown
+        if len(self.resources) > len(self.resource_totals):
+            grown = np.zeros(1 << (len(self.resources) - 1).bit_length())
+            grown[:len(self.resource_totals)] = self.resource_totals
+            self.resource_totals = grown
+
+    @property
+    def shape(self):
+        return tuple(len(self.dimensions[name]) for name in self.DIMENSIONS)
+
+    @property
+    def days(self):
+        return list(self.dimensions["day"].values)
+
+    # First day not yet loaded in the cube (None when the cube is empty)
+    def next_day(self):
+        if not self.dimensions["day"].values:
+            return None
+        last_day = max(self.dimensions["day"].values)
+        return datetime.date.fromisoformat(last_day) + datetime.timedelta(days=1)
+
+    # Days already loaded whose per-resource costs are kept, so append_day can replace them
+    def replaceable_days(self):
+        return sorted(day for day in self.day_resource_costs if day in self.dimensions["day"].codes)
+
+    # Append one day of (region, compartment, service, resource_id, cost) rows.
+    # A day that is already loaded is replaced (its cells and its share of the
+    # per-resource totals are removed first), provided its per-resource costs
+    # were kept; otherwise it is rejected so the totals never double count.
+    def append_day(self, day, rows):
+        if day in self.dimensions["day"].codes:
+            previous = self.day_resource_costs.get(day)
+            if previous is None:
+                raise ValueError(f"Day {day} is already loaded in the cost cube and can no longer be replaced")
+            day_code = self.dimensions["day"].codes[day]
+            self.cells[..., day_code] = 0
+            for resource_code, cost in previous.items():
+                self.resource_totals[resource_code] -= cost
+        else:
+            day_code = self.dimensions["day"].encode(day)
+        region_dim, compartment_dim, service_dim = (self.dimensions[name] for name in ("region", "compartment", "service"))
+        encoded = []
+        for region, compartment, service, resource_id, cost in rows:
+            encoded.append((region_dim.encode(region), compartment_dim.encode(compartment), service_dim.encode(service), self.resources.encode(resource_id) if resource_id else -1, cost or 0))
+        self._grow(self.shape)
+        resource_costs = self.day_resource_costs[day] = {}
+        for region_code, compartment_code, service_code, resource_code, cost in encoded:
+            self.cells[region_code, compartment_code, service_code, day_code] += cost
+            if resource_code >= 0:
+                self.resource_totals[resource_code] += cost
+                resource_costs[resource_code] = resource_costs.get(resource_code, 0) + cost
+        return len(encoded)
+
+    # Drop the kept per-resource costs of the days before keep_from (ISO date);
+    # those days become final
+    def finalize_days(self, keep_from):
+        for day in [day for day in self.day_resource_costs if day < keep_from]:
+            del self.day_resource_costs[day]
+
+    # Values of one axis left after filtering (days are inclusive ISO dates)
+    def _axis_values(self, name, region=None, compartment=None, service=None, day_from=None, day_to=None):
+        dimension = self.dimensions[name]
+        if name == "day":
+            return [day for day in dimension.values if (day_from is None or day >= day_from) and (day_to is None or day <= day_to)]
+        values = {"region": region, "compartment": compartment, "service": service}[name]
+        if values is None:
+            return list(dimension.values)
+        if isinstance(values, str):
+            values = [values]
+        return [value for value in values if value in dimension.codes]
+
+    # Sub-array restricted to the given dimension values, e.g.
+    # slice(region="eu-frankfurt-1", day_from="2025-10-01", day_to="2025-10-31")
+    def slice(self, **filters):
+        view = self.cells[tuple(slice(0, size) for size in self.shape)]
+        for axis, name in enumerate(self.DIMENSIONS):
+            if name == "day" and filters.get("day_from") is None and filters.get("day_to") is None:
+                continue
+            if name != "day" and filters.get(name) is None:
+                continue
+            codes = [self.dimensions[name].codes[value] for value in self._axis_values(name, **filters)]
+            view = np.take(view, codes, axis=axis)
+        return view
+
+    # Total cost grouped by the requested dimensions, e.g. rollup(("region", "service")).
+    # Returns {(value, ...): cost} with zero cells left out.
+    def rollup(self, by=(), **filters):
+        view = self.slice(**filters)
+        keep = [self.DIMENSIONS.index(name) for name in by]
+        summed = view.sum(axis=tuple(axis for axis in range(len(self.DIMENSIONS)) if axis not in keep))
+        if not keep:
+            return {(): float(summed)}
+        # np.sum keeps the remaining axes in cube order; reorder them as requested
+        order = sorted(keep)
+        summed = np.transpose(summed, [order.index(axis) for axis in keep])
+        axis_values = [self._axis_values(name, **filters) for name in by]
+        result = {}
+        for index in zip(*np.nonzero(summed)):
+            result[tuple(axis_values[axis][position] for axis, position in enumerate(index))] = float(summed[index])
+        return result
+
+    def total(self, **filters):
+        return float(self.slice(**filters).sum())
+
+    # Top-N cost-incurring resources over every loaded day
+    def top_resources(self, n=10):
+        totals = self.resource_totals[:len(self.resources)]
+        n = min(n, len(totals))
+        if n == 0:
+            return []
+        top = np.argpartition(-totals, n - 1)[:n]
+        top = top[np.argsort(-totals[top], kind="stable")]
+        return [(self.resources.values[code], float(totals[code])) for code in top]
+
+    def save(self, file_name):
+        dictionaries = {name: self.dimensions[name].values for name in self.DIMENSIONS}
+        dictionaries["resource"] = self.resources.values
+        dictionaries["day_resource_costs"] = {day: [list(costs), list(costs.values())] for day, costs in self.day_resource_costs.items()}
+        with open(file_name, "wb") as cube_file:
+            np.savez_compressed(
+                cube_file,
+                cells=self.cells[tuple(slice(0, size) for size in self.shape)],
+                resource_totals=self.resource_totals[:len(self.resources)],
+                dictionaries=np.array(json.dumps(dictionaries))
+            )
+
+    @classmethod
+    def load(cls, file_name):
+        cube = cls()
+        if not os.path.exists(file_name):
+            return cube
+        with np.load(file_name) as saved:
+            dictionaries = json.loads(str(saved["dictionaries"]))
+            for name in cls.DIMENSIONS:
+                cube.dimensions[name] = Dimension(dictionaries[name])
+            cube.resources = Dimension(dictionaries["resource"])
+            cube.day_resource_costs = {day: dict(zip(codes, costs)) for day, (codes, costs) in dictionaries.get("day_resource_costs", {}).items()}
+            cube.cells = np.zeros((4, 16, 16, 32))
+            cube._grow(saved["cells"].shape)
+            cube.cells[tuple(slice(0, size) for size in saved["cells"].shape)] = saved["cells"]
+            cube.resource_totals[:len(cube.resources)] = saved["resource_totals"]
+        return cube
+
+
+# Load the days in [date_from, date_to) that the cube does not hold yet (including
+# gaps left by earlier runs), and re-fetch the last refresh_days loaded days, which
+# may still have been partly billed when they were fetched. Costs are fetched DAILY
+# grouped by resourceId, service and compartmentName.
+def update_cost_cube(usage_client, cube, tenancy_ocid, date_from, date_to, compartment_depth=6, fetcher=None, refresh_days=3):
+    end = as_utc_day(date_to)
+    loaded = set(cube.days)
+    day = as_utc_day(date_from)
+    wanted = set()
+    while day < end:
+        if day.strftime("%Y-%m-%d") not in loaded:
+            wanted.add(day.strftime("%Y-%m-%d"))
+        day += datetime.timedelta(days=1)
+    if loaded:
+        refresh_from = (as_utc_day(max(loaded)) - datetime.timedelta(days=refresh_days - 1)).strftime("%Y-%m-%d")
+        wanted.update(day for day in cube.replaceable_days() if day >= refresh_from and as_utc_day(day) < end)
+    if not wanted:
+        return 0
+    start = as_utc_day(min(wanted))
+    end = min(end, as_utc_day(max(wanted)) + datetime.timedelta(days=1))
+    details = summarized_usages_details(
+        tenancy_ocid, start, end,
+        compartment_depth=compartment_depth,
+        group_by=("resourceId", "service", "compartmentName")
+    )
+    rows_by_day = {}
+    items = fetcher.items(details) if fetcher is not None else summarized_usage_items(usage_client, details)
+    for cost in items:
+        day = cost.time_usage_started.strftime("%Y-%m-%d")
+        region = cost.region or ocid_region(cost.resource_id)
+        rows_by_day.setdefault(day, []).append((region, cost.compartment_name or "unknown", cost.service or "unknown", cost.resource_id, cost.computed_amount))
+    rows = 0
+    for day in sorted(wanted):
+        rows += cube.append_day(day, rows_by_day.get(day, ()))
+    last_day = max(cube.days)
+    cube.finalize_days((as_utc_day(last_day) - datetime.timedelta(days=refresh_days - 1)).strftime("%Y-%m-%d"))
+    return rows
+
+
+# Accumulates (resource, day, cost) triplets with interned OCID and day axes in
+# compact typed arrays, then builds a CostMatrix.
+class CostMatrixBuilder:
+
+    def __init__(self):
+        self.resources = Dimension()
+        self.days = Dimension()
+        self.rows = array("q")
+        self.columns = array("q")
+        self.values = array("d")
+
+    def add(self, resource_id, day, cost):
+        if not resource_id:
+            return
+        self.rows.append(self.resources.encode(sys.intern(resource_id)))
+        self.columns.append(self.days.encode(day))
+        self.values.append(cost or 0)
+
+    def build(self):
+        # Day axis in chronological order
+        days = sorted(self.days.values)
+        day_order = np.empty(len(days), dtype=np.int64)
+        for position, day in enumerate(days):
+            day_order[self.days.codes[day]] = position
+        rows = np.frombuffer(self.rows, dtype=np.int64)
+        columns = day_order[np.frombuffer(self.columns, dtype=np.int64)] if len(days) else np.frombuffer(self.columns, dtype=np.int64)
+        values = np.frombuffer(self.values, dtype=np.float64)
+        # Sort by (resource, day) and sum duplicate cells
+        order = np.lexsort((columns, rows))
+        rows, columns, values = rows[order], columns[order], values[order]
+        if len(rows):
+            starts = np.concatenate(([True], (rows[1:] != rows[:-1]) | (columns[1:] != columns[:-1])))
+            values = np.add.reduceat(values, np.flatnonzero(starts))
+            rows, columns = rows[starts], columns[starts]
+        indptr = np.zeros(len(self.resources) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(self.resources)), out=indptr[1:])
+        return CostMatrix(list(self.resources.values), days, indptr, columns.astype(np.int64), values)
+
+
+# Sparse resource x day cost matrix in CSR layout (indptr/indices/data, one row per
+# resource OCID, one column per day). Saved as plain .npy files next to the two axes
+# so it can be reopened memory-mapped; per-resource series, day totals and moving
+# averages are vectorized array operations.
+class CostMatrix:
+
+    def __init__(self, resources, days, indptr, indices, data):
+        self.resources = resources
+        self.days = days
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.resource_codes = {resource_id: code for code, resource_id in enumerate(resources)}
+
+    @property
+    def shape(self):
+        return (len(self.resources), len(self.days))
+
+    @property
+    def nnz(self):
+        return len(self.data)
+
+    # Dense daily cost series of one resource
+    def resource_series(self, resource_id):
+        series = np.zeros(len(self.days))
+        code = self.resource_codes.get(resource_id)
+        if code is not None:
+            start, end = self.indptr[code], self.indptr[code + 1]
+            series[self.indices[start:end]] = self.data[start:end]
+        return series
+
+    # Total cost per resource (aligned with self.resources)
+    def resource_totals(self):
+        totals = np.zeros(len(self.resources))
+        non_empty = self.indptr[:-1] < self.indptr[1:]
+        if self.nnz:
+            totals[non_empty] = np.add.reduceat(self.data, self.indptr[:-1][non_empty])
+        return totals
+
+    # Total cost per day (aligned with self.days)
+    def day_totals(self):
+        return np.bincount(self.indices, weights=self.data, minlength=len(self.days))
+
+    # Trailing moving average over `window` days along the last axis
+    # (works for one series or a 2-D block of series; shorter windows at the start)
+    @staticmethod
+    def moving_average(series, window=7):
+        series = np.asarray(series, dtype=np.float64)
+        cumulative = np.concatenate((np.zeros(series.shape[:-1] + (1,)), np.cumsum(series, axis=-1)), axis=-1)
+        ends = np.arange(1, series.shape[-1] + 1)
+        starts = np.maximum(ends - window, 0)
+        return (cumulative[..., ends] - cumulative[..., starts]) / (ends - starts)
+
+    # Resources whose cost grew the most between the first and last `window` days
+    def top_trends(self, n=10, window=7):
+        window = max(1, min(window, len(self.days)))
+        first = np.zeros(len(self.resources))
+        last = np.zeros(len(self.resources))
+        rows = np.repeat(np.arange(len(self.resources)), np.diff(self.indptr))
+        in_first = self.indices < window
+        in_last = self.indices >= len(self.days) - window
+        np.add.at(first, rows[in_first], self.data[in_first])
+        np.add.at(last, rows[in_last], self.data[in_last])
+        growth = (last - first) / window
+        order = np.argsort(-growth, kind="stable")[:n]
+        return [(self.resources[code], float(growth[code])) for code in order]
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "indptr.npy"), self.indptr)
+        np.save(os.path.join(directory, "indices.npy"), self.indices)
+        np.save(os.path.join(directory, "data.npy"), self.data)
+        with open(os.path.join(directory, "axes.json"), "w") as axes_file:
+            json.dump({"resources": self.resources, "days": self.days}, axes_file)
+
+    # mmap=True maps the arrays read-only instead of reading them into memory
+    @classmethod
+    def load(cls, directory, mmap=True):
+        mmap_mode = "r" if mmap else None
+        with open(os.path.join(directory, "axes.json")) as axes_file:
+            axes = json.load(axes_file)
+        return cls(
+            axes["resources"],
+            axes["days"],
+            np.load(os.path.join(directory, "indptr.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(directory, "indices.npy"), mmap_mode=mmap_mode),
+            np.load(os.path.join(directory, "data.npy"), mmap_mode=mmap_mode)
+        )
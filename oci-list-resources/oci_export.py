@@ -0,0 +1,1234 @@
+import datetime
+import gzip
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import pickle
+import queue
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import zipfile
+import zlib
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import Cell
+
+from oci_records import run_strings
+
+# Export helpers shared by the oci-list-resources scripts.
+# Usage:
+#        from oci_export import ParallelXlsxWriter
+#        workbook = Workbook(write_only=True)
+#        xlsx_writer = ParallelXlsxWriter(workbook)
+#        sheet = xlsx_writer.create_sheet(title="Compute Instances")
+#        sheet.append(row)
+#        xlsx_writer.save(file_name)
+#
+#        from oci_export import SHEET_COLUMNS, write_resource_sheets
+#        sheets = {resource_type: workbook.create_sheet(title=resource_type) for resource_type in SHEET_COLUMNS}
+#        write_resource_sheets(sheets, resources, SHEET_COLUMNS, cost_resource_ids)
+#
+#        from oci_export import ParquetSink
+#        with ParquetSink(directory) as parquet_sink:
+#            parquet_sink.write("Block Volumes", item)
+#
+#        from oci_export import JsonlSink
+#        with JsonlSink(file_name) as jsonl_sink:
+#            jsonl_sink.write_resources(resource_key, resources[resource_key], findings[resource_key])
+#
+#        from oci_export import ShardedJsonlSink
+#        with ShardedJsonlSink(directory, compression="zstd") as shard_sink:
+#            shard_sink.write_resources(resource_key, resources[resource_key], findings[resource_key])
+#
+#        from oci_export import InventoryCounters
+#        inventory_counters.write_resources(resource_key, resources[resource_key], findings[resource_key])
+#        inventory_counters.write_summary(summary_sheet)
+#
+#        from oci_export import BackgroundWriter
+#        jsonl_sink = BackgroundWriter(JsonlSink(file_name))
+#
+#        from oci_export import SqliteSink
+#        with SqliteSink(file_name) as sqlite_sink:
+#            sqlite_sink.write_resources(resource_key, resources[resource_key], findings[resource_key])
+#            sqlite_sink.write_costs(cost_resource_ids)
+
+
+# Rows of a row file written by DeferredSheet (a sequence of pickled row chunks)
+def read_row_file(row_file):
+    with open(row_file, "rb") as rows:
+        while True:
+            try:
+                chunk = pickle.load(rows)
+            except EOFError:
+                return
+            yield from chunk
+
+
+# Render the XML part of one worksheet and deflate it into a temporary file.
+# Runs in a worker process: the rows are streamed from the sheet's row file through
+# openpyxl's own write-only sheet writer, so the part is byte-for-byte what
+# workbook.save would have produced. The row file is removed once rendered.
+# Returns (part_path, crc32, file_size, compress_size).
+def render_sheet_part(row_file, directory, compress_level=6):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    for row in read_row_file(row_file):
+        sheet.append(row)
+    sheet.close()
+    os.remove(row_file)
+    part_fd, part_path = tempfile.mkstemp(suffix=".xml.deflate", dir=directory)
+    crc = 0
+    file_size = 0
+    compress_size = 0
+    compressor = zlib.compressobj(compress_level, zlib.DEFLATED, -15)
+    with open(sheet._writer.out, "rb") as source, os.fdopen(part_fd, "wb") as part:
+        while True:
+            chunk = source.read(1024 * 1024)
+            if not chunk:
+                break
+            crc = zlib.crc32(chunk, crc)
+            file_size += len(chunk)
+            compressed = compressor.compress(chunk)
+            compress_size += len(compressed)
+            part.write(compressed)
+        compressed = compressor.flush()
+        compress_size += len(compressed)
+        part.write(compressed)
+    sheet._writer.cleanup()
+    return part_path, crc, file_size, compress_size
+
+
+# Append an already deflated member to an open zip archive
+def write_precompressed(archive, zip_info, part_path, crc, file_size, compress_size):
+    zip_info.compress_type = zipfile.ZIP_DEFLATED
+    zip_info.CRC = crc
+    zip_info.file_size = file_size
+    zip_info.compress_size = compress_size
+    zip64 = file_size > zipfile.ZIP64_LIMIT or compress_size > zipfile.ZIP64_LIMIT
+    zip_info.header_offset = archive.fp.tell()
+    archive._didModify = True
+    archive.fp.write(zip_info.FileHeader(zip64))
+    with open(part_path, "rb") as part:
+        shutil.copyfileobj(part, archive.fp, 1024 * 1024)
+    archive.filelist.append(zip_info)
+    archive.NameToInfo[zip_info.filename] = zip_info
+    archive.start_dir = archive.fp.tell()
+
+
+# The parallel path relies on private openpyxl and zipfile internals (the write-only
+# sheet's _writer.out/cleanup(), ZipFile._didModify/start_dir; checked with the versions
+# pinned in requirements.txt). Render and assemble a one-row probe sheet in-process
+# and read it back: False when an installed version no longer supports them.
+def parallel_xlsx_supported(directory):
+    try:
+        row_fd, row_file = tempfile.mkstemp(suffix=".rows", dir=directory)
+        with os.fdopen(row_fd, "wb") as rows:
+            pickle.dump([["probe"]], rows, pickle.HIGHEST_PROTOCOL)
+        part_path, crc, file_size, compress_size = render_sheet_part(row_file, directory)
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            write_precompressed(archive, zipfile.ZipInfo("probe.xml"), part_path, crc, file_size, compress_size)
+        os.remove(part_path)
+        with zipfile.ZipFile(buffer) as archive:
+            return b">probe<" in archive.read("probe.xml")
+    except (AttributeError, TypeError, OSError, zipfile.BadZipFile):
+        return False
+
+
+# Collects the rows of one sheet rendered by ParallelXlsxWriter. Rows are spooled
+# to a temporary row file in chunks of chunk_rows, so only one chunk per sheet is
+# held in memory; the worker streams the file back when rendering the sheet.
+class DeferredSheet:
+
+    def __init__(self, sheet, directory, chunk_rows=1000):
+        self.sheet = sheet
+        self.title = sheet.title
+        self.chunk_rows = chunk_rows
+        self.chunk = []
+        row_fd, self.row_file = tempfile.mkstemp(suffix=".rows", dir=directory)
+        self.rows = os.fdopen(row_fd, "wb")
+
+    def append(self, row):
+        row = list(row)
+        # Workers render with their own style table: a styled cell would be written with
+        # a style id that does not exist in the main workbook's styles.xml
+        assert not any(isinstance(value, Cell) for value in row), f"{self.title}: deferred rows must hold plain values, not cells"
+        self.chunk.append(row)
+        if len(self.chunk) >= self.chunk_rows:
+            self._flush()
+
+    def _flush(self):
+        if self.chunk:
+            pickle.dump(self.chunk, self.rows, pickle.HIGHEST_PROTOCOL)
+            self.chunk = []
+
+    def close(self):
+        self._flush()
+        self.rows.close()
+
+
+# Assemble a write-only workbook whose large sheets are rendered in parallel.
+# Sheets are still created on the workbook in their usual order (so sheet names,
+# order, charts and styles are unchanged); the rows of the sheets registered with
+# add_rows are spooled to temporary row files and rendered and compressed in worker
+# processes while the main process keeps building the next sheets, so no sheet is
+# ever held in memory as a whole. save() writes the workbook skeleton with openpyxl
+# and swaps in the pre-rendered parts.
+# Worker processes are forked: the scripts have no __main__ guard, so a spawned
+# interpreter would re-run them. Where fork is unavailable the parts are rendered
+# in-process. Rows must hold plain values (no styled cells). When the installed
+# openpyxl/zipfile fail the parallel_xlsx_supported probe, the sheets are the
+# workbook's own and save() is a serial workbook.save.
+class ParallelXlsxWriter:
+
+    def __init__(self, workbook, processes=None):
+        self.workbook = workbook
+        self.directory = tempfile.mkdtemp(prefix="oci_xlsx_")
+        self.parts = []
+        self.pending = []
+        self.executor = None
+        self.serial = not parallel_xlsx_supported(self.directory)
+        if self.serial:
+            print("Warning: this openpyxl version cannot render sheets in parallel, the workbook is saved serially")
+        elif "fork" in multiprocessing.get_all_start_methods():
+            self.executor = ProcessPoolExecutor(max_workers=processes or os.cpu_count(), mp_context=multiprocessing.get_context("fork"))
+
+    # Create a sheet on the workbook and return a DeferredSheet collecting its rows;
+    # the rows are handed to a worker when the next sheet is created or on save
+    def create_sheet(self, title):
+        if self.serial:
+            return self.workbook.create_sheet(title=title)
+        self._submit_pending()
+        self.pending = [DeferredSheet(self.workbook.create_sheet(title=title), self.directory)]
+        return self.pending[0]
+
+    # Create several sheets that are filled together (e.g. by write_resource_sheets);
+    # returns {title: DeferredSheet}, handed to workers like create_sheet's
+    def create_sheets(self, titles):
+        if self.serial:
+            return {title: self.workbook.create_sheet(title=title) for title in titles}
+        self._submit_pending()
+        self.pending = [DeferredSheet(self.workbook.create_sheet(title=title), self.directory) for title in titles]
+        return {sheet.title: sheet for sheet in self.pending}
+
+    def _submit_pending(self):
+        for deferred in self.pending:
+            self._submit(deferred)
+        self.pending = []
+
+    def _submit(self, deferred):
+        deferred.close()
+        if self.executor is not None:
+            part = self.executor.submit(render_sheet_part, deferred.row_file, self.directory)
+        else:
+            part = render_sheet_part(deferred.row_file, self.directory)
+        self.parts.append((deferred.sheet, part))
+
+    # Render all the rows (header included) of an empty write-only sheet
+    def add_rows(self, sheet, rows):
+        if self.serial:
+            for row in rows:
+                sheet.append(row)
+            return
+        deferred = DeferredSheet(sheet, self.directory)
+        for row in rows:
+            deferred.append(row)
+        self._submit(deferred)
+
+    def save(self, file_name):
+        try:
+            if self.serial:
+                self.workbook.save(file_name)
+                return
+            self._submit_pending()
+            # Part names follow openpyxl: xl/worksheets/sheet<position>.xml
+            positions = {id(sheet): position for position, sheet in enumerate(self.workbook.worksheets, 1)}
+            self.workbook.save(file_name)
+            rendered = {}
+            for sheet, part in self.parts:
+                rendered[f"xl/worksheets/sheet{positions[id(sheet)]}.xml"] = part.result() if self.executor is not None else part
+            assembled_name = os.path.join(self.directory, "assembled.xlsx")
+            with zipfile.ZipFile(file_name) as skeleton, zipfile.ZipFile(assembled_name, "w", zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+                for zip_info in skeleton.infolist():
+                    if zip_info.filename in rendered:
+                        write_precompressed(archive, zip_info, *rendered[zip_info.filename])
+                    else:
+                        archive.writestr(zip_info, skeleton.read(zip_info.filename))
+            shutil.move(assembled_name, file_name)
+        finally:
+            self.close()
+
+    # Stop the workers and remove the temporary files; called by save() and by the
+    # scripts on errors, so it can run more than once
+    def close(self):
+        for deferred in self.pending:
+            deferred.rows.close()
+        self.pending = []
+        if self.executor is not None:
+            self.executor.shutdown(cancel_futures=True)
+            self.executor = None
+        if self.directory is not None:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+
+
+# Columns of every XLSX resource sheet: (header, record key, cell type).
+# Cell types: "value" (written as is), "text" (str() of the value, as dates have
+# always been shown), "cost" (total cost of the resource in the period), and
+# "defined_tags"/"tags", which expand into one column per tag key (see TagColumns).
+SHEET_COLUMNS = {
+    "Daily Costs": [
+        ("Compartment", "compartment_name", "value"), ("Region", "region", "value"), ("ID", "id", "value"),
+        ("Currency", "currency", "value"), ("Cost", "cost", "value"), ("Starttime", "starttime", "value"),
+    ],
+    "Compute Instances": [
+        ("Compartment", "compartment_name", "value"), ("Region", "region", "value"), ("Name", "name", "value"),
+        ("ID", "id", "value"), ("STATE", "state", "value"), ("Defined_tags", "defined_tags", "defined_tags"),
+        ("Freeform_tags", "freeform_tags", "tags"), ("Attached_to", "attached_to", "text"),
+        ("BootVolume_state", "volume_state", "text"), ("Availability_domain", "availability_domain", "text"),
+        ("Time_created", "time_created", "text"), ("Total_cost_in_period", "total_cost_in_period", "cost"),
+    ],
+    "Block Volumes": [
+        ("Compartment", "compartment_name", "value"), ("Region", "region", "value"), ("Name", "name", "value"),
+        ("ID", "id", "value"), ("STATE", "state", "value"), ("Defined_tags", "defined_tags", "defined_tags"),
+        ("Freeform_tags", "freeform_tags", "tags"), ("Attached_to", "attached_to_instance", "text"),
+        ("Size_in_gbs", "size_in_gbs", "value"), ("Time_created", "time_created", "text"),
+        ("Total_cost_in_period", "total_cost_in_period", "cost"),
+    ],
+    "Block Volumes Bkp": [
+        ("Compartment", "compartment_name", "value"), ("Region", "region", "value"), ("Name", "name", "value"),
+        ("ID", "id", "value"), ("STATE", "state", "value"), ("Defined_tags", "defined_tags", "defined_tags"),
+        ("Freeform_tags", "freeform_tags", "tags"), ("Attached_to", "attached_to", "text"),
+        ("Size_in_gbs", "size_in_gbs", "value"), ("Time_created", "time_created", "text"),
+        ("Total_cost_in_period", "total_cost_in_period", "cost"),
+    ],
+    "Boot Volumes": [
+        ("Compartment", "compartment_name", "value"), ("Region", "region", "value"), ("Name", "name", "value"),
+        ("ID", "id", "value"), ("STATE", "state", "value"), ("Defined_tags", "defined_tags", "defined_tags"),
+        ("Freeform_tags", "freeform_tags", "tags"), ("Attached_to", "attached_to_instance", "text"),
+        ("Availability_domain", "availability_domain", "text"), ("Size_in_gbs", "size_in_gbs", "value"),
+        ("Time_created", "time_created", "text"), ("Total_cost_in_period", "total_cost_in_period", "cost"),
+    ],
+    "Boot Volumes Bkp": [
+        ("Compartment", "compartment_name", "value"), ("Region", "region", "value"), ("Name", "name", "value"),
+        ("ID", "id", "value"), ("STATE", "state", "value"), ("Defined_tags", "defined_tags", "defined_tags"),
+        ("Freeform_tags", "freeform_tags", "tags"), ("Size_in_gbs", "size_in_gbs", "value"),
+        ("Time_created", "time_created", "text"), ("Total_cost_in_period", "total_cost_in_period", "cost"),
+    ],
+    "File Systems": [
+        ("Compartment", "compartment_name", "value"), ("Region", "region", "value"), ("Name", "name", "value"),
+        ("ID", "id", "value"), ("STATE", "state", "value"), ("Defined_tags", "defined_tags", "defined_tags"),
+        ("Freeform_tags", "freeform_tags", "tags"), ("Metered_bytes", "metered_bytes", "value"),
+        ("Time_created", "time_created", "text"), ("Total_cost_in_period", "total_cost_in_period", "cost"),
+    ],
+    "Autonomous Databases": [
+        ("Compartment", "compartment_name", "value"), ("Region", "region", "value"), ("Name", "name", "value"),
+        ("ID", "id", "value"), ("STATE", "state", "value"), ("Defined_tags", "defined_tags", "defined_tags"),
+        ("Freeform_tags", "freeform_tags", "tags"), ("Ocpus", "ocups", "value"), ("Size_in_gbs", "size_in_gbs", "value"),
+        ("Time_created", "time_created", "text"), ("Total_cost_in_period", "total_cost_in_period", "cost"),
+    ],
+    "All Resources": [
+        ("Compartment", "compartment_name", "value"), ("Region", "region", "value"), ("Resource_Type", "resource_type", "value"),
+        ("Name", "name", "value"), ("ID", "id", "value"), ("STATE", "state", "value"),
+        ("Defined_tags", "defined_tags", "defined_tags"), ("Freeform_tags", "freeform_tags", "tags"), ("Time_created", "time_created", "value"),
+    ],
+    "Volume Attachments": [
+        ("Volume_ID", "volume_id", "value"), ("Instance_ID", "instance_id", "value"), ("STATE", "state", "value"),
+        ("Availability_domain", "availability_domain", "value"),
+    ],
+}
+
+# Sheets whose rows are sorted before being written (the rest keep discovery order)
+# (region, compartment and type are compared by their run_strings ranks)
+SHEET_SORT_KEYS = {
+    "Daily Costs": lambda item: (run_strings.rank(item.get("region", "")), item.get("starttime", "")),
+    "All Resources": lambda item: (run_strings.rank(item.get("compartment_name", "")), run_strings.rank(item.get("resource_type", "")), item.get("name", "")),
+}
+
+
+# Cell of the "cost" columns: the record's own total_cost_in_period (deleted
+# resources carry one) or its total from the cost index formatted with cost_format
+def total_cost_cell(cost_index, cost_format="{total_cost:.12f}"):
+    def cost_cell(item):
+        total_cost = item.get("total_cost_in_period", "")
+        if not total_cost:
+            cost_info = cost_index.get(item.get("id"))
+            if cost_info is not None:
+                total_cost = cost_format.format(**cost_info)
+        return total_cost
+    return cost_cell
+
+
+# Value of one flattened tag: path is (namespace, key) for defined tags and (key,)
+# for freeform tags. Values are mostly unique (CreatedOn timestamps, owners, ids)
+# and are returned as plain strings, not added to run_strings, which only holds
+# low-cardinality values and lives for the whole run.
+def tag_value(tags, path):
+    for part in path:
+        if not isinstance(tags, dict):
+            return None
+        tags = tags.get(part)
+    return None if tags is None else str(tags)
+
+
+# Flattened tag columns: one column per defined tag ("namespace.key") and per
+# freeform tag ("freeform.key") instead of the str() of the tag dicts.
+# The columns of each resource type are collected in one streaming pass over the
+# records (add/scan) before the writers lay out their headers.
+class TagColumns:
+
+    def __init__(self):
+        self.paths = {}
+
+    def add(self, resource_type, item):
+        defined_tags = item.get("defined_tags")
+        if isinstance(defined_tags, dict):
+            paths = self.paths.setdefault((resource_type, "defined_tags"), {})
+            for namespace, tags in defined_tags.items():
+                if isinstance(tags, dict):
+                    for key in tags:
+                        paths[(namespace, key)] = None
+        freeform_tags = item.get("freeform_tags")
+        if isinstance(freeform_tags, dict):
+            paths = self.paths.setdefault((resource_type, "freeform_tags"), {})
+            for key in freeform_tags:
+                paths[(key,)] = None
+
+    def scan(self, resources, resource_types=None):
+        for resource_data in resources.values():
+            for resource_type, items in resource_data.items():
+                if resource_types is None or resource_type in resource_types:
+                    for item in items:
+                        self.add(resource_type, item)
+        return self
+
+    # [(column name, path)] of a tags record key, sorted by name
+    def columns(self, resource_type, key):
+        paths = self.paths.get((resource_type, key), {})
+        if key == "defined_tags":
+            return sorted((".".join(path), path) for path in paths)
+        return sorted((f"freeform.{path[0]}", path) for path in paths)
+
+
+# Cell getters of row_extractor (tag_cells returns the cells of all the flattened tags of a key)
+def value_cell(key):
+    return lambda item: item.get(key)
+
+
+def text_cell(key):
+    return lambda item: str(item.get(key))
+
+
+def tag_cells(key, paths):
+    return lambda item: [tag_value(item.get(key), path) for path in paths]
+
+
+# Build the function returning the row of a record from the columns of a sheet once:
+# a list of (getter, expands) pairs, so writing a row only calls one prebuilt getter
+# per column (expands: the getter returns several cells). Returns (headers, extractor).
+def row_extractor(resource_type, columns, cost_cell=None, tag_columns=None):
+    headers = []
+    getters = []
+    for header, key, cell_type in columns:
+        if cell_type in ("defined_tags", "tags"):
+            tag_paths = tag_columns.columns(resource_type, key) if tag_columns is not None else []
+            headers.extend(name for name, path in tag_paths)
+            getters.append((tag_cells(key, [path for name, path in tag_paths]), True))
+            continue
+        headers.append(header)
+        if cell_type == "cost":
+            getters.append((cost_cell, False))
+        elif cell_type == "text":
+            getters.append((text_cell(key), False))
+        else:
+            getters.append((value_cell(key), False))
+
+    def extractor(item):
+        row = []
+        for getter, expands in getters:
+            if expands:
+                row.extend(getter(item))
+            else:
+                row.append(getter(item))
+        return row
+    return headers, extractor
+
+
+# Volume types whose records are joined with the "Volume Attachments" relation
+ATTACHED_VOLUME_TYPES = ("Block Volumes", "Boot Volumes")
+
+
+# {volume_id: [attachment records]} of every "Volume Attachments" list. An attachment
+# is listed in its instance's compartment, which need not be the volume's, so the
+# index spans the whole inventory.
+def attachment_index(resources):
+    attachments = {}
+    for resource_data in resources.values():
+        for attachment in resource_data.get("Volume Attachments", ()):
+            attachments.setdefault(attachment.get("volume_id"), []).append(attachment)
+    return attachments
+
+
+# Join volume records with their attachments at export time. Each volume stays one
+# row with its instance(s) in attached_to_instance; with denormalized it is written
+# once unattached and again for every attachment (with the attachment's state,
+# instance and AD), the layout of the sheets before attachments were normalized.
+def join_attachments(items, attachments, denormalized=False):
+    for item in items:
+        volume_attachments = attachments.get(item.get("id"))
+        if not volume_attachments:
+            yield item
+        elif denormalized:
+            yield item
+            for attachment in volume_attachments:
+                yield {**item, "state": attachment.get("state"), "attached_to_instance": attachment.get("instance_id"),
+                       "availability_domain": attachment.get("availability_domain") or item.get("availability_domain")}
+        else:
+            yield {**item, "attached_to_instance": ", ".join(str(attachment.get("instance_id")) for attachment in volume_attachments)}
+
+
+# Write every resource sheet in a single pass over the inventory: each record goes
+# straight to the sheet of its type through that sheet's compiled extractor. sheets
+# maps resource types to empty sheets (types without a sheet are skipped); the
+# types in sort_keys are collected and sorted first. Tag columns are scanned from
+# the records unless given. Volumes are joined with their attachments (see
+# join_attachments). Returns the records written per type.
+def write_resource_sheets(sheets, resources, sheet_columns, cost_index, cost_format="{total_cost:.12f}", sort_keys=None, tag_columns=None,
+                          denormalized_attachments=False):
+    sort_keys = SHEET_SORT_KEYS if sort_keys is None else sort_keys
+    if tag_columns is None:
+        tag_columns = TagColumns().scan(resources, sheets)
+    attachments = attachment_index(resources)
+    cost_cell = total_cost_cell(cost_index, cost_format)
+    extractors = {}
+    for resource_type, sheet in sheets.items():
+        headers, extractors[resource_type] = row_extractor(resource_type, sheet_columns[resource_type], cost_cell, tag_columns)
+        sheet.append(headers)
+    collected = {resource_type: [] for resource_type in sort_keys if resource_type in sheets}
+    counts = dict.fromkeys(sheets, 0)
+    for resource_data in resources.values():
+        for resource_type, items in resource_data.items():
+            if resource_type not in extractors:
+                continue
+            counts[resource_type] += len(items)
+            if resource_type in ATTACHED_VOLUME_TYPES:
+                items = join_attachments(items, attachments, denormalized_attachments)
+            if resource_type in collected:
+                collected[resource_type].extend(items)
+                continue
+            append = sheets[resource_type].append
+            extract = extractors[resource_type]
+            for item in items:
+                append(extract(item))
+    for resource_type, items in collected.items():
+        items.sort(key=sort_keys[resource_type])
+        append = sheets[resource_type].append
+        extract = extractors[resource_type]
+        for item in items:
+            append(extract(item))
+    return counts
+
+
+# Column schema of every exported resource type: (record key, column type).
+# Types: string, int, float, timestamp, date, tags (freeform) and defined_tags.
+INVENTORY_SCHEMAS = {
+    "Compute Instances": [
+        ("compartment_name", "string"), ("region", "string"), ("name", "string"), ("id", "string"), ("state", "string"),
+        ("defined_tags", "defined_tags"), ("freeform_tags", "tags"), ("attached_to", "string"), ("volume_state", "string"),
+        ("availability_domain", "string"), ("time_created", "timestamp"), ("total_cost_in_period", "float"),
+    ],
+    "Block Volumes": [
+        ("compartment_name", "string"), ("region", "string"), ("name", "string"), ("id", "string"), ("state", "string"),
+        ("defined_tags", "defined_tags"), ("freeform_tags", "tags"), ("attached_to_instance", "string"),
+        ("size_in_gbs", "int"), ("time_created", "timestamp"), ("total_cost_in_period", "float"),
+    ],
+    "Block Volumes Bkp": [
+        ("compartment_name", "string"), ("region", "string"), ("name", "string"), ("id", "string"), ("state", "string"),
+        ("defined_tags", "defined_tags"), ("freeform_tags", "tags"), ("attached_to", "string"),
+        ("size_in_gbs", "int"), ("time_created", "timestamp"), ("total_cost_in_period", "float"),
+    ],
+    "Boot Volumes": [
+        ("compartment_name", "string"), ("region", "string"), ("name", "string"), ("id", "string"), ("state", "string"),
+        ("defined_tags", "defined_tags"), ("freeform_tags", "tags"), ("attached_to_instance", "string"),
+        ("availability_domain", "string"), ("size_in_gbs", "int"), ("time_created", "timestamp"), ("total_cost_in_period", "float"),
+    ],
+    "Boot Volumes Bkp": [
+        ("compartment_name", "string"), ("region", "string"), ("name", "string"), ("id", "string"), ("state", "string"),
+        ("defined_tags", "defined_tags"), ("freeform_tags", "tags"),
+        ("size_in_gbs", "int"), ("time_created", "timestamp"), ("total_cost_in_period", "float"),
+    ],
+    "File Systems": [
+        ("compartment_name", "string"), ("region", "string"), ("name", "string"), ("id", "string"), ("state", "string"),
+        ("defined_tags", "defined_tags"), ("freeform_tags", "tags"),
+        ("metered_bytes", "int"), ("time_created", "timestamp"), ("total_cost_in_period", "float"),
+    ],
+    "Autonomous Databases": [
+        ("compartment_name", "string"), ("region", "string"), ("name", "string"), ("id", "string"), ("state", "string"),
+        ("defined_tags", "defined_tags"), ("freeform_tags", "tags"),
+        ("ocups", "float"), ("size_in_gbs", "int"), ("time_created", "timestamp"), ("total_cost_in_period", "float"),
+    ],
+    "All Resources": [
+        ("compartment_name", "string"), ("region", "string"), ("resource_type", "string"), ("name", "string"), ("id", "string"),
+        ("state", "string"), ("defined_tags", "defined_tags"), ("freeform_tags", "tags"), ("time_created", "timestamp"),
+    ],
+    "Daily Costs": [
+        ("compartment_name", "string"), ("region", "string"), ("id", "string"), ("currency", "string"),
+        ("cost", "float"), ("starttime", "date"),
+    ],
+    "Cost Usage Reports": [
+        ("report_type", "string"), ("name", "string"), ("size_bytes", "int"),
+        ("time_created", "timestamp"), ("time_modified", "timestamp"), ("etag", "string"),
+    ],
+    "Volume Attachments": [
+        ("volume_id", "string"), ("instance_id", "string"), ("state", "string"), ("availability_domain", "string"),
+    ],
+}
+
+# Low-cardinality columns stored dictionary-encoded in Parquet
+DICTIONARY_COLUMNS = ["compartment_name", "region", "state", "resource_type", "availability_domain", "volume_state", "currency", "report_type"]
+
+
+# Value converters for each column type ("N/A" and other placeholders become nulls)
+def to_string(value):
+    return None if value is None else str(value)
+
+
+def to_int(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return int(value)
+
+
+def to_float(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def to_timestamp(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    if not value or value in ("N/A", "None"):
+        return None
+    try:
+        return datetime.datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+
+
+def to_date(value):
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def to_tags(value):
+    if not isinstance(value, dict):
+        return None
+    return [(str(key), to_string(tag_value)) for key, tag_value in value.items()]
+
+
+def to_defined_tags(value):
+    if not isinstance(value, dict):
+        return None
+    return [(str(namespace), to_tags(tags) or []) for namespace, tags in value.items()]
+
+
+# run_strings code of a dictionary-encoded column value
+def to_code(value):
+    return None if value is None else run_strings.encode(run_strings.intern(str(value)))
+
+
+COLUMN_CONVERTERS = {
+    "string": to_string,
+    "int": to_int,
+    "float": to_float,
+    "timestamp": to_timestamp,
+    "date": to_date,
+    "tags": to_tags,
+    "defined_tags": to_defined_tags,
+    "dictionary": to_code,
+}
+
+
+# pyarrow is only needed for Parquet output and zstd-compressed shards
+def import_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ImportError("pyarrow is required for Parquet output and zstd shards (pip install pyarrow)")
+    return pyarrow
+
+
+# Parquet columns of a resource type: [(column name, column type, record key, tag path)].
+# DICTIONARY_COLUMNS become "dictionary" columns buffered as run_strings codes.
+# With tag_columns the tag maps are replaced by one plain string column ("tag")
+# per flattened tag (left to the Parquet writer's own per-file dictionary).
+def parquet_columns(resource_type, tag_columns=None):
+    columns = []
+    for key, column_type in INVENTORY_SCHEMAS[resource_type]:
+        if column_type in ("tags", "defined_tags") and tag_columns is not None:
+            columns.extend((name, "tag", key, path) for name, path in tag_columns.columns(resource_type, key))
+        elif column_type == "string" and key in DICTIONARY_COLUMNS:
+            columns.append((key, "dictionary", key, None))
+        else:
+            columns.append((key, column_type, key, None))
+    return columns
+
+
+# Arrow dictionary array of a buffered column of run_strings codes: the codes are
+# dictionary-encoded by arrow and only the strings they use are taken from the
+# table (strings: the run_strings values as a chunked arrow array)
+def coded_array(pa, codes, strings):
+    encoded = pa.array(codes, pa.int32()).dictionary_encode()
+    return pa.DictionaryArray.from_arrays(encoded.indices, strings.take(encoded.dictionary).combine_chunks())
+
+
+def arrow_schema(resource_type, columns=None):
+    pa = import_pyarrow()
+    arrow_types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "float": pa.float64(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "date": pa.date32(),
+        "tags": pa.map_(pa.string(), pa.string()),
+        "defined_tags": pa.map_(pa.string(), pa.map_(pa.string(), pa.string())),
+        "tag": pa.string(),
+        "dictionary": pa.dictionary(pa.int32(), pa.string()),
+    }
+    columns = parquet_columns(resource_type) if columns is None else columns
+    return pa.schema([pa.field(name, arrow_types[column_type]) for name, column_type, key, path in columns])
+
+
+# File name of a resource type ("Block Volumes Bkp" -> "block_volumes_bkp")
+def resource_type_slug(resource_type):
+    return resource_type.lower().replace(" ", "_")
+
+
+# Typed Parquet files, one per resource type, with a stable schema per type.
+# Records are buffered per type and flushed as one row group every
+# row_group_size rows, so memory stays bounded by one row group per type.
+# zstd compression and dictionary encoding of the low-cardinality columns (built
+# from their run_strings codes) keep the files small and fast to scan column by column. With tag_columns (a scanned
+# TagColumns) tags are written as flattened string columns.
+# With shard_by_region every type is split into hive-style region partitions
+# (<type>/region=<region>/part-0.parquet) that dataset readers can prune; the
+# region is then only stored in the partition path, as readers expect.
+# manifest.json lists every file with its row count and checksum.
+class ParquetSink:
+
+    def __init__(self, directory, row_group_size=131072, compression="zstd", tag_columns=None, shard_by_region=False):
+        self.pa = import_pyarrow()
+        self.directory = directory
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.tag_columns = tag_columns
+        self.shard_by_region = shard_by_region
+        self.shard_counts = {}
+        self.strings = []
+        self.string_count = 0
+        self.columns = {}
+        self.writers = {}
+        self.buffers = {}
+        self.counts = {}
+        os.makedirs(directory, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # File of a type (or, when sharded, its directory or the shard of one region)
+    def path(self, resource_type, region=None):
+        if not self.shard_by_region:
+            return os.path.join(self.directory, f"{resource_type_slug(resource_type)}.parquet")
+        if region is None:
+            return os.path.join(self.directory, resource_type_slug(resource_type))
+        return os.path.join(self.directory, resource_type_slug(resource_type), f"region={region}", "part-0.parquet")
+
+    # overrides supply (or replace) record keys, e.g. total_cost_in_period joined from the costs
+    def write(self, resource_type, item, **overrides):
+        columns = self.columns.get(resource_type)
+        if columns is None:
+            columns = self.columns[resource_type] = parquet_columns(resource_type, self.tag_columns)
+            if self.shard_by_region:
+                # The region is the hive partition key (region=<region>), not a column of the files
+                columns[:] = [column for column in columns if column[0] != "region"]
+        shard = (resource_type, shard_region(overrides.get("region", item.get("region"))) if self.shard_by_region else None)
+        buffer = self.buffers.get(shard)
+        if buffer is None:
+            buffer = self.buffers[shard] = {name: [] for name, column_type, key, path in columns}
+        for name, column_type, key, path in columns:
+            value = overrides[key] if key in overrides else item.get(key)
+            buffer[name].append(tag_value(value, path) if path is not None else COLUMN_CONVERTERS[column_type](value))
+        self.counts[resource_type] = self.counts.get(resource_type, 0) + 1
+        self.shard_counts[shard] = self.shard_counts.get(shard, 0) + 1
+        if len(buffer[columns[0][0]]) >= self.row_group_size:
+            self.flush(shard)
+
+    def flush(self, shard):
+        buffer = self.buffers.pop(shard, None)
+        if not buffer:
+            return
+        resource_type, region = shard
+        columns = self.columns[resource_type]
+        schema = arrow_schema(resource_type, columns)
+        writer = self.writers.get(shard)
+        if writer is None:
+            os.makedirs(os.path.dirname(self.path(resource_type, region)), exist_ok=True)
+            writer = self.writers[shard] = self.pa.parquet.ParquetWriter(
+                self.path(resource_type, region),
+                schema,
+                compression=self.compression,
+                use_dictionary=[name for name, column_type, key, path in columns if column_type == "tag" or name in DICTIONARY_COLUMNS],
+                write_statistics=True
+            )
+        # Strings added to run_strings since the last flush are appended as a new chunk
+        if len(run_strings) > self.string_count:
+            self.strings.append(self.pa.array(run_strings.values[self.string_count:], self.pa.string()))
+            self.string_count += len(self.strings[-1])
+        strings = self.pa.chunked_array(self.strings, self.pa.string())
+        arrays = [
+            coded_array(self.pa, buffer[name], strings) if column_type == "dictionary" else self.pa.array(buffer[name], schema.field(name).type)
+            for name, column_type, key, path in columns
+        ]
+        table = self.pa.Table.from_arrays(arrays, schema=schema)
+        writer.write_table(table, row_group_size=self.row_group_size)
+
+    def close(self):
+        for shard in list(self.buffers):
+            self.flush(shard)
+        for writer in self.writers.values():
+            writer.close()
+        if self.writers:
+            write_manifest(self.directory, [
+                (self.path(resource_type, region), resource_type, region, rows)
+                for (resource_type, region), rows in self.shard_counts.items()
+            ], format="parquet", compression=self.compression)
+        self.writers = {}
+
+
+# Append-only JSON Lines export written while discovery runs: one line per
+# resource ({"key", "sheet", ...record}) and per finding ({"key", "finding"}). The
+# sheet type has its own key, so a record's own resource_type (search results) is kept.
+# Lines are flushed as they are written and fsynced every fsync_every records or
+# fsync_interval seconds, so an interrupted run keeps everything discovered up to
+# the last sync and memory never holds more than one line of output.
+class JsonlSink:
+
+    def __init__(self, file_name, fsync_every=1000, fsync_interval=5.0):
+        self.file_name = file_name
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.file = open(file_name, "w", encoding="utf-8")
+        self.count = 0
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def write(self, record):
+        self.file.write(json.dumps(record, default=str))
+        self.file.write("\n")
+        self.count += 1
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    # Write everything discovered for one resource key (compartment/region or the cost root)
+    def write_resources(self, key, resource_data, findings=()):
+        for resource_type, items in resource_data.items():
+            for item in items:
+                self.write({"key": key, "sheet": resource_type, **item})
+        for finding in findings:
+            self.write({"key": key, "finding": finding})
+        self.file.flush()
+
+    # Per-resource cost totals ({ocid: {"total_cost", "currency", "region"}})
+    def write_costs(self, cost_index):
+        for resource_id, cost_info in cost_index.items():
+            self.write({"key": "COSTS", "id": resource_id, **cost_info})
+        self.file.flush()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if self.file.closed:
+            return
+        self.sync()
+        self.file.close()
+
+
+# SQLite column types and value adapters for the INVENTORY_SCHEMAS column types
+SQLITE_TYPES = {
+    "string": "TEXT",
+    "int": "INTEGER",
+    "float": "REAL",
+    "timestamp": "TEXT",
+    "date": "TEXT",
+    "tags": "TEXT",
+    "defined_tags": "TEXT",
+}
+
+
+def sqlite_value(column_type, value):
+    if column_type in ("tags", "defined_tags"):
+        return json.dumps(value) if isinstance(value, dict) else None
+    value = COLUMN_CONVERTERS[column_type](value)
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return value
+
+
+# Indexed SQLite export of the inventory:
+#   one table per resource type (columns from INVENTORY_SCHEMAS, tags as JSON text;
+#   volume_attachments joins block_volumes and boot_volumes on volume_id),
+#   resources: every record with its key, type, id, name, compartment, region and state,
+#   tags: one row per tag (namespace is NULL for freeform tags),
+#   findings and costs (per-resource totals, written by write_costs).
+# Every write_resources call is one bulk transaction, and the indexes are built on
+# close, after the bulk load, so inserts never pay for index maintenance.
+class SqliteSink:
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+        if os.path.exists(file_name):
+            os.remove(file_name)
+        # check_same_thread=False: the sink may be driven by a BackgroundWriter thread
+        self.connection = sqlite3.connect(file_name, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.count = 0
+        with self.connection:
+            for resource_type, columns in INVENTORY_SCHEMAS.items():
+                column_defs = ", ".join(f"{key} {SQLITE_TYPES[column_type]}" for key, column_type in columns)
+                self.connection.execute(f"CREATE TABLE {resource_type_slug(resource_type)} (resource_key TEXT, {column_defs})")
+            self.connection.execute("CREATE TABLE resources (resource_key TEXT, resource_type TEXT, id TEXT, name TEXT, compartment_name TEXT, region TEXT, state TEXT, time_created TEXT)")
+            self.connection.execute("CREATE TABLE tags (resource_id TEXT, resource_type TEXT, namespace TEXT, key TEXT, value TEXT)")
+            self.connection.execute("CREATE TABLE findings (resource_key TEXT, finding TEXT)")
+            self.connection.execute("CREATE TABLE costs (id TEXT PRIMARY KEY, total_cost REAL, currency TEXT, region TEXT)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # Write everything discovered for one resource key in a single transaction
+    def write_resources(self, key, resource_data, findings=()):
+        resource_rows = []
+        tag_rows = []
+        with self.connection:
+            for resource_type, items in resource_data.items():
+                columns = INVENTORY_SCHEMAS.get(resource_type)
+                if columns is not None:
+                    placeholders = ", ".join("?" * (len(columns) + 1))
+                    self.connection.executemany(
+                        f"INSERT INTO {resource_type_slug(resource_type)} VALUES ({placeholders})",
+                        ([key] + [sqlite_value(column_type, item.get(column)) for column, column_type in columns] for item in items)
+                    )
+                if resource_type in ("Daily Costs", "Cost Usage Reports", "Volume Attachments"):
+                    continue
+                for item in items:
+                    resource_id = item.get("id")
+                    resource_rows.append((key, resource_type, resource_id, item.get("name"), item.get("compartment_name"),
+                                          item.get("region"), item.get("state"), sqlite_value("timestamp", item.get("time_created"))))
+                    for tag_key, tag_value in (item.get("freeform_tags") or {}).items():
+                        tag_rows.append((resource_id, resource_type, None, tag_key, to_string(tag_value)))
+                    for namespace, tags in (item.get("defined_tags") or {}).items():
+                        for tag_key, tag_value in tags.items():
+                            tag_rows.append((resource_id, resource_type, namespace, tag_key, to_string(tag_value)))
+                self.count += len(items)
+            self.connection.executemany("INSERT INTO resources VALUES (?, ?, ?, ?, ?, ?, ?, ?)", resource_rows)
+            self.connection.executemany("INSERT INTO tags VALUES (?, ?, ?, ?, ?)", tag_rows)
+            self.connection.executemany("INSERT INTO findings VALUES (?, ?)", ((key, finding) for finding in findings))
+
+    # Per-resource cost totals ({ocid: {"total_cost", "currency", "region"}}), joined on id
+    def write_costs(self, cost_index):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO costs VALUES (?, ?, ?, ?)",
+                ((resource_id, cost_info["total_cost"], cost_info.get("currency"), cost_info.get("region")) for resource_id, cost_info in cost_index.items())
+            )
+
+    def create_indexes(self):
+        with self.connection:
+            for resource_type, columns in INVENTORY_SCHEMAS.items():
+                table = resource_type_slug(resource_type)
+                for column, column_type in columns:
+                    if column in ("id", "compartment_name", "region", "state", "resource_type", "volume_id", "instance_id"):
+                        self.connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({column})")
+            for column in ("id", "compartment_name", "region", "resource_type", "state"):
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS resources_{column} ON resources ({column})")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS tags_resource_id ON tags (resource_id)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS tags_key_value ON tags (namespace, key, value)")
+
+    def close(self):
+        if self.connection is None:
+            return
+        self.create_indexes()
+        self.connection.execute("ANALYZE")
+        self.connection.close()
+        self.connection = None
+
+
+# Shard a record goes to: its region, or "global" for records without one
+def shard_region(region):
+    if not region or region in ("N/A", "unknown"):
+        return "global"
+    return str(region)
+
+
+# sha256 of a file, read in 1 MB blocks
+def file_sha256(file_name):
+    digest = hashlib.sha256()
+    with open(file_name, "rb") as file:
+        for block in iter(lambda: file.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# manifest.json of a sharded output: every shard with its region, type, row count,
+# size and sha256, so downstream jobs can verify shards and read only the ones they need.
+# shards: [(path, resource_type, region, rows)]
+def write_manifest(directory, shards, **properties):
+    manifest = dict(properties)
+    manifest["created"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    manifest["shards"] = [
+        {
+            "path": os.path.relpath(path, directory),
+            "resource_type": resource_type,
+            "region": region,
+            "rows": rows,
+            "bytes": os.path.getsize(path),
+            "sha256": file_sha256(path),
+        }
+        for path, resource_type, region, rows in sorted(shards, key=lambda shard: shard[0])
+    ]
+    manifest["rows"] = sum(shard["rows"] for shard in manifest["shards"])
+    with open(os.path.join(directory, "manifest.json"), "w") as file:
+        json.dump(manifest, file, indent=4)
+    return manifest
+
+
+# Open a compressed shard for appending: gzip members and zstd frames can be
+# concatenated, so a shard closed to free its file handle is simply reopened
+def open_shard(file_name, compression):
+    if compression == "gzip":
+        return gzip.open(file_name, "ab", compresslevel=6)
+    if compression == "zstd":
+        pa = import_pyarrow()
+        return pa.CompressedOutputStream(pa.OSFile(file_name, "ab"), "zstd")
+    return open(file_name, "ab")
+
+
+# JSON Lines split into compressed shards by region and resource type:
+# <region>/<type>.jsonl.gz (or .jsonl.zst), with findings and per-resource costs in
+# _findings/_costs shards. At most max_open shards are kept open at once; a
+# manifest.json with row counts and checksums is written on close.
+class ShardedJsonlSink:
+
+    def __init__(self, directory, compression="gzip", max_open=64):
+        self.directory = directory
+        self.file_name = directory
+        self.compression = compression
+        self.max_open = max_open
+        self.extension = {"gzip": ".jsonl.gz", "zstd": ".jsonl.zst"}.get(compression, ".jsonl")
+        self.files = {}
+        self.rows = {}
+        self.count = 0
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def path(self, resource_type, region):
+        return os.path.join(self.directory, region, f"{resource_type_slug(resource_type)}{self.extension}")
+
+    def write_lines(self, resource_type, region, records):
+        shard = (resource_type, region)
+        file = self.files.pop(shard, None)
+        if file is None:
+            if len(self.files) >= self.max_open:
+                self.files.pop(next(iter(self.files))).close()
+            os.makedirs(os.path.join(self.directory, region), exist_ok=True)
+            file = open_shard(self.path(resource_type, region), self.compression)
+        # Most recently used shards stay at the end of the dict
+        self.files[shard] = file
+        lines = [json.dumps(record, default=str) for record in records]
+        file.write(("\n".join(lines) + "\n").encode("utf-8"))
+        self.rows[shard] = self.rows.get(shard, 0) + len(lines)
+        self.count += len(lines)
+
+    def write_resources(self, key, resource_data, findings=()):
+        for resource_type, items in resource_data.items():
+            by_region = {}
+            for item in items:
+                by_region.setdefault(shard_region(item.get("region")), []).append({"key": key, "sheet": resource_type, **item})
+            for region, records in by_region.items():
+                self.write_lines(resource_type, region, records)
+        if findings:
+            self.write_lines("_findings", "global", [{"key": key, "finding": finding} for finding in findings])
+
+    def write_costs(self, cost_index):
+        by_region = {}
+        for resource_id, cost_info in cost_index.items():
+            by_region.setdefault(shard_region(cost_info.get("region")), []).append({"id": resource_id, **cost_info})
+        for region, records in by_region.items():
+            self.write_lines("_costs", region, records)
+
+    def close(self):
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+        if self.rows:
+            write_manifest(self.directory, [
+                (self.path(resource_type, region), resource_type, region, rows)
+                for (resource_type, region), rows in self.rows.items()
+            ], format="jsonl", compression=self.compression)
+            self.rows = {}
+
+
+# Drive a record sink (JsonlSink, SqliteSink, ShardedJsonlSink) from its own thread.
+# write_resources/write_costs only queue the call, so serialization, compression and
+# fsyncs overlap with the API calls of the next compartment. The queue is bounded:
+# when the sink falls behind, discovery blocks instead of piling up records.
+# The first exception raised by the sink (a full disk, a locked database, ...) is
+# kept in error and reported once; later calls are dropped, so a failing export
+# never aborts discovery and the caller reports error after the run. Other
+# attributes (count, file_name, ...) are read from the sink.
+class BackgroundWriter:
+
+    def __init__(self, sink, maxsize=64):
+        self.sink = sink
+        self.error = None
+        self.error_reported = False
+        self.queue = queue.Queue(maxsize)
+        self.thread = threading.Thread(target=self.run, name=f"{type(sink).__name__}-writer", daemon=True)
+        self.thread.start()
+
+    def __getattr__(self, name):
+        return getattr(self.sink, name)
+
+    def run(self):
+        while True:
+            call = self.queue.get()
+            if call is None:
+                return
+            if self.error is not None:
+                continue
+            method, args = call
+            try:
+                getattr(self.sink, method)(*args)
+            except Exception as e:
+                self.error = e
+
+    def submit(self, method, *args):
+        if self.error is not None:
+            if not self.error_reported:
+                self.error_reported = True
+                print(f"Warning: {type(self.sink).__name__} failed, its remaining records are dropped: {self.error}")
+            return
+        self.queue.put((method, args))
+
+    def write_resources(self, key, resource_data, findings=()):
+        self.submit("write_resources", key, resource_data, list(findings))
+
+    def write_costs(self, cost_index):
+        self.submit("write_costs", cost_index)
+
+    # Drain the queue, then close the sink (the error, if any, stays in error)
+    def close(self):
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        try:
+            self.sink.close()
+        except Exception as e:
+            self.error = self.error or e
+
+
+# Record types that are not part of the inventory counts
+NON_INVENTORY_TYPES = ("Daily Costs", "All Resources", "Cost Usage Reports", "Volume Attachments")
+
+
+# Running totals updated as records are emitted during discovery, so the Summary and
+# Visualizations sheets and the console totals are read from these counters instead
+# of rescanning every compartment's lists (and still work if records are not kept).
+# by_type counts every record type; the other breakdowns and the storage sizes
+# (size_in_gbs, metered_bytes in GB) cover the inventory types only.
+class InventoryCounters:
+
+    def __init__(self):
+        self.by_type = Counter()
+        self.by_region = Counter()
+        self.by_compartment = Counter()
+        self.by_state = Counter()
+        self.size_gbs_by_type = Counter()
+        self.findings = 0
+
+    def add(self, resource_type, item):
+        self.by_type[resource_type] += 1
+        if resource_type in NON_INVENTORY_TYPES:
+            return
+        self.by_region[item.get("region") or "unknown"] += 1
+        self.by_compartment[item.get("compartment_name") or "unknown"] += 1
+        self.by_state[item.get("state") or "unknown"] += 1
+        size_in_gbs = item.get("size_in_gbs")
+        if isinstance(size_in_gbs, (int, float)) and not isinstance(size_in_gbs, bool):
+            self.size_gbs_by_type[resource_type] += size_in_gbs
+        metered_bytes = item.get("metered_bytes")
+        if isinstance(metered_bytes, (int, float)) and not isinstance(metered_bytes, bool):
+            self.size_gbs_by_type[resource_type] += metered_bytes / 1024 ** 3
+
+    # Same hook as the record sinks: everything emitted for one resource key
+    def write_resources(self, key, resource_data, findings=()):
+        for resource_type, items in resource_data.items():
+            for item in items:
+                self.add(resource_type, item)
+        self.findings += len(findings)
+
+    # Inventory record counts per type, in the order the types were first seen
+    def inventory_counts(self):
+        return {resource_type: count for resource_type, count in self.by_type.items() if resource_type not in NON_INVENTORY_TYPES}
+
+    # Count tables appended under the Summary sheet header rows
+    def write_summary(self, sheet):
+        sheet.append([])
+        sheet.append(["Resource Type", "Count", "Size_in_gbs"])
+        for resource_type, count in self.inventory_counts().items():
+            sheet.append([resource_type, count, round(self.size_gbs_by_type.get(resource_type, 0), 2)])
+        for title, counter in (("Region", self.by_region), ("State", self.by_state), ("Compartment", self.by_compartment)):
+            sheet.append([])
+            sheet.append([title, "Count"])
+            for value, count in counter.most_common():
+                sheet.append([value, count])
@@ -0,0 +1,594 @@
+import base64
+import bisect
+import datetime
+import io
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from urllib.parse import unquote, urlparse, parse_qs
+
+import oci
+import urllib3
+from oci._vendor import requests
+from oci._vendor.requests.structures import CaseInsensitiveDict
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from oci_profiling import endpoint_region
+
+# Usage:
+#        from oci_fake import FakeOciService, SyntheticTenancy, install_fake_clients
+#        tenancy = SyntheticTenancy(compartments=10000, regions=("us-ashburn-1", "eu-frankfurt-1"), resources_per_type=5)
+#        service = FakeOciService(tenancy, latency=0.05, throttle_rate=0.01)
+#        config = install_fake_clients(service, "oci_fake_config")
+#        compute_client = oci.core.ComputeClient(config)  # served from the synthetic tenancy
+#
+# Benchmarking without a real tenancy. SyntheticTenancy describes a tenancy
+# (compartment tree, regions, ADs, resources per type, buckets and objects, cost
+# rows) and builds every item on demand from its indices, so a 10,000-compartment
+# tenancy costs no memory until it is listed. FakeOciService answers the HTTP
+# requests of the Identity, Compute, Blockstorage, FileStorage, Database,
+# ResourceSearch, ObjectStorage and Usage clients from it, with injected latency
+# and throttling (429). The fakes sit below the SDK clients (in place of their
+# HTTP session), so request signing, pagination, retries, deserialization and the
+# --raw-json, --api-stats and --trace hooks all run as they do against OCI.
+
+SYNTHETIC_REGIONS = (
+    "us-ashburn-1", "us-phoenix-1", "eu-frankfurt-1", "uk-london-1", "ap-tokyo-1",
+    "ap-sydney-1", "sa-saopaulo-1", "ca-toronto-1", "ap-mumbai-1", "eu-amsterdam-1",
+)
+
+# List path -> (OCID type segment, Resource Search type, Usage API service, availability domain scoped)
+RESOURCE_KINDS = {
+    "instances": ("instance", "Instance", "COMPUTE", True),
+    "volumes": ("volume", "Volume", "BLOCK_STORAGE", True),
+    "bootVolumes": ("bootvolume", "BootVolume", "BLOCK_STORAGE", True),
+    "volumeBackups": ("volumebackup", "VolumeBackup", "BLOCK_STORAGE", False),
+    "bootVolumeBackups": ("bootvolumebackup", "BootVolumeBackup", "BLOCK_STORAGE", False),
+    "fileSystems": ("filesystem", "FileSystem", "FILE_STORAGE", True),
+    "autonomousDatabases": ("autonomousdatabase", "AutonomousDatabase", "DATABASE", False),
+}
+
+SYNTHETIC_EPOCH = datetime.datetime(2024, 1, 1, tzinfo=datetime.timezone.utc)
+
+
+def iso_time(value):
+    return value.strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def parse_time(value):
+    return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+# Every item and cost row is a pure function of its indices (compartment, region,
+# kind, position), so repeated listings are identical and nothing is stored.
+# Compartments 1..compartments form a tree under the tenancy (0) with
+# compartment_fanout children per node. Each compartment holds resources_per_type
+# resources of every kind in every region, spread over the ADs; instance i boots
+# from boot volume i and even instances have block volume i attached.
+# The Usage API rows cycle through those resources, one row per resource and day;
+# every 20th costed resource (and any beyond the inventory) is a deleted one.
+class SyntheticTenancy:
+
+    def __init__(self, compartments=100, regions=("us-ashburn-1",), ads=3, resources_per_type=5, buckets_per_compartment=1,
+                 objects_per_bucket=100, cost_rows=1000, compartment_fanout=10, name="synthetic"):
+        if isinstance(regions, int):
+            regions = SYNTHETIC_REGIONS[:regions]
+        self.compartments = compartments
+        self.regions = tuple(regions)
+        self.home_region = self.regions[0]
+        self.ads = ads
+        self.resources_per_type = resources_per_type
+        self.buckets_per_compartment = buckets_per_compartment
+        self.objects_per_bucket = objects_per_bucket
+        self.cost_rows = cost_rows
+        self.compartment_fanout = compartment_fanout
+        self.name = name
+        self.namespace = name
+        self.tenancy_id = f"ocid1.tenancy.oc1..{name}tenancy"
+        self.object_names = {}
+
+    def compartment_id(self, index):
+        return self.tenancy_id if index == 0 else f"ocid1.compartment.oc1..{self.name}{index:08d}"
+
+    # Compartment index of an OCID (None for OCIDs outside the tenancy)
+    def compartment_index(self, compartment_id):
+        if compartment_id == self.tenancy_id:
+            return 0
+        prefix = f"ocid1.compartment.oc1..{self.name}"
+        if compartment_id and compartment_id.startswith(prefix):
+            index = int(compartment_id[len(prefix):])
+            if 1 <= index <= self.compartments:
+                return index
+        return None
+
+    def compartment_name(self, index):
+        return self.name if index == 0 else f"compartment-{index:05d}"
+
+    def parent_index(self, index):
+        return (index - 1) // self.compartment_fanout
+
+    def compartment(self, index):
+        return {
+            "id": self.compartment_id(index),
+            "compartmentId": None if index == 0 else self.compartment_id(self.parent_index(index)),
+            "name": self.compartment_name(index),
+            "description": f"Synthetic compartment {index}",
+            "timeCreated": iso_time(SYNTHETIC_EPOCH + datetime.timedelta(minutes=index)),
+            "lifecycleState": "ACTIVE",
+        }
+
+    # Compartments under a parent: its children, or its whole subtree
+    def compartment_indices(self, parent_index, subtree=False):
+        if not subtree:
+            first = parent_index * self.compartment_fanout + 1
+            return range(first, min(first + self.compartment_fanout, self.compartments + 1))
+        if parent_index == 0:
+            return range(1, self.compartments + 1)
+        indices = []
+        level = [parent_index]
+        while level:
+            level = [child for index in level for child in self.compartment_indices(index)]
+            indices.extend(level)
+        return indices
+
+    def availability_domains(self, region):
+        return [f"Synth:{region.upper()}-AD-{ad + 1}" for ad in range(self.ads)]
+
+    def availability_domain(self, region, position):
+        return self.availability_domains(region)[position % self.ads]
+
+    def resource_id(self, kind, region, compartment_index, position):
+        return f"ocid1.{RESOURCE_KINDS[kind][0]}.oc1.{region}.{self.name}{compartment_index:06d}x{position:05d}"
+
+    def tags(self, compartment_index, position):
+        return (
+            {"Operations": {"CostCenter": f"cc-{compartment_index % 20:02d}"}},
+            {"env": ("dev", "test", "prod")[position % 3]},
+        )
+
+    def resource(self, kind, region, compartment_index, position):
+        defined_tags, freeform_tags = self.tags(compartment_index, position)
+        item = {
+            "id": self.resource_id(kind, region, compartment_index, position),
+            "compartmentId": self.compartment_id(compartment_index),
+            "displayName": f"{RESOURCE_KINDS[kind][0]}-{compartment_index}-{position}",
+            "lifecycleState": "AVAILABLE",
+            "timeCreated": iso_time(SYNTHETIC_EPOCH + datetime.timedelta(hours=compartment_index, minutes=position)),
+            "definedTags": defined_tags,
+            "freeformTags": freeform_tags,
+        }
+        if RESOURCE_KINDS[kind][3]:
+            item["availabilityDomain"] = self.availability_domain(region, position)
+        size_in_gbs = 50 + 50 * (position % 4)
+        if kind == "instances":
+            item.update(lifecycleState="STOPPED" if position % 4 == 3 else "RUNNING", shape="VM.Standard.E4.Flex", region=region)
+        elif kind in ("volumes", "bootVolumes"):
+            item.update(sizeInGBs=size_in_gbs, sizeInMBs=size_in_gbs * 1024, vpusPerGB=10)
+        elif kind == "volumeBackups":
+            item.update(volumeId=self.resource_id("volumes", region, compartment_index, position), sizeInGBs=size_in_gbs, type="INCREMENTAL")
+        elif kind == "bootVolumeBackups":
+            item.update(bootVolumeId=self.resource_id("bootVolumes", region, compartment_index, position), sizeInGBs=size_in_gbs, type="FULL")
+        elif kind == "fileSystems":
+            item.update(meteredBytes=size_in_gbs * 1024 ** 3)
+        elif kind == "autonomousDatabases":
+            item.update(dbName=f"ADB{compartment_index}X{position}", computeCount=2.0, dataStorageSizeInGBs=1024, dbWorkload="OLTP")
+        return item
+
+    def resources(self, kind, region, compartment_index, availability_domain=None):
+        items = (self.resource(kind, region, compartment_index, position) for position in range(self.resources_per_type))
+        return [item for item in items if availability_domain is None or item.get("availabilityDomain") == availability_domain]
+
+    # Boot volume attachments (boot=True) or block volume attachments of a compartment
+    def attachments(self, region, compartment_index, availability_domain=None, boot=False):
+        items = []
+        for position in range(self.resources_per_type):
+            ad = self.availability_domain(region, position)
+            if (availability_domain is not None and ad != availability_domain) or (not boot and position % 2):
+                continue
+            volume_kind = "bootVolumes" if boot else "volumes"
+            item = {
+                "id": f"ocid1.{'bootvolumeattachment' if boot else 'volumeattachment'}.oc1.{region}.{self.name}{compartment_index:06d}x{position:05d}",
+                "compartmentId": self.compartment_id(compartment_index),
+                "availabilityDomain": ad,
+                "instanceId": self.resource_id("instances", region, compartment_index, position),
+                "lifecycleState": "ATTACHED",
+                "timeCreated": iso_time(SYNTHETIC_EPOCH + datetime.timedelta(hours=compartment_index, minutes=position)),
+                ("bootVolumeId" if boot else "volumeId"): self.resource_id(volume_kind, region, compartment_index, position),
+            }
+            if not boot:
+                item["attachmentType"] = "paravirtualized"
+            items.append(item)
+        return items
+
+    # Resource Search items of a compartment: every resource of every kind
+    def search_items(self, region, compartment_index):
+        items = []
+        for kind, (type_segment, resource_type, service, ad_scoped) in RESOURCE_KINDS.items():
+            for item in self.resources(kind, region, compartment_index):
+                items.append({
+                    "resourceType": resource_type,
+                    "identifier": item["id"],
+                    "displayName": item["displayName"],
+                    "compartmentId": item["compartmentId"],
+                    "availabilityDomain": item.get("availabilityDomain"),
+                    "lifecycleState": item["lifecycleState"],
+                    "timeCreated": item["timeCreated"],
+                    "definedTags": item["definedTags"],
+                    "freeformTags": item["freeformTags"],
+                })
+        return items
+
+    def bucket_names(self, compartment_index):
+        return [f"bucket-{compartment_index:05d}-{position}" for position in range(self.buckets_per_compartment)]
+
+    # Bucket name -> owning compartment index (None for unknown buckets)
+    def bucket_compartment(self, bucket_name):
+        if bucket_name == f"bling_{self.tenancy_id}":
+            return 0
+        match = re.fullmatch(r"bucket-(\d+)-(\d+)", bucket_name)
+        if match and 1 <= int(match.group(1)) <= self.compartments and int(match.group(2)) < self.buckets_per_compartment:
+            return int(match.group(1))
+        return None
+
+    # Sorted object names of a bucket; the Cost and Usage Reports bucket splits its
+    # objects between the reports/usage-csv and reports/cost-csv prefixes
+    def objects(self, bucket_name):
+        names = self.object_names.get(bucket_name)
+        if names is None:
+            if self.bucket_compartment(bucket_name) == 0:
+                names = [f"reports/{('cost-csv', 'usage-csv')[position % 2]}/{position:08d}.csv.gz" for position in range(self.objects_per_bucket)]
+            else:
+                names = [f"data/object-{position:08d}.csv" for position in range(self.objects_per_bucket)]
+            names.sort()
+            self.object_names[bucket_name] = names
+        return names
+
+    def object_summary(self, name):
+        digest = uuid.uuid5(uuid.NAMESPACE_URL, name)
+        return {
+            "name": name,
+            "size": 1024 + digest.int % (1024 ** 2),
+            "md5": base64.b64encode(digest.bytes).decode(),
+            "etag": str(digest),
+            "storageTier": "Standard",
+            "timeCreated": iso_time(SYNTHETIC_EPOCH),
+            "timeModified": iso_time(SYNTHETIC_EPOCH),
+        }
+
+    # The costed resource of a cost slot: (kind, region, compartment index, position)
+    def cost_resource(self, slot):
+        kinds = list(RESOURCE_KINDS)
+        rest, compartment_offset = divmod(slot, self.compartments)
+        rest, kind_offset = divmod(rest, len(kinds))
+        position, region_offset = divmod(rest, len(self.regions))
+        if slot % 20 == 19:
+            position += self.resources_per_type
+        return kinds[kind_offset], self.regions[region_offset], compartment_offset + 1, position
+
+    # Daily cost rows of the period (dicts keyed by the Usage API group-by names), with the
+    # day offset from time_started. Every day has cost_rows rows, one per cost slot, and the
+    # cost of a slot is a function of the absolute day (days since SYNTHETIC_EPOCH), so a
+    # day returns the same rows whatever period it is queried in.
+    def cost_rows_between(self, time_started, time_ended):
+        days = max(1, math.ceil((time_ended - time_started).total_seconds() / 86400))
+        first_day = (time_started - SYNTHETIC_EPOCH).days
+        for slot in range(self.cost_rows):
+            kind, region, compartment_index, position = self.cost_resource(slot)
+            row = {
+                "resourceId": self.resource_id(kind, region, compartment_index, position),
+                "service": RESOURCE_KINDS[kind][2],
+                "compartmentId": self.compartment_id(compartment_index),
+                "compartmentName": self.compartment_name(compartment_index),
+                "region": region,
+            }
+            for day in range(days):
+                yield row, day, round(0.01 + (slot * 7919 + (first_day + day) * 104729) % 1000 / 100, 2)
+
+
+# Compile a Usage API filter ({"operator", "dimensions", "filters"}) into a predicate on
+# one cost row (NOT: none of the conditions), once per request: OR/NOT dimensions become
+# a set of values per key, so a row costs one lookup per key instead of a list per row.
+def compile_filter(usage_filter):
+    if not usage_filter:
+        return lambda row: True
+    conditions = [compile_filter(nested_filter) for nested_filter in usage_filter.get("filters") or ()]
+    dimensions = usage_filter.get("dimensions") or ()
+    if usage_filter.get("operator") in ("OR", "NOT"):
+        values = {}
+        for dimension in dimensions:
+            values.setdefault(dimension["key"], set()).add(dimension["value"])
+        conditions += [lambda row, key=key, key_values=key_values: row.get(key) in key_values for key, key_values in values.items()]
+        if len(conditions) == 1:
+            matches = conditions[0]
+        else:
+            def matches(row):
+                return any(condition(row) for condition in conditions)
+        if usage_filter.get("operator") == "NOT":
+            return lambda row: not matches(row)
+        return matches
+    conditions += [lambda row, key=dimension["key"], value=dimension["value"]: row.get(key) == value for dimension in dimensions]
+    if len(conditions) == 1:
+        return conditions[0]
+    return lambda row: all(condition(row) for condition in conditions)
+
+
+# Server side of the fake clients: routes each request to the SyntheticTenancy.
+# Every request first waits latency seconds (+/- latency_jitter as a fraction of it),
+# then is answered 429 TooManyRequests with probability throttle_rate. Lists are
+# paged page_size items at a time (or the request's limit).
+class FakeOciService:
+
+    def __init__(self, tenancy, latency=0.0, latency_jitter=0.0, throttle_rate=0.0, page_size=100, seed=0):
+        self.tenancy = tenancy
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.throttle_rate = throttle_rate
+        self.page_size = page_size
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.throttled = 0
+        self.not_found = 0
+        self.usage_results = {}
+        self.routes = [
+            ("GET", r"/20160918/tenancies/([^/]+)/regionSubscriptions", self.region_subscriptions),
+            ("GET", r"/20160918/tenancies/([^/]+)", self.get_tenancy),
+            ("GET", r"/20160918/compartments", self.list_compartments),
+            ("GET", r"/20160918/compartments/([^/]+)", self.get_compartment),
+            ("GET", r"/20160918/availabilityDomains", self.list_availability_domains),
+            ("GET", r"/20160918/(instances|volumes|bootVolumes|volumeBackups|bootVolumeBackups|autonomousDatabases)", self.list_resources),
+            ("GET", r"/20171215/(fileSystems)", self.list_resources),
+            ("GET", r"/20160918/(bootVolumeAttachments|volumeAttachments)", self.list_attachments),
+            ("GET", r"/(?:20160918/vcns|20170115/loadBalancers)", self.list_empty),
+            ("POST", r"/20180409/resources", self.search_resources),
+            ("GET", r"/n/?", self.get_namespace),
+            ("GET", r"/n/([^/]+)/b/?", self.list_buckets),
+            ("GET", r"/n/([^/]+)/b/([^/]+)/?", self.get_bucket),
+            ("GET", r"/n/([^/]+)/b/([^/]+)/o/?", self.list_objects),
+            ("GET", r"/n/([^/]+)/b/([^/]+)/o/(.+)", self.get_object),
+            ("POST", r"/20200107/usage", self.request_summarized_usages),
+        ]
+
+    # (status, body, headers) of one request; body is JSON-serializable or bytes
+    def handle(self, method, url, body):
+        parsed = urlparse(url)
+        query = {key: values[-1] for key, values in parse_qs(parsed.query).items()}
+        region = endpoint_region(f"https://{parsed.hostname}")
+        delay = self.latency * (1 + self.latency_jitter * (2 * self.random.random() - 1))
+        if delay > 0:
+            time.sleep(delay)
+        with self.lock:
+            self.requests += 1
+            throttled = self.random.random() < self.throttle_rate
+            if throttled:
+                self.throttled += 1
+        if throttled:
+            return 429, {"code": "TooManyRequests", "message": "Synthetic throttling"}, {}
+        for route_method, pattern, handler in self.routes:
+            match = re.fullmatch(pattern, parsed.path)
+            if route_method == method and match:
+                result = handler(region, query, json.loads(body) if body else None, *(unquote(group) for group in match.groups()))
+                if result is not None:
+                    return result
+                break
+        with self.lock:
+            self.not_found += 1
+        return 404, {"code": "NotAuthorizedOrNotFound", "message": f"Synthetic tenancy has no {method} {parsed.path}"}, {}
+
+    # One page of items: page is the offset of its first item
+    def page(self, items, query, body_key=None):
+        offset = int(query.get("page") or 0)
+        limit = int(query.get("limit") or self.page_size)
+        headers = {"opc-next-page": str(offset + limit)} if offset + limit < len(items) else {}
+        page_items = items[offset:offset + limit]
+        return 200, page_items if body_key is None else {body_key: page_items}, headers
+
+    def region_subscriptions(self, region, query, body, tenancy_id):
+        tenancy = self.tenancy
+        return 200, [
+            {"regionKey": name.split("-")[1][:3].upper(), "regionName": name, "status": "READY", "isHomeRegion": name == tenancy.home_region}
+            for name in tenancy.regions
+        ], {}
+
+    def get_tenancy(self, region, query, body, tenancy_id):
+        if tenancy_id != self.tenancy.tenancy_id:
+            return None
+        return 200, {"id": tenancy_id, "name": self.tenancy.name, "description": "Synthetic tenancy", "homeRegionKey": "SYN"}, {}
+
+    def list_compartments(self, region, query, body):
+        parent_index = self.tenancy.compartment_index(query.get("compartmentId"))
+        if parent_index is None:
+            return None
+        indices = self.tenancy.compartment_indices(parent_index, subtree=query.get("compartmentIdInSubtree") == "true")
+        offset = int(query.get("page") or 0)
+        limit = int(query.get("limit") or self.page_size)
+        headers = {"opc-next-page": str(offset + limit)} if offset + limit < len(indices) else {}
+        return 200, [self.tenancy.compartment(index) for index in indices[offset:offset + limit]], headers
+
+    def get_compartment(self, region, query, body, compartment_id):
+        index = self.tenancy.compartment_index(compartment_id)
+        if index is None:
+            return None
+        return 200, self.tenancy.compartment(index), {}
+
+    def list_availability_domains(self, region, query, body):
+        return 200, [
+            {"name": name, "id": f"ocid1.availabilitydomain.oc1..{name.lower().replace(':', '-')}", "compartmentId": self.tenancy.tenancy_id}
+            for name in self.tenancy.availability_domains(region)
+        ], {}
+
+    def list_resources(self, region, query, body, kind):
+        index = self.tenancy.compartment_index(query.get("compartmentId"))
+        if index is None or region not in self.tenancy.regions:
+            return None
+        items = self.tenancy.resources(kind, region, index, query.get("availabilityDomain")) if index else []
+        return self.page(items, query)
+
+    def list_attachments(self, region, query, body, kind):
+        index = self.tenancy.compartment_index(query.get("compartmentId"))
+        if index is None or region not in self.tenancy.regions:
+            return None
+        items = self.tenancy.attachments(region, index, query.get("availabilityDomain"), boot=kind == "bootVolumeAttachments") if index else []
+        return self.page(items, query)
+
+    def list_empty(self, region, query, body):
+        return 200, [], {}
+
+    def search_resources(self, region, query, body):
+        match = re.search(r"compartmentId\s*=\s*'([^']+)'", (body or {}).get("query", ""))
+        index = self.tenancy.compartment_index(match.group(1)) if match else None
+        items = self.tenancy.search_items(region, index) if index else []
+        return self.page(items, query, body_key="items")
+
+    def get_namespace(self, region, query, body):
+        return 200, self.tenancy.namespace, {}
+
+    def list_buckets(self, region, query, body, namespace):
+        index = self.tenancy.compartment_index(query.get("compartmentId"))
+        if index is None:
+            return None
+        items = [
+            {"namespace": namespace, "name": name, "compartmentId": self.tenancy.compartment_id(index), "createdBy": "ocid1.user.oc1..synthetic",
+             "timeCreated": iso_time(SYNTHETIC_EPOCH), "etag": name}
+            for name in (self.tenancy.bucket_names(index) if index else ())
+        ]
+        return self.page(items, query)
+
+    def get_bucket(self, region, query, body, namespace, bucket_name):
+        index = self.tenancy.bucket_compartment(bucket_name)
+        if index is None:
+            return None
+        names = self.tenancy.objects(bucket_name)
+        return 200, {
+            "namespace": namespace, "name": bucket_name, "compartmentId": self.tenancy.compartment_id(index),
+            "createdBy": "ocid1.user.oc1..synthetic", "timeCreated": iso_time(SYNTHETIC_EPOCH), "etag": bucket_name,
+            "metadata": {}, "publicAccessType": "NoPublicAccess", "storageTier": "Standard",
+            "approximateCount": len(names), "approximateSize": sum(self.tenancy.object_summary(name)["size"] for name in names),
+            "definedTags": {}, "freeformTags": {},
+        }, {}
+
+    # Objects are paged by name: start is the first name of the page, nextStartWith the next one
+    def list_objects(self, region, query, body, namespace, bucket_name):
+        if self.tenancy.bucket_compartment(bucket_name) is None:
+            return None
+        names = self.tenancy.objects(bucket_name)
+        prefix = query.get("prefix") or ""
+        first = bisect.bisect_left(names, max(prefix, query.get("start") or ""))
+        limit = int(query.get("limit") or 1000)
+        page_names = [name for name in names[first:first + limit] if name.startswith(prefix)]
+        data = {"objects": [self.tenancy.object_summary(name) for name in page_names], "prefixes": []}
+        if len(page_names) == limit and first + limit < len(names) and names[first + limit].startswith(prefix):
+            data["nextStartWith"] = names[first + limit]
+        return 200, data, {}
+
+    def get_object(self, region, query, body, namespace, bucket_name, object_name):
+        if self.tenancy.bucket_compartment(bucket_name) is None or object_name not in self.tenancy.objects(bucket_name):
+            return None
+        return 200, f"synthetic object {object_name}\n".encode(), {"content-type": "application/octet-stream"}
+
+    # Summarized usages of the request body, computed once per distinct body and then paged
+    def request_summarized_usages(self, region, query, body):
+        key = json.dumps(body, sort_keys=True)
+        with self.lock:
+            items = self.usage_results.get(key)
+        if items is None:
+            items = self.summarized_usages(body)
+            with self.lock:
+                if len(self.usage_results) >= 16:
+                    self.usage_results.pop(next(iter(self.usage_results)))
+                self.usage_results[key] = items
+        return self.page(items, query, body_key="items")
+
+    def summarized_usages(self, body):
+        time_started = parse_time(body["timeUsageStarted"])
+        time_ended = parse_time(body["timeUsageEnded"])
+        group_by = body.get("groupBy") or []
+        aggregate_by_time = body.get("isAggregateByTime")
+        matches = compile_filter(body.get("filter"))
+        totals = {}
+        # The days of a cost slot share one row: the filter is checked once per slot
+        matched_row = matched = None
+        for row, day, cost in self.tenancy.cost_rows_between(time_started, time_ended):
+            if row is not matched_row:
+                matched_row, matched = row, matches(row)
+            if not matched:
+                continue
+            key = (tuple(row[name] for name in group_by), None if aggregate_by_time else day)
+            totals[key] = totals.get(key, 0) + cost
+        items = []
+        for (group, day), cost in totals.items():
+            started = time_started if day is None else time_started + datetime.timedelta(days=day)
+            ended = time_ended if day is None else started + datetime.timedelta(days=1)
+            item = {"timeUsageStarted": iso_time(started), "timeUsageEnded": iso_time(ended), "computedAmount": round(cost, 2), "currency": "USD"}
+            item.update(zip(group_by, group))
+            items.append(item)
+        return items
+
+
+# Stand-in for the HTTP session of an SDK client. Requests are still prepared and
+# signed (so signing is part of what is measured), then answered by the service.
+class FakeSession:
+
+    def __init__(self, service):
+        self.service = service
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def close(self):
+        pass
+
+    def request(self, method, url, auth=None, params=None, headers=None, data=None, stream=False, timeout=None):
+        prepared = requests.Request(method, url, params=params, headers=headers, data=data, auth=auth).prepare()
+        status, body, response_headers = self.service.handle(method, prepared.url, prepared.body)
+        content = body if isinstance(body, bytes) else json.dumps(body).encode()
+        response = requests.Response()
+        response.status_code = status
+        response.url = prepared.url
+        response.request = prepared
+        response.headers = CaseInsensitiveDict({"content-type": "application/json", "opc-request-id": uuid.uuid4().hex.upper(), **response_headers})
+        response.raw = urllib3.response.HTTPResponse(body=io.BytesIO(content), preload_content=False, status=status, headers=response.headers)
+        if not stream:
+            response._content = content
+        return response
+
+
+# Route every OCI client created from now on to the service, and make
+# oci.config.from_file return a config (API key and session token written to
+# directory) for the synthetic tenancy. Returns that config.
+def install_fake_clients(service, directory):
+    os.makedirs(directory, exist_ok=True)
+    key_file = os.path.join(directory, "synthetic_api_key.pem")
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    with open(key_file, "wb") as key:
+        key.write(private_key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL, serialization.NoEncryption()))
+    token_file = os.path.join(directory, "synthetic_token")
+    claims = base64.urlsafe_b64encode(json.dumps({"sub": "synthetic", "exp": int(time.time()) + 86400}).encode()).decode().rstrip("=")
+    with open(token_file, "w") as token:
+        token.write(f"eyJhbGciOiJub25lIn0.{claims}.synthetic")
+    config = {
+        "user": "ocid1.user.oc1..synthetic",
+        "fingerprint": ":".join(["00"] * 16),
+        "key_file": key_file,
+        "tenancy": service.tenancy.tenancy_id,
+        "region": service.tenancy.home_region,
+        "security_token_file": token_file,
+        "log_requests": False,
+        "additional_user_agent": "",
+        "pass_phrase": None,
+    }
+    oci.config.from_file = lambda *args, **kwargs: dict(config)
+    base_client_init = oci.base_client.BaseClient.__init__
+
+    def fake_base_client_init(self, *args, **kwargs):
+        base_client_init(self, *args, **kwargs)
+        self.session = FakeSession(service)
+
+    oci.base_client.BaseClient.__init__ = fake_base_client_init
+    return config
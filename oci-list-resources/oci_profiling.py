@@ -0,0 +1,427 @@
+import json
+import math
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from array import array
+from urllib.parse import urlparse
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Usage:
+#        from oci_profiling import MemoryProfiler
+#        memory_profiler = MemoryProfiler(enabled="--profile-memory" in sys.argv)
+#        ...
+#        memory_profiler.checkpoint("discovery us-ashburn-1")
+#        ...
+#        memory_profiler.write_report("oci_memory_profile.txt")
+#
+#        from oci_profiling import ApiStats
+#        api_stats = ApiStats()
+#        api_stats.instrument(compute_client, block_storage_client)
+#        ...
+#        api_stats.write_sheet(workbook.create_sheet(title="API Stats"))
+#        api_stats.write_summary("oci_api_stats.json")
+#
+#        from oci_profiling import Tracer
+#        tracer = Tracer()
+#        tracer.instrument(compute_client)
+#        region_span = tracer.start_span("region us-ashburn-1", region="us-ashburn-1")
+#        ...
+#        tracer.end_span(region_span)
+#        tracer.write("oci_trace.json")
+
+
+# Resident set size of the process in bytes (Linux only, None elsewhere)
+def current_rss():
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+# Peak resident set size of the process in bytes (None where getrusage is missing)
+def peak_rss():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def megabytes(size):
+    return "-" if size is None else f"{size / 1024 ** 2:.1f}"
+
+
+# Per-phase memory profile (--profile-memory). tracemalloc runs for the whole script;
+# checkpoint(name) closes the phase that ran since the previous checkpoint and
+# records its traced and RSS memory (current and peak) plus the allocation sites
+# that grew the most during the phase (snapshot diff, grouped by line). The peak of
+# each phase is reset at its start, so every row shows that phase's own high-water mark.
+# Disabled profilers ignore every call, so the checkpoints need no guards.
+class MemoryProfiler:
+
+    def __init__(self, enabled=True, top=15):
+        self.enabled = enabled
+        self.top = top
+        self.phases = []
+        self.snapshot = None
+        self.phase_started = time.perf_counter()
+        if enabled:
+            tracemalloc.start()
+
+    def checkpoint(self, name):
+        if not self.enabled:
+            return
+        seconds = time.perf_counter() - self.phase_started
+        traced, traced_peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ))
+        if self.snapshot is None:
+            statistics = snapshot.statistics("lineno")
+        else:
+            statistics = snapshot.compare_to(self.snapshot, "lineno")
+        self.phases.append({
+            "phase": name,
+            "seconds": round(seconds, 3),
+            "traced_bytes": traced,
+            "traced_peak_bytes": traced_peak,
+            "rss_bytes": current_rss(),
+            "rss_peak_bytes": peak_rss(),
+            "top_sites": [
+                (str(statistic.traceback[0]), getattr(statistic, "size_diff", statistic.size), getattr(statistic, "count_diff", statistic.count))
+                for statistic in statistics[:self.top]
+            ],
+        })
+        self.snapshot = snapshot
+        tracemalloc.reset_peak()
+        print(f"[memory] {name}: traced {megabytes(traced)} MB (peak {megabytes(traced_peak)} MB), RSS {megabytes(self.phases[-1]['rss_bytes'])} MB")
+        # The snapshot itself is not part of the next phase
+        self.phase_started = time.perf_counter()
+
+    def write_report(self, file_name):
+        if not self.enabled or not self.phases:
+            return
+        with open(file_name, "w") as report:
+            report.write(f"{'Phase':<40} {'Seconds':>10} {'Traced MB':>10} {'Peak MB':>10} {'RSS MB':>10} {'RSS peak MB':>12}\n")
+            for phase in self.phases:
+                report.write(
+                    f"{phase['phase']:<40} {phase['seconds']:>10} {megabytes(phase['traced_bytes']):>10} {megabytes(phase['traced_peak_bytes']):>10} "
+                    f"{megabytes(phase['rss_bytes']):>10} {megabytes(phase['rss_peak_bytes']):>12}\n"
+                )
+            for phase in self.phases:
+                report.write(f"\n{phase['phase']}: top allocation sites (growth during the phase)\n")
+                for site, size_diff, count_diff in phase["top_sites"]:
+                    report.write(f"  {size_diff / 1024 ** 2:+10.2f} MB {count_diff:+10d} blocks  {site}\n")
+        print(f"Memory profile ({len(self.phases)} phases) saved to: {file_name}")
+
+    def close(self):
+        if self.enabled and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+
+# Nearest-rank percentile of sorted values
+def percentile(values, fraction):
+    if not values:
+        return None
+    return values[min(len(values), max(1, math.ceil(fraction * len(values)))) - 1]
+
+
+# Region of a client from its endpoint ("https://iaas.us-ashburn-1.oraclecloud.com")
+def endpoint_region(endpoint):
+    host = urlparse(endpoint or "").hostname or ""
+    parts = host.split(".")
+    return parts[1] if len(parts) > 2 else host or "unknown"
+
+
+# Per-API-call instrumentation (--api-stats). instrument() wraps the call_api of each
+# client, the single point every SDK operation (and every page and retry attempt of
+# it) goes through, and records per (service, operation, region, compartment):
+#   calls     - logical calls (requests without a page/start token)
+#   pages     - successful responses
+#   bytes     - response body bytes (counted where the SDK parses the body, so
+#               oci_raw_json.enable_raw_json must come before instrument())
+#   retries   - failed attempts of the kind the SDK retries (throttles, 5xx, connection errors)
+#   throttles - 429 responses
+#   errors    - other failed requests
+# and every request latency, for the p50/p95/p99 of the API Stats sheet and the
+# JSON summary. Safe to use from the cost fetcher's worker threads. Like the
+# MemoryProfiler, a disabled ApiStats leaves the clients untouched and writes nothing.
+class ApiStats:
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.stats = {}
+        self.started = time.time()
+
+    def instrument(self, *clients):
+        if not self.enabled:
+            return
+        for client in clients:
+            base_client = client.base_client
+            if getattr(base_client, "api_stats", None) is self:
+                continue
+            base_client.api_stats = self
+            base_client.call_api = self.wrap_call_api(base_client, base_client.call_api)
+            base_client.deserialize_response_data = self.wrap_deserialize(base_client.deserialize_response_data)
+
+    # instrument() for a single client, returning it (for client factories)
+    def instrumented(self, client):
+        self.instrument(client)
+        return client
+
+    def wrap_deserialize(self, deserialize_response_data):
+        def deserialize(response_data, response_type, allow_control_chars=None):
+            self.local.bytes = getattr(self.local, "bytes", 0) + len(response_data or b"")
+            return deserialize_response_data(response_data, response_type, allow_control_chars)
+        return deserialize
+
+    def wrap_call_api(self, base_client, call_api):
+        def instrumented_call_api(*args, **kwargs):
+            self.local.bytes = 0
+            status = None
+            started = time.perf_counter()
+            try:
+                response = call_api(*args, **kwargs)
+                status = response.status
+                return response
+            except Exception as e:
+                status = getattr(e, "status", None)
+                raise
+            finally:
+                self.add(base_client, kwargs, time.perf_counter() - started, status, self.local.bytes)
+        return instrumented_call_api
+
+    def add(self, base_client, kwargs, latency, status, response_bytes):
+        query_params = kwargs.get("query_params") or {}
+        key = (
+            base_client.service,
+            kwargs.get("operation_name") or kwargs.get("resource_path") or "unknown",
+            endpoint_region(base_client.endpoint),
+            query_params.get("compartmentId") or "-",
+        )
+        with self.lock:
+            stat = self.stats.get(key)
+            if stat is None:
+                stat = self.stats[key] = {"calls": 0, "pages": 0, "bytes": 0, "retries": 0, "throttles": 0, "errors": 0, "latencies": array("d")}
+            stat["latencies"].append(latency)
+            stat["bytes"] += response_bytes
+            if "page" not in query_params and "start" not in query_params:
+                stat["calls"] += 1
+            if status is not None and status < 400:
+                stat["pages"] += 1
+            elif status == 429:
+                stat["throttles"] += 1
+                stat["retries"] += 1
+            elif status is None or status >= 500:
+                stat["retries"] += 1
+            else:
+                stat["errors"] += 1
+
+    # Stats merged over the keys, grouped by key_func (e.g. per (service, operation))
+    def grouped(self, key_func):
+        groups = {}
+        with self.lock:
+            for key, stat in self.stats.items():
+                group = groups.setdefault(key_func(key), {"calls": 0, "pages": 0, "bytes": 0, "retries": 0, "throttles": 0, "errors": 0, "latencies": array("d")})
+                for name, value in stat.items():
+                    group[name] += value
+        return groups
+
+    # Counts and latency percentiles (ms) of one stats entry
+    def summarize(self, stat):
+        latencies = sorted(stat["latencies"])
+        summary = {name: value for name, value in stat.items() if name != "latencies"}
+        summary["requests"] = len(latencies)
+        summary["total_seconds"] = round(sum(latencies), 3)
+        for name, fraction in (("p50_ms", 0.50), ("p95_ms", 0.95), ("p99_ms", 0.99)):
+            value = percentile(latencies, fraction)
+            summary[name] = None if value is None else round(value * 1000, 1)
+        return summary
+
+    # API Stats sheet: one row per (service, operation, region, compartment), slowest first
+    def write_sheet(self, sheet):
+        if not self.enabled:
+            return 0
+        sheet.append(["Service", "Operation", "Region", "Compartment", "Calls", "Requests", "Pages", "Bytes", "Retries",
+                      "Throttles", "Errors", "Total_seconds", "P50_ms", "P95_ms", "P99_ms"])
+        rows = [(key, self.summarize(stat)) for key, stat in self.grouped(lambda key: key).items()]
+        rows.sort(key=lambda row: -row[1]["total_seconds"])
+        for (service, operation, region, compartment_id), summary in rows:
+            sheet.append([service, operation, region, compartment_id, summary["calls"], summary["requests"], summary["pages"],
+                          summary["bytes"], summary["retries"], summary["throttles"], summary["errors"], summary["total_seconds"],
+                          summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]])
+        return len(rows)
+
+    # JSON summary: totals and per-operation counts and latency percentiles
+    def write_summary(self, file_name):
+        if not self.enabled:
+            return
+        operations = {f"{service}.{operation}": self.summarize(stat) for (service, operation), stat in self.grouped(lambda key: key[:2]).items()}
+        totals = self.summarize(self.grouped(lambda key: "all").get("all", {"calls": 0, "pages": 0, "bytes": 0, "retries": 0, "throttles": 0, "errors": 0, "latencies": array("d")}))
+        with open(file_name, "w") as summary_file:
+            json.dump({"elapsed_seconds": round(time.time() - self.started, 3), "totals": totals, "operations": operations}, summary_file, indent=4)
+        print(f"API stats ({totals['requests']} requests, {len(operations)} operations) saved to: {file_name}")
+
+
+# OTLP/JSON attribute ({"key": ..., "value": {"stringValue": ...}})
+def otlp_attribute(key, value):
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+# Span tracing (--trace), written as one OTLP/JSON trace file that trace viewers
+# (Jaeger, Grafana Tempo, otel-desktop-viewer, ...) load directly, no collector needed.
+# start_span/end_span open and close a span under the innermost open span of the
+# calling thread (run -> region -> compartment -> collector); instrument() adds a
+# CLIENT span for every request the clients send (every page and retry attempt).
+# Threads with no open span of their own (the cost fetcher's workers) nest under
+# the innermost span of the thread that created the tracer. Spans still open when
+# the trace is written (an interrupted run) are closed with an error status.
+# Like the ApiStats, a disabled Tracer ignores every call.
+class Tracer:
+    SPAN_KIND_INTERNAL = 1
+    SPAN_KIND_CLIENT = 3
+    STATUS_OK = 1
+    STATUS_ERROR = 2
+
+    def __init__(self, enabled=True, service_name="oci-list-resources"):
+        self.enabled = enabled
+        self.service_name = service_name
+        self.trace_id = os.urandom(16).hex()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.spans = []
+        self.main_stack = self.stack()
+
+    # Open spans of the calling thread, innermost last
+    def stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def parent_span_id(self):
+        stack = self.stack() or self.main_stack
+        return stack[-1]["spanId"] if stack else ""
+
+    def new_span(self, name, kind, attributes):
+        span = {
+            "traceId": self.trace_id,
+            "spanId": os.urandom(8).hex(),
+            "parentSpanId": self.parent_span_id(),
+            "name": name,
+            "kind": kind,
+            "startTimeUnixNano": time.time_ns(),
+            "endTimeUnixNano": None,
+            "attributes": attributes,
+            "status": {"code": self.STATUS_OK},
+        }
+        with self.lock:
+            self.spans.append(span)
+        return span
+
+    def start_span(self, name, **attributes):
+        if not self.enabled:
+            return None
+        span = self.new_span(name, self.SPAN_KIND_INTERNAL, attributes)
+        self.stack().append(span)
+        return span
+
+    # Closes the span (and any child left open, e.g. by a caught exception), adding
+    # the attributes known only at the end (record counts, ...)
+    def end_span(self, span, error=None, **attributes):
+        if span is None:
+            return
+        ended = time.time_ns()
+        stack = self.stack()
+        if any(open_span is span for open_span in stack):
+            while stack[-1] is not span:
+                self.close_span(stack.pop(), ended, "ended with its parent")
+            stack.pop()
+        span["attributes"].update(attributes)
+        self.close_span(span, ended, error)
+
+    def close_span(self, span, ended, error=None):
+        span["endTimeUnixNano"] = ended
+        if error is not None:
+            span["status"] = {"code": self.STATUS_ERROR, "message": str(error)}
+
+    def instrument(self, *clients):
+        if not self.enabled:
+            return
+        for client in clients:
+            base_client = client.base_client
+            if getattr(base_client, "tracer", None) is self:
+                continue
+            base_client.tracer = self
+            base_client.call_api = self.wrap_call_api(base_client, base_client.call_api)
+
+    # instrument() for a single client, returning it (for client factories)
+    def instrumented(self, client):
+        self.instrument(client)
+        return client
+
+    def wrap_call_api(self, base_client, call_api):
+        def traced_call_api(*args, **kwargs):
+            query_params = kwargs.get("query_params") or {}
+            operation = kwargs.get("operation_name") or kwargs.get("resource_path") or "unknown"
+            span = self.new_span(f"{base_client.service}.{operation}", self.SPAN_KIND_CLIENT, {
+                "rpc.service": base_client.service,
+                "rpc.method": operation,
+                "cloud.region": endpoint_region(base_client.endpoint),
+                "oci.compartment_id": query_params.get("compartmentId") or "-",
+                "oci.next_page": "page" in query_params or "start" in query_params,
+            })
+            error = None
+            try:
+                response = call_api(*args, **kwargs)
+                span["attributes"]["http.response.status_code"] = response.status
+                return response
+            except Exception as e:
+                error = e
+                if getattr(e, "status", None) is not None:
+                    span["attributes"]["http.response.status_code"] = e.status
+                raise
+            finally:
+                self.close_span(span, time.time_ns(), None if error is None else type(error).__name__)
+        return traced_call_api
+
+    def write(self, file_name):
+        if not self.enabled:
+            return
+        ended = time.time_ns()
+        with self.lock:
+            spans = list(self.spans)
+        otlp_spans = []
+        for span in spans:
+            if span["endTimeUnixNano"] is None:
+                self.close_span(span, ended, "not ended (run interrupted)")
+            otlp_spans.append({
+                **span,
+                "startTimeUnixNano": str(span["startTimeUnixNano"]),
+                "endTimeUnixNano": str(span["endTimeUnixNano"]),
+                "attributes": [otlp_attribute(key, value) for key, value in span["attributes"].items()],
+            })
+        trace = {"resourceSpans": [{
+            "resource": {"attributes": [otlp_attribute("service.name", self.service_name)]},
+            "scopeSpans": [{"scope": {"name": "oci_profiling"}, "spans": otlp_spans}],
+        }]}
+        with open(file_name, "w") as trace_file:
+            json.dump(trace, trace_file)
+        print(f"Trace ({len(otlp_spans)} spans) saved to: {file_name}")
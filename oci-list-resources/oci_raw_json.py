@@ -0,0 +1,139 @@
+import datetime
+import json
+
+import oci
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Usage:
+#        from oci_raw_json import list_items
+#        for bv in list_items(block_storage_client.list_volumes, raw_json=True, compartment_id=compartment.id):
+#            print(bv.display_name, bv.size_in_gbs, bv.time_created)
+#
+# Opt-in fast path for the hot list operations: their response bodies are parsed
+# straight into JSON dicts (with orjson when it is installed) instead of being
+# deserialized into SDK models attribute by attribute. Each dict is wrapped in a
+# RawModel, which reads the snake_case attributes the collectors already use
+# (vm.display_name, bv.size_in_gbs, ...) from the camelCase keys, so the records
+# are built from the parsed JSON directly.
+
+
+# list operation -> (model class, response type, key of the items in the body (None: the body is the list))
+RAW_LIST_OPERATIONS = {
+    "list_instances": (oci.core.models.Instance, "list[Instance]", None),
+    "list_volumes": (oci.core.models.Volume, "list[Volume]", None),
+    "list_boot_volumes": (oci.core.models.BootVolume, "list[BootVolume]", None),
+    "list_volume_backups": (oci.core.models.VolumeBackup, "list[VolumeBackup]", None),
+    "list_boot_volume_backups": (oci.core.models.BootVolumeBackup, "list[BootVolumeBackup]", None),
+    "search_resources": (oci.resource_search.models.ResourceSummary, "ResourceSummaryCollection", "items"),
+    "list_objects": (oci.object_storage.models.ObjectSummary, "ListObjects", "objects"),
+}
+RAW_RESPONSE_TYPES = frozenset(response_type for model_class, response_type, items_key in RAW_LIST_OPERATIONS.values())
+
+
+def parse_json(response_data):
+    if orjson is not None:
+        return orjson.loads(response_data)
+    return json.loads(response_data)
+
+
+# OCI timestamps ("2025-10-01T12:34:56.789Z") as the aware datetimes the SDK returns
+def parse_datetime(value):
+    try:
+        return datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return value
+
+
+# Read-only view of one parsed JSON item through the attribute names of its SDK model
+class RawModel:
+    __slots__ = ("data",)
+    attribute_map = {}
+    datetime_attributes = frozenset()
+
+    def __init__(self, data):
+        self.data = data
+
+    def __getattr__(self, name):
+        key = self.attribute_map.get(name)
+        if key is None:
+            raise AttributeError(name)
+        value = self.data.get(key)
+        if value is not None and name in self.datetime_attributes:
+            return parse_datetime(value)
+        return value
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.data!r})"
+
+
+raw_model_types = {}
+
+
+# RawModel subclass reading the attributes of an SDK model class
+def raw_model_type(model_class):
+    raw_type = raw_model_types.get(model_class)
+    if raw_type is None:
+        model = model_class()
+        raw_type = raw_model_types[model_class] = type(f"Raw{model_class.__name__}", (RawModel,), {
+            "__slots__": (),
+            "attribute_map": dict(model.attribute_map),
+            "datetime_attributes": frozenset(name for name, swagger_type in model.swagger_types.items() if swagger_type == "datetime"),
+        })
+    return raw_type
+
+
+# Let clients return the bodies of the RAW_LIST_OPERATIONS as parsed JSON. Every
+# other response (and any body that is not valid JSON) still goes through the SDK.
+# list_items enables it on first use; enable it up front on clients that are also
+# instrumented (ApiStats), so the instrumentation sees the raw bodies too.
+def enable_raw_json(*clients):
+    for client in clients:
+        base_client = client.base_client
+        if getattr(base_client, "raw_json_enabled", False):
+            continue
+        base_client.deserialize_response_data = raw_json_deserializer(base_client.deserialize_response_data)
+        base_client.raw_json_enabled = True
+
+
+def raw_json_deserializer(sdk_deserialize):
+    def deserialize_response_data(response_data, response_type, allow_control_chars=None):
+        if response_type in RAW_RESPONSE_TYPES:
+            try:
+                return parse_json(response_data)
+            except ValueError:
+                pass
+        return sdk_deserialize(response_data, response_type, allow_control_chars)
+    return deserialize_response_data
+
+
+# Items of a RAW_LIST_OPERATIONS call as RawModels, fetched page by page
+def raw_list_items(list_func, **kwargs):
+    model_class, response_type, items_key = RAW_LIST_OPERATIONS[list_func.__name__]
+    enable_raw_json(list_func.__self__)
+    raw_type = raw_model_type(model_class)
+    while True:
+        response = oci.retry.DEFAULT_RETRY_STRATEGY.make_retrying_call(list_func, **kwargs)
+        data = response.data
+        for item in (data if items_key is None else data.get(items_key) or ()):
+            yield raw_type(item)
+        if items_key == "objects":
+            next_start_with = data.get("nextStartWith")
+            if next_start_with is None:
+                return
+            kwargs["start"] = next_start_with
+        elif response.has_next_page:
+            kwargs["page"] = response.next_page
+        else:
+            return
+
+
+# Items of a list call: RawModels with raw_json (for the RAW_LIST_OPERATIONS),
+# otherwise the SDK models from the pagination generator
+def list_items(list_func, raw_json=False, **kwargs):
+    if raw_json and list_func.__name__ in RAW_LIST_OPERATIONS:
+        return raw_list_items(list_func, **kwargs)
+    return oci.pagination.list_call_get_all_results_generator(list_func, "record", **kwargs)
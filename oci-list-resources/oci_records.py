@@ -0,0 +1,159 @@
+from collections.abc import Mapping
+
+# Compact inventory records.
+# Every discovered resource used to be a dict repeating the same keys; a record
+# type declares its fields once as __slots__, so an instance is a fixed array of
+# references with no per-record dict or key strings. Records behave as read-only
+# mappings (get, [], in, keys/items, **record) with only the fields that were set,
+# so the sheet, JSONL, SQLite and Parquet writers handle them like the dicts they replace.
+# Usage:
+#        from oci_records import RECORD_TYPES, BlockVolumeRecord
+#        resources[resource_key].setdefault("Block Volumes", []).append(BlockVolumeRecord(id=bv.id, name=bv.display_name))
+#
+#        from oci_records import run_strings
+#        run_strings.encode("us-ashburn-1")
+
+
+# Per-run string table (same value <-> integer code encoding as the cost cube
+# dimensions). Low-cardinality fields (compartment, region, state, AD, type,
+# currency, day) and tag namespaces/keys are passed through it by the records, so
+# millions of rows share one string object per distinct value. The writers work
+# on the codes: Parquet dictionary columns are built from them and sheet sorts
+# compare ranks instead of strings.
+class StringTable:
+
+    def __init__(self):
+        self.codes = {}
+        self.values = []
+        self.ranks = None
+
+    def __len__(self):
+        return len(self.values)
+
+    def encode(self, value):
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+            self.ranks = None
+        return code
+
+    def decode(self, code):
+        return self.values[code]
+
+    # Canonical object of a string (other values are returned unchanged)
+    def intern(self, value):
+        if type(value) is not str:
+            return value
+        return self.values[self.encode(value)]
+
+    # Position of a value in the sorted strings of the table (-1 for non-strings),
+    # so sort keys compare integers. The ranks are rebuilt after new strings only.
+    def rank(self, value):
+        if type(value) is not str:
+            return -1
+        code = self.encode(value)
+        if self.ranks is None:
+            self.ranks = [0] * len(self.values)
+            strings = sorted((value, code) for code, value in enumerate(self.values) if type(value) is str)
+            for position, (string, string_code) in enumerate(strings):
+                self.ranks[string_code] = position
+        return self.ranks[code]
+
+    # Tag dicts ({key: value} or {namespace: {key: value}}) rebuilt on canonical keys
+    # (values such as CreatedOn timestamps are mostly unique and are kept as they are)
+    def intern_tags(self, tags):
+        if not isinstance(tags, dict):
+            return tags
+        return {self.intern(key): self.intern_tags(value) if isinstance(value, dict) else value for key, value in tags.items()}
+
+
+run_strings = StringTable()
+
+
+# Fields stored through run_strings, and the tag fields rebuilt on its strings
+INTERNED_FIELDS = frozenset(("compartment_name", "region", "state", "availability_domain", "volume_state", "resource_type", "currency", "starttime"))
+TAG_FIELDS = frozenset(("defined_tags", "freeform_tags"))
+
+
+class Record(Mapping):
+    __slots__ = ()
+    fields = ()
+    field_set = frozenset()
+
+    def __init__(self, **values):
+        for field, value in values.items():
+            if field in INTERNED_FIELDS:
+                value = run_strings.intern(value)
+            elif field in TAG_FIELDS:
+                value = run_strings.intern_tags(value)
+            setattr(self, field, value)
+
+    def __getitem__(self, key):
+        if key in self.field_set:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in self.field_set:
+            return getattr(self, key, default)
+        return default
+
+    def __contains__(self, key):
+        return key in self.field_set and hasattr(self, key)
+
+    def __iter__(self):
+        return (field for field in self.fields if hasattr(self, field))
+
+    def __len__(self):
+        return sum(1 for field in self.fields if hasattr(self, field))
+
+    def __repr__(self):
+        return f"{type(self).__name__}({', '.join(f'{key}={value!r}' for key, value in self.items())})"
+
+    # Slotted instances have no __dict__: pickle (ExternalSorter, worker processes) goes through the values
+    def __reduce__(self):
+        return (rebuild_record, (type(self), dict(self.items())))
+
+
+def rebuild_record(record_class, values):
+    return record_class(**values)
+
+
+# Create a slotted Record subclass with the given fields
+def record_type(name, fields):
+    fields = tuple(fields)
+    return type(name, (Record,), {"__slots__": fields, "fields": fields, "field_set": frozenset(fields), "__module__": __name__})
+
+
+RESOURCE_FIELDS = ("compartment_name", "region", "name", "id", "state", "defined_tags", "freeform_tags", "time_created")
+
+ComputeInstanceRecord = record_type("ComputeInstanceRecord", RESOURCE_FIELDS + ("attached_to", "volume_state", "availability_domain"))
+BlockVolumeRecord = record_type("BlockVolumeRecord", RESOURCE_FIELDS + ("attached_to_instance", "size_in_gbs"))
+BlockVolumeBackupRecord = record_type("BlockVolumeBackupRecord", RESOURCE_FIELDS + ("attached_to", "size_in_gbs"))
+BootVolumeRecord = record_type("BootVolumeRecord", RESOURCE_FIELDS + ("attached_to_instance", "availability_domain", "size_in_gbs"))
+BootVolumeBackupRecord = record_type("BootVolumeBackupRecord", RESOURCE_FIELDS + ("size_in_gbs",))
+FileSystemRecord = record_type("FileSystemRecord", RESOURCE_FIELDS + ("metered_bytes",))
+AutonomousDatabaseRecord = record_type("AutonomousDatabaseRecord", RESOURCE_FIELDS + ("ocups", "size_in_gbs"))
+SearchResourceRecord = record_type("SearchResourceRecord", RESOURCE_FIELDS + ("resource_type",))
+DailyCostRecord = record_type("DailyCostRecord", ("compartment_name", "region", "id", "currency", "cost", "starttime"))
+# Volume attachments relation (block and boot volumes): one row per attachment,
+# joined with the volume records at export time (see oci_export.join_attachments)
+VolumeAttachmentRecord = record_type("VolumeAttachmentRecord", ("volume_id", "instance_id", "state", "availability_domain"))
+
+# Record type of each resource sheet
+RECORD_TYPES = {
+    "Compute Instances": ComputeInstanceRecord,
+    "Block Volumes": BlockVolumeRecord,
+    "Block Volumes Bkp": BlockVolumeBackupRecord,
+    "Boot Volumes": BootVolumeRecord,
+    "Boot Volumes Bkp": BootVolumeBackupRecord,
+    "File Systems": FileSystemRecord,
+    "Autonomous Databases": AutonomousDatabaseRecord,
+    "All Resources": SearchResourceRecord,
+    "Daily Costs": DailyCostRecord,
+    "Volume Attachments": VolumeAttachmentRecord,
+}
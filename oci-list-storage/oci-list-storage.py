@@ -1,6 +1,10 @@
 ﻿import oci
 import json
+import os
+import sys
+import time
 import pandas as pd
+from collections.abc import Mapping
 from datetime import datetime
 from openpyxl import Workbook
 from openpyxl.styles import PatternFill, Font
@@ -8,6 +12,12 @@ from openpyxl.chart import PieChart, BarChart, Reference
 
 # Load OCI configuration
 configAPI = oci.config.from_file("~/.oci/config")
+# Options:
+#        --jsonl   append every record to oci_storage_<tenancy>_<date>.jsonl as soon as it is discovered (fsynced every
+#                  1000 records or 5 seconds, so an interrupted run keeps its partial results) instead of writing
+#                  oci_storage_<tenancy>_<date>.json once at the end
+cli_flags = [arg for arg in sys.argv[1:] if arg.startswith("--")]
+jsonl_enabled = "--jsonl" in cli_flags
 
 # Initialize OCI clients
 identity_client = oci.identity.IdentityClient(configAPI)
@@ -31,6 +41,74 @@ availability_domains = identity_client.list_availability_domains(tenancy_ocid).d
 resources = {}
 findings = {}
 
+# Get current date for the file name
+current_date = datetime.now().strftime("%Y-%m-%d")
+
+# Discovered records: the fields are declared once as __slots__ instead of a dict per
+# record repeating the same keys. Records read like the dicts they replace (get, [],
+# **record) with only the fields that were set; json.dump converts them with default=dict
+class Record(Mapping):
+    __slots__ = ()
+    fields = ()
+
+    def __init__(self, **values):
+        for field, value in values.items():
+            setattr(self, field, value)
+
+    def __getitem__(self, key):
+        if key in self.fields:
+            try:
+                return getattr(self, key)
+            except AttributeError:
+                pass
+        raise KeyError(key)
+
+    def __iter__(self):
+        return (field for field in self.fields if hasattr(self, field))
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+class ResourceRecord(Record):
+    __slots__ = fields = ("name", "id", "defined_tags", "freeform_tags")
+
+# --jsonl output: one JSON line per record, written as soon as the record is discovered
+# and fsynced every fsync_every lines or fsync_interval seconds
+class JsonlWriter:
+
+    def __init__(self, file_name, fsync_every=1000, fsync_interval=5.0):
+        self.file = open(file_name, "w", encoding="utf-8")
+        self.fsync_every = fsync_every
+        self.fsync_interval = fsync_interval
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def write(self, record):
+        self.file.write(json.dumps(record, default=str) + "\n")
+        self.unsynced += 1
+        if self.unsynced >= self.fsync_every or time.monotonic() - self.last_sync >= self.fsync_interval:
+            self.sync()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.unsynced = 0
+        self.last_sync = time.monotonic()
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+jsonl_file_name = f"oci_storage_{tenancy_name}_{current_date}.jsonl"
+jsonl_writer = JsonlWriter(jsonl_file_name) if jsonl_enabled else None
+
+# Keep a discovered record for the sheets and, with --jsonl, append it to the JSONL file right away
+def add_resource(compartment_name, resource_type, item):
+    resources[compartment_name].setdefault(resource_type, []).append(item)
+    if jsonl_writer is not None:
+        jsonl_writer.write({"compartment": compartment_name, "sheet": resource_type, **item})
+
 try:
     # Fetch all compartments
     compartments = oci.pagination.list_call_get_all_results(
@@ -49,18 +127,19 @@ try:
             findings[compartment.name] = []
 
             # Discover Block Volumes
-            volume_response = oci.pagination.list_call_get_all_results(
+            volume_response = oci.pagination.list_call_get_all_results_generator(
                 block_storage_client.list_volumes,
+                "record",
                 compartment_id=compartment.id
-            ).data
+            )
             volume_findings = []
             for volume in volume_response:
-                resources[compartment.name].setdefault("Block Volumes", []).append({
-                    "name": volume.display_name,
-                    "id": volume.id,
-                    "defined_tags" : volume.defined_tags,
-                    "freeform_tags" : volume.freeform_tags
-                })
+                add_resource(compartment.name, "Block Volumes", ResourceRecord(
+                    name=volume.display_name,
+                    id=volume.id,
+                    defined_tags=volume.defined_tags,
+                    freeform_tags=volume.freeform_tags
+                ))
                 # Check if the volume is attached to any instance 
                 attachments = oci.pagination.list_call_get_all_results(
                     compute_client.list_volume_attachments,
@@ -76,49 +155,68 @@ try:
 
             # Discover File Systems 
             for ad in availability_domains:  
-                fss_response = oci.pagination.list_call_get_all_results(
+                fss_response = oci.pagination.list_call_get_all_results_generator(
                     file_storage_client.list_file_systems,
+                    "record",
                     compartment_id=compartment.id,
                     availability_domain=ad.name
-                ).data
+                )
                 fss_findings = []
                 for fss in fss_response:
-                    resources[compartment.name].setdefault("File Systems", []).append({
-                        "name": fss.display_name,
-                        "id": fss.id,
-                        "defined_tags" : fss.defined_tags,
-                        "freeform_tags" : fss.freeform_tags                        
-                    })
+                    add_resource(compartment.name, "File Systems", ResourceRecord(
+                        name=fss.display_name,
+                        id=fss.id,
+                        defined_tags=fss.defined_tags,
+                        freeform_tags=fss.freeform_tags
+                    ))
                 findings[compartment.name].extend(fss_findings)
-
-    # Get current date for the file name
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    
-    # Generate file name with dynamic titles
-    file_name = f"oci_storage_{tenancy_name}_{current_date}.json"
-    
-    # Export data to JSON
-    with open(file_name, "w") as file:
-        json.dump({"resources": resources, "findings": findings}, file, indent=4)
-
-    print(f"JSON file saved: {file_name}")
+            if jsonl_writer is not None:
+                for finding in findings[compartment.name]:
+                    jsonl_writer.write({"compartment": compartment.name, "finding": finding})
+
+    if jsonl_writer is not None:
+        jsonl_writer.close()
+        print(f"JSONL file saved: {jsonl_file_name}")
+    else:
+        # Generate file name with dynamic titles
+        file_name = f"oci_storage_{tenancy_name}_{current_date}.json"
+
+        # Export data to JSON
+        with open(file_name, "w") as file:
+            json.dump({"resources": resources, "findings": findings}, file, indent=4, default=dict)
+
+        print(f"JSON file saved: {file_name}")
     
     # Export data to Excel
-    workbook = Workbook()
-    summary_sheet = workbook.active
-
-    # Remove default sheet
-    workbook.remove(workbook["Sheet"])
+    # Write-only workbook (no default sheet): rows are streamed to disk as they are appended
+    workbook = Workbook(write_only=True)
 
     # Add data sheets for each resource type
+    # Tags are flattened into one column per defined tag ("namespace.key") and per freeform tag ("freeform.key"),
+    # collected in a first pass over the records
     for resource_type in ["Block Volumes"
                         ,"File Systems"
                          ]:
+        tag_paths = {}
+        for compartment, resource_data in resources.items():
+            for item in resource_data.get(resource_type, []):
+                for tag_namespace, tags in (item.get("defined_tags") or {}).items():
+                    for tag_key in tags:
+                        tag_paths[(tag_namespace, tag_key)] = None
+                for tag_key in (item.get("freeform_tags") or {}):
+                    tag_paths[("freeform", tag_key)] = None
+        tag_paths = sorted(tag_paths)
         sheet = workbook.create_sheet(title=resource_type)
-        sheet.append(["Compartment", "Name", "ID", "Defined_tags", "Freeform_tags" ])
+        sheet.append(["Compartment", "Name", "ID"] + [f"{tag_namespace}.{tag_key}" for tag_namespace, tag_key in tag_paths])
         for compartment, resource_data in resources.items():
             for item in resource_data.get(resource_type, []):
-                sheet.append([compartment, item.get("name"), item.get("id", "N/A"),str(item.get("defined_tags")),str(item.get(f"freeform_tags"))])
+                defined_tags = item.get("defined_tags") or {}
+                freeform_tags = item.get("freeform_tags") or {}
+                tag_cells = []
+                for tag_namespace, tag_key in tag_paths:
+                    tag_value = freeform_tags.get(tag_key) if tag_namespace == "freeform" else (defined_tags.get(tag_namespace) or {}).get(tag_key)
+                    tag_cells.append(None if tag_value is None else str(tag_value))
+                sheet.append([compartment, item.get("name"), item.get("id", "N/A")] + tag_cells)
 
       # Generate file name with dynamic titles
     file_name = f"oci_storage_{tenancy_name}_{current_date}.xlsx"
@@ -130,4 +228,8 @@ try:
 except oci.exceptions.ServiceError as e:
     print(f"Service Error: {e}")
 except Exception as e:
-    print(f"Unexpected Error: {e}")
\ No newline at end of file
+    print(f"Unexpected Error: {e}")
+finally:
+    # Keep whatever was discovered, even when the run was interrupted
+    if jsonl_writer is not None:
+        jsonl_writer.close()
\ No newline at end of file
@@ -1,6 +1,7 @@
 ﻿import oci
 import openpyxl
 from openpyxl.styles import Font
+from openpyxl.cell import WriteOnlyCell
 from datetime import datetime
 
 def collect_unused_resources():
@@ -32,8 +33,8 @@ def collect_unused_resources():
     
     availability_domains = identity_client.list_availability_domains(tenancy_ocid).data
     
-    # Create an Excel workbook
-    workbook = openpyxl.Workbook()
+    # Create a write-only Excel workbook: rows are streamed to disk when the sheets are written
+    workbook = openpyxl.Workbook(write_only=True)
     
     # Define sheet names
     sheets = {
@@ -47,17 +48,9 @@ def collect_unused_resources():
         # "Inactive DRGs & VPNs": ["Compartment", "Resource Name", "Type", "State", "Defined Tags","Freeform Tags", "Created Time", "Remarks"]
     }
 
-    sheet_objects = {}
-    for sheet_name, headers in sheets.items():
-        sheet = workbook.create_sheet(title=sheet_name)
-        sheet.append(headers)
-        # Apply bold font to headers
-        for cell in sheet[1]:
-            cell.font = Font(bold=True)
-        sheet_objects[sheet_name] = sheet
-    
-    # Remove default sheet
-    workbook.remove(workbook["Sheet"])
+    # Rows are kept per sheet, with the tag dicts in the Defined Tags/Freeform Tags columns,
+    # until all the tag keys of the sheet are known
+    sheet_rows = {sheet_name: [] for sheet_name in sheets}
 
     for compartment in compartments:
         print(f"Discovering unused resources in compartment: {compartment.name}")
@@ -67,14 +60,14 @@ def collect_unused_resources():
         for volume in volumes:
             if volume.lifecycle_state != "AVAILABLE":
                 continue
-            sheet_objects["Unattached Volumes"].append([
+            sheet_rows["Unattached Volumes"].append([
                 compartment.name, 
                 volume.display_name, 
                 volume.id,
                 volume.size_in_gbs, 
                 volume.lifecycle_state,
-                str(volume.defined_tags),
-                str(volume.freeform_tags),
+                volume.defined_tags,
+                volume.freeform_tags,
                 volume.time_created.strftime('%Y-%m-%d %H:%M:%S'), "N/A", "Unattached"
             ])
         
@@ -82,7 +75,7 @@ def collect_unused_resources():
         # instances = compute_client.list_instances(compartment_id=compartment.id).data
         # for instance in instances:
         #     if instance.lifecycle_state in ["TERMINATED", "STOPPED"]:
-        #         sheet_objects["Orphaned Instances"].append([
+        #         sheet_rows["Orphaned Instances"].append([
         #             compartment.name, 
         #             instance.display_name, 
         #             instance.id,
@@ -100,7 +93,7 @@ def collect_unused_resources():
         #     bucket_details = object_storage_client.get_bucket(namespace, bucket.name).data
         #     bucket_size = bucket_details.approximate_size if bucket_details.approximate_size is not None else 0
         #     remarks = "Unused" if bucket_details.approximate_count == 0 else "Active"
-        #     sheet_objects["Unused Buckets"].append([
+        #     sheet_rows["Unused Buckets"].append([
         #         compartment.name, 
         #         bucket.name, 
         #         "Object Storage", 
@@ -116,14 +109,14 @@ def collect_unused_resources():
             file_systems = file_storage_client.list_file_systems(compartment_id=compartment.id, availability_domain=ad.name).data
             for fs in file_systems:
                 remarks = "Unused" if fs.lifecycle_state == "AVAILABLE" else "In Use"
-                sheet_objects["Unused FileSystems"].append([
+                sheet_rows["Unused FileSystems"].append([
                     compartment.name, 
                     fs.display_name, 
                     "File Storage", 
                     "N/A", 
                     fs.lifecycle_state, 
-                    str(fs.defined_tags),
-                    str(fs.freeform_tags),                    
+                    fs.defined_tags,
+                    fs.freeform_tags,
                     fs.time_created.strftime('%Y-%m-%d %H:%M:%S'), remarks
                 ])
         
@@ -131,7 +124,7 @@ def collect_unused_resources():
         # vnic_attachments = compute_client.list_vnic_attachments(compartment_id=compartment.id).data
         # for vnic in vnic_attachments:
         #     if vnic.lifecycle_state != "ATTACHED":
-        #         sheet_objects["Unattached VNICs"].append([
+        #         sheet_rows["Unattached VNICs"].append([
         #             compartment.name, 
         #             vnic.display_name, 
         #             vnic.id,
@@ -145,7 +138,7 @@ def collect_unused_resources():
         # load_balancers = load_balancer_client.list_load_balancers(compartment_id=compartment.id).data
         # for lb in load_balancers:
         #     if lb.lifecycle_state in ["TERMINATED", "FAILED"]:
-        #         sheet_objects["Orphaned Load Balancers"].append([
+        #         sheet_rows["Orphaned Load Balancers"].append([
         #             compartment.name, 
         #             lb.display_name, 
         #             lb.id,
@@ -159,7 +152,7 @@ def collect_unused_resources():
         # public_ips = network_client.list_public_ips(scope="REGION", compartment_id=compartment.id).data
         # for ip in public_ips:
         #     assigned_to = ip.assigned_entity_id if ip.assigned_entity_id else "Unassigned"
-        #     sheet_objects["Unused Public IPs"].append([
+        #     sheet_rows["Unused Public IPs"].append([
         #         compartment.name, 
         #         ip.ip_address, 
         #         assigned_to,
@@ -173,7 +166,7 @@ def collect_unused_resources():
         # drgs = network_client.list_drgs(compartment_id=compartment.id).data
         # for drg in drgs:
         #     if drg.lifecycle_state != "AVAILABLE":
-        #         sheet_objects["Inactive DRGs & VPNs"].append([
+        #         sheet_rows["Inactive DRGs & VPNs"].append([
         #             compartment.name, 
         #             drg.display_name, 
         #             "DRG", 
@@ -183,6 +176,39 @@ def collect_unused_resources():
         #             drg.time_created.strftime('%Y-%m-%d %H:%M:%S'), "Inactive"
         #         ])
 
+    # Tags are flattened into one column per defined tag ("namespace.key") and per freeform tag ("freeform.key")
+    # in place of the Defined Tags/Freeform Tags columns
+    for sheet_name, headers in sheets.items():
+        rows = sheet_rows[sheet_name]
+        defined_index = headers.index("Defined Tags")
+        freeform_index = headers.index("Freeform Tags")
+        tag_paths = {}
+        for row in rows:
+            for tag_namespace, tags in (row[defined_index] or {}).items():
+                for tag_key in tags:
+                    tag_paths[(tag_namespace, tag_key)] = None
+            for tag_key in (row[freeform_index] or {}):
+                tag_paths[("freeform", tag_key)] = None
+        tag_paths = sorted(tag_paths)
+        tag_headers = [f"{tag_namespace}.{tag_key}" for tag_namespace, tag_key in tag_paths]
+
+        sheet = workbook.create_sheet(title=sheet_name)
+        # Apply bold font to headers
+        header_cells = []
+        for header in headers[:defined_index] + tag_headers + headers[freeform_index + 1:]:
+            cell = WriteOnlyCell(sheet, value=header)
+            cell.font = Font(bold=True)
+            header_cells.append(cell)
+        sheet.append(header_cells)
+        for row in rows:
+            defined_tags = row[defined_index] or {}
+            freeform_tags = row[freeform_index] or {}
+            tag_cells = []
+            for tag_namespace, tag_key in tag_paths:
+                tag_value = freeform_tags.get(tag_key) if tag_namespace == "freeform" else (defined_tags.get(tag_namespace) or {}).get(tag_key)
+                tag_cells.append(None if tag_value is None else str(tag_value))
+            sheet.append(row[:defined_index] + tag_cells + row[freeform_index + 1:])
+
     # Get current date for the file name
     current_date = datetime.now().strftime("%Y-%m-%d")
 